@@ -1,3 +1,9 @@
+# Deprecated: participant export is now part of the API. Use
+#   POST /exports {"entity": "<group>", "kind": "participants"}
+# which reuses the service's Telegram session, streams users to NDJSON,
+# checkpoints its progress and gets past the per-search result cap.
+# This script keeps every user in memory, writes only at the end and uses
+# its own config.ini session.
 import configparser
 import json
 import asyncio
@@ -3,6 +3,51 @@ from dataclasses import dataclass
 from typing import Optional
 
 
+def _get_int(name: str, default: int, minimum: Optional[int] = None) -> int:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = int(raw)
+    except ValueError as exc:  # noqa: BLE001
+        raise RuntimeError(f"{name} must be an integer") from exc
+    if minimum is not None and value < minimum:
+        raise RuntimeError(f"{name} must be greater than or equal to {minimum}")
+    return value
+
+
+def _get_float(name: str, default: float, minimum: Optional[float] = None) -> float:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    try:
+        value = float(raw)
+    except ValueError as exc:  # noqa: BLE001
+        raise RuntimeError(f"{name} must be a number") from exc
+    if minimum is not None and value < minimum:
+        raise RuntimeError(f"{name} must be greater than or equal to {minimum}")
+    return value
+
+
+def _get_bool(name: str, default: bool) -> bool:
+    raw = os.getenv(name)
+    if raw is None or raw == "":
+        return default
+    value = raw.strip().lower()
+    if value in ("1", "true", "yes", "on"):
+        return True
+    if value in ("0", "false", "no", "off"):
+        return False
+    raise RuntimeError(f"{name} must be a boolean (true/false)")
+
+
+def _get_choice(name: str, default: str, choices: tuple) -> str:
+    value = (os.getenv(name) or default).strip().lower()
+    if value not in choices:
+        raise RuntimeError(f"{name} must be one of: {', '.join(choices)}")
+    return value
+
+
 @dataclass(frozen=True)
 class Settings:
     api_id: int
@@ -21,6 +66,47 @@ class Settings:
     listener_webhook: Optional[str]
     webhook_headers_raw: Optional[str]
     listener_headers_raw: Optional[str]
+    telegram_max_concurrency: int = 4
+    entity_cache_ttl_seconds: float = 3600.0
+    entity_cache_max_entries: int = 1024
+    batch_max_items: int = 50
+    message_max_ids: int = 500
+    request_timeout_seconds: float = 25.0
+    bridge_max_in_flight: int = 32
+    bridge_max_queued: int = 64
+    listener_queue_size: int = 1000
+    listener_workers: int = 4
+    listener_overflow: str = "drop_oldest"
+    listener_catchup_limit: int = 1000
+    listener_reconnect_check_seconds: float = 5.0
+    listener_edit_mode: str = "local"
+    album_aggregation: bool = True
+    album_window_seconds: float = 1.5
+    metrics_max_entities: int = 50
+    admin_api_key: Optional[str] = None
+    loop_watchdog_threshold_ms: int = 500
+    profile_max_seconds: int = 20
+    response_cache_ttl_seconds: float = 0.0
+    response_cache_max_bytes: int = 64 * 1024 * 1024
+    webhook_encoding: str = "json"
+    webhook_destinations_raw: Optional[str] = None
+    listener_webhook_encoding: Optional[str] = None
+    response_compression_min_bytes: int = 1024
+    delivery_log_size: int = 100
+    delivery_log_file: Optional[str] = None
+    delivery_log_max_bytes: int = 50 * 1024 * 1024
+    delivery_log_backups: int = 5
+    jobs_max_concurrent: int = 2
+    jobs_ttl_seconds: int = 3600
+    exports_dir: str = ""
+    export_part_rows: int = 10000
+    export_media_concurrency: int = 4
+    exports_max_concurrent: int = 1
+    participant_search_concurrency: int = 4
+    startup_retry_max_seconds: float = 60.0
+    delivery_cursors: bool = False
+    search_index: bool = True
+    search_index_path: str = ""
 
     @classmethod
     def from_env(cls) -> "Settings":
@@ -85,6 +171,55 @@ class Settings:
             listener_webhook=os.getenv("LISTENER_WEBHOOK_URL"),
             webhook_headers_raw=os.getenv("WEBHOOK_HEADERS"),
             listener_headers_raw=os.getenv("LISTENER_WEBHOOK_HEADERS"),
+            telegram_max_concurrency=_get_int("TELEGRAM_MAX_CONCURRENCY", 4, minimum=1),
+            entity_cache_ttl_seconds=_get_float("ENTITY_CACHE_TTL_SECONDS", 3600.0, minimum=0.0),
+            entity_cache_max_entries=_get_int("ENTITY_CACHE_MAX_ENTRIES", 1024, minimum=1),
+            batch_max_items=_get_int("BATCH_MAX_ITEMS", 50, minimum=1),
+            message_max_ids=_get_int("MESSAGE_MAX_IDS", 500, minimum=1),
+            request_timeout_seconds=_get_float("REQUEST_TIMEOUT_SECONDS", 25.0, minimum=0.0),
+            bridge_max_in_flight=_get_int("BRIDGE_MAX_IN_FLIGHT", 32, minimum=1),
+            bridge_max_queued=_get_int("BRIDGE_MAX_QUEUED", 64, minimum=0),
+            listener_queue_size=_get_int("LISTENER_QUEUE_SIZE", 1000, minimum=1),
+            listener_workers=_get_int("LISTENER_WORKERS", 4, minimum=1),
+            listener_overflow=_get_choice(
+                "LISTENER_OVERFLOW",
+                "drop_oldest",
+                ("block", "drop_newest", "drop_oldest"),
+            ),
+            listener_catchup_limit=_get_int("LISTENER_CATCHUP_LIMIT", 1000, minimum=0),
+            listener_reconnect_check_seconds=_get_float("LISTENER_RECONNECT_CHECK_SECONDS", 5.0, minimum=0),
+            listener_edit_mode=_get_choice(
+                "LISTENER_EDIT_MODE",
+                "local",
+                ("off", "local", "delta", "full"),
+            ),
+            album_aggregation=_get_bool("ALBUM_AGGREGATION", True),
+            album_window_seconds=_get_float("ALBUM_WINDOW_SECONDS", 1.5, minimum=0),
+            metrics_max_entities=_get_int("METRICS_MAX_ENTITIES", 50, minimum=0),
+            admin_api_key=os.getenv("ADMIN_API_KEY") or api_key,
+            loop_watchdog_threshold_ms=_get_int("LOOP_WATCHDOG_THRESHOLD_MS", 500, minimum=0),
+            profile_max_seconds=_get_int("PROFILE_MAX_SECONDS", 20, minimum=1),
+            response_cache_ttl_seconds=_get_float("RESPONSE_CACHE_TTL_SECONDS", 0.0, minimum=0.0),
+            response_cache_max_bytes=_get_int("RESPONSE_CACHE_MAX_BYTES", 64 * 1024 * 1024, minimum=0),
+            webhook_encoding=os.getenv("WEBHOOK_ENCODING") or "json",
+            webhook_destinations_raw=os.getenv("WEBHOOK_DESTINATIONS") or None,
+            listener_webhook_encoding=os.getenv("LISTENER_WEBHOOK_ENCODING") or None,
+            response_compression_min_bytes=_get_int("RESPONSE_COMPRESSION_MIN_BYTES", 1024, minimum=0),
+            delivery_log_size=_get_int("DELIVERY_LOG_SIZE", 100, minimum=1),
+            delivery_log_file=os.getenv("DELIVERY_LOG_FILE") or None,
+            delivery_log_max_bytes=_get_int("DELIVERY_LOG_MAX_BYTES", 50 * 1024 * 1024, minimum=1024),
+            delivery_log_backups=_get_int("DELIVERY_LOG_BACKUPS", 5, minimum=0),
+            jobs_max_concurrent=_get_int("JOBS_MAX_CONCURRENT", 2, minimum=1),
+            jobs_ttl_seconds=_get_int("JOBS_TTL_SECONDS", 3600, minimum=60),
+            exports_dir=os.getenv("EXPORTS_DIR", os.path.join(data_dir, "exports")),
+            export_part_rows=_get_int("EXPORT_PART_ROWS", 10000, minimum=100),
+            export_media_concurrency=_get_int("EXPORT_MEDIA_CONCURRENCY", 4, minimum=1),
+            exports_max_concurrent=_get_int("EXPORTS_MAX_CONCURRENT", 1, minimum=1),
+            participant_search_concurrency=_get_int("PARTICIPANT_SEARCH_CONCURRENCY", 4, minimum=1),
+            startup_retry_max_seconds=_get_float("STARTUP_RETRY_MAX_SECONDS", 60.0, minimum=1.0),
+            delivery_cursors=_get_bool("DELIVERY_CURSORS", False),
+            search_index=_get_bool("SEARCH_INDEX", True),
+            search_index_path=os.getenv("SEARCH_INDEX_PATH") or os.path.join(data_dir, "search.db"),
         )
 
 
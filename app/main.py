@@ -1,9 +1,9 @@
 import os
+import threading
 from datetime import datetime
-from flask import Flask, request, jsonify, send_file, render_template_string
+from flask import Flask, Response, request, jsonify, send_file, render_template_string
 import logging
 import json
-from flasgger import Swagger
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
 from prometheus_flask_exporter import PrometheusMetrics
@@ -13,8 +13,14 @@ from itsdangerous import BadSignature, SignatureExpired
 load_dotenv()
 
 from .config import settings  # noqa: E402
+from .services import encoding  # noqa: E402
+from .services.admission import AdmissionRejectedError, DeadlineExceededError  # noqa: E402
+from .services.delivery_log import DeliveryLog  # noqa: E402
+from .services.jobs import JobLimitError  # noqa: E402
+from .services.profiling import collapse, sample_stacks  # noqa: E402
+from .services.search import parse_date  # noqa: E402
 from .services.webhook import WebhookService  # noqa: E402
-from .services.telegram import TelegramService  # noqa: E402
+from .services.telegram import ServiceNotReadyError, TelegramService  # noqa: E402
 from .version import APP_VERSION  # noqa: E402
 
 class JsonFormatter(logging.Formatter):
@@ -34,8 +40,49 @@ logger = logging.getLogger(__name__)
 
 logger.info("Starting Flask app...")
 
+
+class LazySwagger:
+    """Builds the flasgger UI on the first /apidocs request instead of at import.
+
+    flasgger (and jsonschema/yaml behind it) are slow to import, and Flask
+    does not allow registering its blueprint once requests are being served,
+    so the docs live in a separate app that mirrors the API's routes.
+    """
+
+    PREFIXES = ('/apidocs', '/apispec', '/flasgger_static', '/oauth2-redirect.html')
+
+    def __init__(self, flask_app):
+        self._app = flask_app
+        self._wsgi_app = flask_app.wsgi_app
+        self._docs_app = None
+        self._lock = threading.Lock()
+
+    def _build(self):
+        from flasgger import Swagger
+
+        docs_app = Flask(self._app.import_name)
+        Swagger(docs_app)
+        for rule in self._app.url_map.iter_rules():
+            if rule.endpoint not in docs_app.view_functions:
+                docs_app.add_url_rule(
+                    rule.rule,
+                    rule.endpoint,
+                    self._app.view_functions[rule.endpoint],
+                    methods=rule.methods,
+                )
+        return docs_app
+
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO', '').startswith(self.PREFIXES):
+            with self._lock:
+                if self._docs_app is None:
+                    self._docs_app = self._build()
+            return self._docs_app.wsgi_app(environ, start_response)
+        return self._wsgi_app(environ, start_response)
+
+
 app = Flask(__name__)
-Swagger(app)
+app.wsgi_app = LazySwagger(app)
 PrometheusMetrics(app)
 limiter = Limiter(
     app=app,
@@ -43,7 +90,13 @@ limiter = Limiter(
     default_limits=["60 per minute"],
 )
 
-webhook_service = WebhookService(settings.webhook_headers_raw, settings.data_dir)
+delivery_log = DeliveryLog(
+    capacity=settings.delivery_log_size,
+    path=settings.delivery_log_file,
+    max_bytes=settings.delivery_log_max_bytes,
+    backups=settings.delivery_log_backups,
+)
+webhook_service = WebhookService(settings.webhook_headers_raw, settings.data_dir, delivery_log)
 telegram_service = TelegramService(settings, webhook_service)
 
 DOCS_TEMPLATE = """
@@ -91,23 +144,82 @@ DOCS_TEMPLATE = """
 </html>
 """
 
+JOB_RESULT_PAGE_MAX = 1000
+
+# Endpoints that talk to Telegram and therefore answer 503 until it is ready.
+TELEGRAM_ENDPOINTS = {
+    'trigger',
+    'trigger_batch',
+    'get_message',
+    'get_messages_bulk',
+    'create_export',
+    'resume_export',
+}
+SEARCH_PAGE_MAX = 100
+
 DOCS_ENDPOINTS = [
         {
                 "method": "POST",
                 "path": "/trigger",
                 "description": "Fetches the latest messages from the channel/group and (optionally) forwards them to a webhook.",
-                "details": "JSON body with 'entity', 'limit' (default 2), and optional 'webhook_url'.",
+                "details": "JSON body with 'entity', 'limit' (default 2), and optional 'webhook_url'. With RESPONSE_CACHE_TTL_SECONDS set, responses carry an ETag (If-None-Match returns 304); send 'cache': false to bypass. 'destinations' adds named WEBHOOK_DESTINATIONS targets; each has its own queue, timeout and circuit breaker.",
                 "sample": """curl -X POST https://<host>/trigger \
     -H 'Content-Type: application/json' \
     -H 'X-API-Key: <api_key>' \
     -d '{\"entity\": \"@canal\", \"limit\": 2}'""",
+        },
+        {
+                "method": "POST",
+                "path": "/trigger/batch",
+                "description": "Fetches several channels concurrently in a single call and groups the results by entity.",
+                "details": "JSON body with 'requests' (list of {entity, limit, since_id}), optional 'webhook_url' and 'stream' (NDJSON, one line per entity as it finishes).",
+                "sample": """curl -X POST https://<host>/trigger/batch \
+    -H 'Content-Type: application/json' \
+    -H 'X-API-Key: <api_key>' \
+    -d '{\"requests\": [{\"entity\": \"@canal\", \"limit\": 5}, {\"entity\": \"@otro\", \"since_id\": 1200}]}'""",
+        },
+        {
+                "method": "GET",
+                "path": "/jobs/<job_id>",
+                "description": "Status and progress of a background pull started with /trigger?async=true.",
+                "details": "GET /jobs/<job_id>/result?offset=0&limit=100 pages the results (or ?stream=true for NDJSON); DELETE /jobs/<job_id> cancels it.",
+                "sample": """curl -X POST 'https://<host>/trigger?async=true' \
+    -H 'Content-Type: application/json' \
+    -H 'X-API-Key: <api_key>' \
+    -d '{\"entity\": \"@canal\", \"limit\": 20000}'""",
+        },
+        {
+                "method": "POST",
+                "path": "/exports",
+                "description": "Exports a channel's whole history (or its members) to NDJSON or Parquet part files under EXPORTS_DIR, resumable after crashes.",
+                "details": "JSON body with 'entity', optional 'kind' (history|participants), 'format' (ndjson|parquet), 'media' and 'min_id'. GET /exports/<id> shows progress, DELETE cancels (?purge=true removes the files), POST /exports/<id>/resume continues.",
+                "sample": """curl -X POST https://<host>/exports \
+    -H 'Content-Type: application/json' \
+    -H 'X-API-Key: <api_key>' \
+    -d '{\"entity\": \"@canal\", \"format\": \"ndjson\"}'""",
         },
         {
                 "method": "GET",
                 "path": "/message",
-                "description": "Returns a single message by ID, keeping the same format as /trigger.",
-                "details": "Query params: entity, message_id, optional webhook_url.",
+                "description": "Returns messages by ID, keeping the same format as /trigger.",
+                "details": "Query params: entity, message_id (one id, comma-separated list or repeated), optional webhook_url. Several ids return {messages, missing, errors}; POST /message accepts {requests: [{entity, message_ids}]} for multiple entities.",
                 "sample": """curl 'https://<host>/message?entity=@canal&message_id=123' \
+    -H 'X-API-Key: <api_key>'""",
+        },
+        {
+                "method": "GET",
+                "path": "/search",
+                "description": "Full-text search over every message the service has fetched, answered from the local index.",
+                "details": "Query params: q (FTS5 syntax: words, \"phrases\", OR, prefix*), optional entity, from/to (ISO dates), limit (max 100) and offset. Results are ranked by bm25.",
+                "sample": """curl 'https://<host>/search?q=elecciones&entity=@canal&from=2024-01-01' \
+    -H 'X-API-Key: <api_key>'""",
+        },
+        {
+                "method": "GET",
+                "path": "/cursors",
+                "description": "Delivery cursors: which messages each webhook already received, per channel.",
+                "details": "Optional filters webhook_url and entity. /trigger and /trigger/batch skip messages a webhook already got unless 'redeliver' is true; DELETE /cursors (same filters) resets them.",
+                "sample": """curl -X DELETE 'https://<host>/cursors?entity=@canal' \
     -H 'X-API-Key: <api_key>'""",
         },
         {
@@ -117,11 +229,18 @@ DOCS_ENDPOINTS = [
                 "details": "Tokens expire after MEDIA_URL_TTL_SECONDS and do not require extra headers.",
                 "sample": "curl -L 'https://<host>/media/<token>'",
         },
+        {
+                "method": "GET",
+                "path": "/health/ready",
+                "description": "Readiness: 200 once the Telegram client is connected; 503 while it is still connecting in the background.",
+                "details": "/health/live only checks that the process and its event loop are up (used by the Docker HEALTHCHECK). Neither needs an API key.",
+                "sample": "curl https://<host>/health/ready",
+        },
         {
                 "method": "GET",
                 "path": "/last-response",
-                "description": "Returns the last payload persisted on disk (requires API key).",
-                "details": "Useful for debugging what was sent to n8n or another webhook.",
+                "description": "Returns the last payload sent to a webhook (requires API key).",
+                "details": "Served from memory. ?n=20 returns the last deliveries with destination, entity and status; filter with entity and destination.",
                 "sample": "curl https://<host>/last-response -H 'X-API-Key: <api_key>'",
         },
 ]
@@ -130,11 +249,19 @@ DOCS_ENDPOINTS = [
 def check_api_key():
     protected = {
         ('/trigger', 'POST'),
+        ('/trigger/batch', 'POST'),
         ('/message', 'GET'),
+        ('/message', 'POST'),
         ('/last-response', 'GET'),
+        ('/search', 'GET'),
+        ('/cursors', 'GET'),
+        ('/cursors', 'DELETE'),
     }
     request_signature = (request.path.rstrip('/') or '/', request.method)
-    if request_signature not in protected:
+    expected_key = settings.api_key
+    if request.path.startswith('/admin/'):
+        expected_key = settings.admin_api_key
+    elif request_signature not in protected and not request.path.startswith(('/jobs', '/exports')):
         return
 
     auth_header = request.headers.get('X-API-Key')
@@ -143,10 +270,144 @@ def check_api_key():
     if auth_bearer and auth_bearer.startswith('Bearer '):
         bearer_token = auth_bearer[7:]
 
-    if not ((auth_header and auth_header == settings.api_key) or (bearer_token and bearer_token == settings.api_key)):
+    if not ((auth_header and auth_header == expected_key) or (bearer_token and bearer_token == expected_key)):
         logger.warning("Unauthorized access attempt at %s %s", request.method, request.path)
         return jsonify({'error': 'Unauthorized'}), 401
 
+@app.before_request
+def require_telegram():
+    if request.endpoint in TELEGRAM_ENDPOINTS and not telegram_service.ready:
+        return _not_ready_response()
+
+
+def _not_ready_response():
+    status = telegram_service.startup_status()
+    response = jsonify({
+        'error': 'Telegram client is not ready yet',
+        'attempts': status['attempts'],
+        'last_error': status['last_error'],
+    })
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
+# Raised by the sync→async bridge; answered by the error handlers below
+# (503/504) rather than the routes' generic 500.
+BRIDGE_ERRORS = (AdmissionRejectedError, DeadlineExceededError, ServiceNotReadyError)
+
+
+@app.errorhandler(AdmissionRejectedError)
+def bridge_saturated(error):
+    response = jsonify({'error': str(error), 'bridge': telegram_service.admission.stats()})
+    response.headers['Retry-After'] = '2'
+    return response, 503
+
+
+@app.errorhandler(DeadlineExceededError)
+def bridge_timeout(error):
+    return jsonify({'error': str(error)}), 504
+
+
+@app.errorhandler(ServiceNotReadyError)
+def service_not_ready(error):
+    return _not_ready_response()
+
+
+def _truthy(value) -> bool:
+    return str(value).lower() in ('1', 'true', 'yes')
+
+
+def _parse_destinations(value) -> list:
+    """Destination names from a list or comma-separated string; unknown names raise ``ValueError``."""
+    if value is None or value == '':
+        return []
+    parts = value if isinstance(value, list) else str(value).split(',')
+    names = [str(part).strip() for part in parts if str(part).strip()]
+    unknown = telegram_service.unknown_destinations(names)
+    if unknown:
+        raise ValueError(f"unknown destinations: {', '.join(unknown)}")
+    return list(dict.fromkeys(names))
+
+
+def _job_body(job) -> dict:
+    body = job.snapshot(telegram_service.jobs.ttl)
+    body['links'] = {'status': f'/jobs/{job.id}', 'result': f'/jobs/{job.id}/result'}
+    return body
+
+
+def _use_response_cache(data=None) -> bool:
+    if not telegram_service.response_cache.enabled:
+        return False
+    if 'no-cache' in (request.headers.get('Cache-Control') or ''):
+        return False
+    flag = (data or {}).get('cache', request.args.get('cache', True))
+    return str(flag).lower() not in ('false', '0', 'no')
+
+
+def _negotiated_content_type() -> str:
+    return request.accept_mimetypes.best_match(encoding.available_content_types()) or encoding.JSON
+
+
+def _api_response(payload, status=200):
+    """Encode a successful payload as JSON or, if the client asks for it, msgpack."""
+    content_type = _negotiated_content_type()
+    return Response(encoding.encode(payload, content_type), status=status, mimetype=content_type)
+
+
+def _client_etags():
+    """ETags the client already holds (``If-None-Match``), minus the msgpack suffix.
+
+    Computed here, on the request thread, for the service to skip replaying a
+    cache hit to the webhook when the response will be a ``304``.
+    """
+    tags = {tag[:-len('-msgpack')] if tag.endswith('-msgpack') else tag
+            for tag in request.if_none_match.as_set(include_weak=True)}
+    if request.if_none_match.star_tag:
+        tags.add('*')
+    return frozenset(tags)
+
+
+def _cached_json_response(entry):
+    content_type = _negotiated_content_type()
+    etag = entry.etag if content_type == encoding.JSON else f"{entry.etag}-msgpack"
+    if request.if_none_match.contains_weak(etag):
+        response = Response(status=304)
+    elif content_type == encoding.JSON:
+        response = Response(entry.body, status=200, mimetype=content_type)
+    else:
+        response = Response(encoding.encode(entry.payload, content_type), status=200, mimetype=content_type)
+    response.set_etag(etag)
+    response.headers['X-Cache'] = 'HIT' if entry.hit else 'MISS'
+    return response
+
+
+@app.after_request
+def compress_response(response):
+    """gzip/zstd-encode API bodies when the client advertises support."""
+    response.vary.add('Accept-Encoding')
+    if (
+        response.status_code != 200
+        or response.direct_passthrough
+        or response.is_streamed
+        or 'Content-Encoding' in response.headers
+        or response.mimetype not in (encoding.JSON, encoding.MSGPACK)
+    ):
+        return response
+    body = response.get_data()
+    if len(body) < settings.response_compression_min_bytes:
+        return response
+    content_encoding = request.accept_encodings.best_match(encoding.available_encodings())
+    if not content_encoding:
+        return response
+    response.set_data(encoding.compress(body, content_encoding))
+    response.headers['Content-Encoding'] = content_encoding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        # The compressed bytes differ from the identity representation.
+        response.set_etag(etag, weak=True)
+    return response
+
+
 @app.route('/trigger', methods=['POST'])
 @limiter.limit("10 per minute")
 def trigger():
@@ -164,11 +425,31 @@ def trigger():
                         type: string
                     limit:
                         type: integer
+                    since_id:
+                        type: integer
                     webhook_url:
                         type: string
+                    cache:
+                        type: boolean
+                        description: false bypasses the response cache
+                    async:
+                        type: boolean
+                        description: Run as a background job (also accepted as ?async=true)
+                    redeliver:
+                        type: boolean
+                        description: Forward messages this webhook already received (also accepted as ?redeliver=true)
+                    destinations:
+                        type: array
+                        items:
+                            type: string
+                        description: Extra WEBHOOK_DESTINATIONS names to fan the messages out to
     responses:
         200:
             description: Messages fetched successfully
+        202:
+            description: Job accepted; poll /jobs/<job_id>
+        304:
+            description: Unchanged since the ETag sent in If-None-Match
         400:
             description: Invalid payload
         500:
@@ -190,20 +471,199 @@ def trigger():
     if limit < 1:
         return jsonify({'error': 'limit must be greater than zero'}), 400
 
+    try:
+        since_id = int(data.get('since_id') or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'since_id must be an integer'}), 400
+
+    try:
+        destinations = _parse_destinations(data.get('destinations'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    redeliver = _truthy(request.args.get('redeliver', data.get('redeliver')))
+    if _truthy(request.args.get('async', data.get('async'))):
+        try:
+            job = telegram_service.start_history_job(
+                entity, limit, webhook_url, since_id=since_id, redeliver=redeliver, destinations=destinations
+            )
+        except JobLimitError as exc:
+            response = jsonify({'error': str(exc)})
+            response.headers['Retry-After'] = '30'
+            return response, 429
+        logger.info("Started history job %s for entity %s, limit %s", job.id, entity, limit)
+        response = jsonify(_job_body(job))
+        response.headers['Location'] = f'/jobs/{job.id}'
+        return response, 202
+
     try:
         logger.info(f"Processing request for entity: {entity}, limit: {limit}")
-        messages = telegram_service.get_last_messages(entity, limit, webhook_url)
+        # A cache hit replays every cached payload to the webhook, which is
+        # exactly what delivery cursors exist to avoid.
+        if _use_response_cache(data) and (redeliver or not telegram_service.delivery_cursors_active(webhook_url)):
+            entry = telegram_service.get_last_messages_cached(
+                entity,
+                limit,
+                webhook_url,
+                since_id=since_id,
+                redeliver=redeliver,
+                destinations=destinations,
+                client_etags=_client_etags(),
+            )
+            return _cached_json_response(entry)
+        messages = telegram_service.get_last_messages(
+            entity, limit, webhook_url, since_id=since_id, redeliver=redeliver, destinations=destinations
+        )
         logger.info(f"Retrieved {len(messages)} messages")
-        return jsonify(messages), 200
+        return _api_response(messages)
+    except BRIDGE_ERRORS:
+        raise
     except Exception as e:
         logger.error(f"Error processing request: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
 
+def _parse_batch_spec(raw, redeliver: bool = False, destinations=None) -> dict:
+    if not isinstance(raw, dict) or not raw.get('entity'):
+        raise ValueError('entity is required')
+    try:
+        limit = int(raw.get('limit', 2))
+        since_id = int(raw.get('since_id') or 0)
+    except (TypeError, ValueError):
+        raise ValueError('limit and since_id must be integers')
+    if limit < 1:
+        raise ValueError('limit must be greater than zero')
+    if since_id < 0:
+        raise ValueError('since_id must not be negative')
+    return {
+        'entity': str(raw['entity']),
+        'limit': limit,
+        'since_id': since_id,
+        'redeliver': _truthy(raw.get('redeliver', redeliver)),
+        'destinations': _parse_destinations(raw.get('destinations', destinations)),
+    }
+
+
+@app.route('/trigger/batch', methods=['POST'])
+@limiter.limit("10 per minute")
+def trigger_batch():
+    """
+    Trigger a concurrent fetch for several entities
+    ---
+    parameters:
+        - name: body
+            in: body
+            required: true
+            schema:
+                type: object
+                properties:
+                    requests:
+                        type: array
+                        items:
+                            type: object
+                            properties:
+                                entity:
+                                    type: string
+                                limit:
+                                    type: integer
+                                since_id:
+                                    type: integer
+                                redeliver:
+                                    type: boolean
+                                destinations:
+                                    type: array
+                                    items:
+                                        type: string
+                    webhook_url:
+                        type: string
+                    redeliver:
+                        type: boolean
+                        description: Default for every request; forward already delivered messages again
+                    destinations:
+                        type: array
+                        items:
+                            type: string
+                        description: Default extra destinations for every request
+                    stream:
+                        type: boolean
+    responses:
+        200:
+            description: Results grouped by entity (errors reported per entity)
+        400:
+            description: Invalid payload
+    """
+    data = request.get_json(silent=True)
+    if not data or not isinstance(data.get('requests'), list) or not data['requests']:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+    if len(data['requests']) > settings.batch_max_items:
+        return jsonify({'error': f'at most {settings.batch_max_items} requests per batch'}), 400
+
+    webhook_url = data.get('webhook_url', settings.default_webhook)
+    specs = []
+    invalid = []
+    for index, raw in enumerate(data['requests']):
+        try:
+            specs.append(_parse_batch_spec(
+                raw, redeliver=data.get('redeliver', False), destinations=data.get('destinations')
+            ))
+        except ValueError as exc:
+            entity = raw.get('entity') if isinstance(raw, dict) else None
+            invalid.append({'index': index, 'entity': entity, 'error': str(exc)})
+    if invalid:
+        return jsonify({'error': 'invalid requests', 'details': invalid}), 400
+
+    logger.info("Processing batch trigger for %s entities", len(specs))
+    if data.get('stream'):
+        # Admitted before the response starts, so a saturated bridge still
+        # answers 503; the slot is returned when the response is closed.
+        results = telegram_service.iter_batch(specs, webhook_url)
+
+        def generate():
+            for result in results:
+                yield encoding.json_dumps(result) + b"\n"
+
+        response = Response(generate(), mimetype='application/x-ndjson')
+        response.call_on_close(results.close)
+        return response
+
+    results = telegram_service.get_batch(specs, webhook_url)
+    return _api_response({'results': results})
+
+
+def _parse_message_ids(values) -> list:
+    ids = []
+    for value in values:
+        for part in str(value).split(','):
+            part = part.strip()
+            if part:
+                ids.append(int(part))
+    return ids
+
+
+def _bulk_message_response(lookups, webhook_url, data=None, destinations=()):
+    if len(lookups) > settings.message_max_ids:
+        return jsonify({'error': f'at most {settings.message_max_ids} message ids per request'}), 400
+    try:
+        logger.info("Fetching %s messages in bulk", len(lookups))
+        if _use_response_cache(data):
+            return _cached_json_response(
+                telegram_service.get_messages_by_ids_cached(
+                    lookups, webhook_url, destinations, client_etags=_client_etags()
+                )
+            )
+        result = telegram_service.get_messages_by_ids(lookups, webhook_url, destinations)
+        return _api_response(result)
+    except BRIDGE_ERRORS:
+        raise
+    except Exception as e:  # noqa: BLE001
+        logger.error("Error fetching messages in bulk: %s", e)
+        return jsonify({'error': str(e)}), 500
+
+
 @app.route('/message', methods=['GET'])
 def get_message():
     """
-    Get a message by ID
+    Get one or more messages by ID
     ---
     parameters:
         - name: entity
@@ -213,14 +673,20 @@ def get_message():
         - name: message_id
             in: query
             required: true
-            type: integer
+            type: string
+            description: One id, a comma-separated list, or the parameter repeated
         - name: webhook_url
             in: query
             required: false
             type: string
+        - name: destinations
+            in: query
+            required: false
+            type: string
+            description: Comma-separated WEBHOOK_DESTINATIONS names to fan the messages out to
     responses:
         200:
-            description: Message fetched successfully
+            description: Message(s) fetched successfully
         400:
             description: Invalid request
         404:
@@ -229,31 +695,525 @@ def get_message():
             description: Internal error
     """
     entity = request.args.get('entity')
-    message_id = request.args.get('message_id')
+    message_ids = request.args.getlist('message_id')
     webhook_url = request.args.get('webhook_url', settings.default_webhook)
 
     if not entity:
         return jsonify({'error': 'entity is required'}), 400
 
-    if not message_id:
+    if not message_ids:
         return jsonify({'error': 'message_id is required'}), 400
 
     try:
-        int_message_id = int(message_id)
+        int_message_ids = _parse_message_ids(message_ids)
     except ValueError:
         return jsonify({'error': 'message_id must be an integer'}), 400
 
+    if not int_message_ids:
+        return jsonify({'error': 'message_id is required'}), 400
+
+    try:
+        destinations = _parse_destinations(request.args.get('destinations'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    if len(int_message_ids) > 1:
+        return _bulk_message_response(
+            [(entity, message_id) for message_id in int_message_ids], webhook_url, destinations=destinations
+        )
+
+    int_message_id = int_message_ids[0]
     try:
         logger.info("Fetching message %s for entity %s", int_message_id, entity)
-        message = telegram_service.get_message_by_id(entity, int_message_id, webhook_url)
+        if _use_response_cache():
+            entry = telegram_service.get_message_by_id_cached(
+                entity, int_message_id, webhook_url, destinations, client_etags=_client_etags()
+            )
+            if entry.payload is None:
+                return jsonify({'error': 'Message not found'}), 404
+            return _cached_json_response(entry)
+        message = telegram_service.get_message_by_id(entity, int_message_id, webhook_url, destinations)
         if not message:
             return jsonify({'error': 'Message not found'}), 404
-        return jsonify([message]), 200
+        return _api_response([message])
+    except BRIDGE_ERRORS:
+        raise
     except Exception as e:  # noqa: BLE001
         logger.error("Error fetching message %s for %s: %s", int_message_id, entity, e)
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/message', methods=['POST'])
+def get_messages_bulk():
+    """
+    Get many messages by ID across one or more entities
+    ---
+    parameters:
+        - name: body
+            in: body
+            required: true
+            schema:
+                type: object
+                properties:
+                    requests:
+                        type: array
+                        items:
+                            type: object
+                            properties:
+                                entity:
+                                    type: string
+                                message_ids:
+                                    type: array
+                                    items:
+                                        type: integer
+                    webhook_url:
+                        type: string
+                    destinations:
+                        type: array
+                        items:
+                            type: string
+    responses:
+        200:
+            description: Found messages in request order plus explicit missing ids
+        400:
+            description: Invalid request
+        500:
+            description: Internal error
+    """
+    data = request.get_json(silent=True)
+    if not data:
+        return jsonify({'error': 'JSON body is required'}), 400
+
+    groups = data.get('requests')
+    if groups is None and 'entity' in data:
+        groups = [{'entity': data['entity'], 'message_ids': data.get('message_ids')}]
+    if not isinstance(groups, list) or not groups:
+        return jsonify({'error': 'requests must be a non-empty list'}), 400
+
+    lookups = []
+    for group in groups:
+        if not isinstance(group, dict) or not group.get('entity'):
+            return jsonify({'error': 'entity is required for every request'}), 400
+        ids = group.get('message_ids')
+        if not isinstance(ids, list) or not ids:
+            return jsonify({'error': 'message_ids must be a non-empty list'}), 400
+        try:
+            lookups.extend((str(group['entity']), int(message_id)) for message_id in ids)
+        except (TypeError, ValueError):
+            return jsonify({'error': 'message_ids must be integers'}), 400
+
+    try:
+        destinations = _parse_destinations(data.get('destinations'))
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    webhook_url = data.get('webhook_url', settings.default_webhook)
+    return _bulk_message_response(lookups, webhook_url, data, destinations)
+
+
+@app.route('/search', methods=['GET'])
+def search_messages():
+    """
+    Full-text search over indexed messages
+    ---
+    parameters:
+        - name: q
+            in: query
+            type: string
+            required: true
+            description: FTS5 query (words, "phrases", OR, NOT, prefix*)
+        - name: entity
+            in: query
+            type: string
+        - name: from
+            in: query
+            type: string
+            description: ISO date/datetime, inclusive
+        - name: to
+            in: query
+            type: string
+            description: ISO date/datetime, exclusive
+        - name: limit
+            in: query
+            type: integer
+        - name: offset
+            in: query
+            type: integer
+    responses:
+        200:
+            description: Matches ranked by relevance
+        400:
+            description: Invalid parameters
+        503:
+            description: Search index disabled
+    """
+    index = telegram_service.search_index
+    if index is None:
+        return jsonify({'error': 'Search index is disabled'}), 503
+
+    query = (request.args.get('q') or '').strip()
+    if not query:
+        return jsonify({'error': 'q is required'}), 400
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 20))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({'error': 'offset must be >= 0 and limit > 0'}), 400
+    limit = min(limit, SEARCH_PAGE_MAX)
+    try:
+        date_from = parse_date(request.args['from']) if request.args.get('from') else None
+        date_to = parse_date(request.args['to']) if request.args.get('to') else None
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    result = index.search(
+        query,
+        entity=request.args.get('entity'),
+        date_from=date_from,
+        date_to=date_to,
+        limit=limit,
+        offset=offset,
+    )
+    next_offset = offset + len(result['results'])
+    return _api_response({
+        'query': query,
+        'total': result['total'],
+        'offset': offset,
+        'results': result['results'],
+        'next_offset': next_offset if next_offset < result['total'] else None,
+    })
+
+
+@app.route('/cursors', methods=['GET'])
+def list_cursors():
+    """
+    Delivery cursors per webhook and channel
+    ---
+    parameters:
+        - name: webhook_url
+            in: query
+            type: string
+        - name: entity
+            in: query
+            type: string
+    responses:
+        200:
+            description: Last delivered id and delivered id ranges per (webhook, channel)
+        503:
+            description: Delivery cursors disabled
+    """
+    cursors = telegram_service.delivery_cursors
+    if cursors is None:
+        return jsonify({'error': 'Delivery cursors are disabled'}), 503
+    return jsonify({
+        'cursors': cursors.list(request.args.get('webhook_url'), request.args.get('entity')),
+    }), 200
+
+
+@app.route('/cursors', methods=['DELETE'])
+def reset_cursors():
+    """
+    Forget deliveries so the next pulls forward those messages again
+    ---
+    parameters:
+        - name: webhook_url
+            in: query
+            type: string
+        - name: entity
+            in: query
+            type: string
+    responses:
+        200:
+            description: Number of cursors removed
+        503:
+            description: Delivery cursors disabled
+    """
+    cursors = telegram_service.delivery_cursors
+    if cursors is None:
+        return jsonify({'error': 'Delivery cursors are disabled'}), 503
+    removed = cursors.reset(request.args.get('webhook_url'), request.args.get('entity'))
+    logger.info("Reset %s delivery cursors", removed)
+    return jsonify({'reset': removed}), 200
+
+
+@app.route('/jobs', methods=['GET'])
+def list_jobs():
+    """
+    List background jobs that have not expired yet
+    ---
+    responses:
+        200:
+            description: Jobs, newest first
+    """
+    return jsonify({'jobs': [_job_body(job) for job in telegram_service.jobs.list()]}), 200
+
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id: str):
+    """
+    Job status and progress (pages, messages, media)
+    ---
+    parameters:
+        - name: job_id
+            in: path
+            required: true
+            type: string
+    responses:
+        200:
+            description: Job status
+        404:
+            description: Unknown or expired job
+    """
+    job = telegram_service.jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(_job_body(job)), 200
+
+
+@app.route('/jobs/<job_id>/result', methods=['GET'])
+def get_job_result(job_id: str):
+    """
+    Job results so far, paged or streamed as NDJSON
+    ---
+    parameters:
+        - name: job_id
+            in: path
+            required: true
+            type: string
+        - name: offset
+            in: query
+            type: integer
+        - name: limit
+            in: query
+            type: integer
+        - name: stream
+            in: query
+            type: boolean
+            description: Stream every item as NDJSON, following the job until it ends
+    responses:
+        200:
+            description: Items in fetch order
+        404:
+            description: Unknown or expired job
+    """
+    job = telegram_service.jobs.get(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+
+    if _truthy(request.args.get('stream')):
+        def generate():
+            for item in job.follow():
+                # Blank lines are keep-alives while the job is still fetching.
+                yield b"\n" if item is None else encoding.json_dumps(item) + b"\n"
+
+        return Response(generate(), mimetype='application/x-ndjson')
+
+    try:
+        offset = int(request.args.get('offset', 0))
+        limit = int(request.args.get('limit', 100))
+    except ValueError:
+        return jsonify({'error': 'offset and limit must be integers'}), 400
+    if offset < 0 or limit < 1:
+        return jsonify({'error': 'offset must be >= 0 and limit > 0'}), 400
+    limit = min(limit, JOB_RESULT_PAGE_MAX)
+
+    status = job.status
+    items = job.slice(offset, limit)
+    next_offset = offset + len(items)
+    return _api_response({
+        'job_id': job.id,
+        'status': status,
+        'offset': offset,
+        'items': items,
+        'next_offset': next_offset if (len(items) == limit or status == 'running') else None,
+    })
+
+
+@app.route('/jobs/<job_id>', methods=['DELETE'])
+def delete_job(job_id: str):
+    """
+    Cancel a running job and discard its results
+    ---
+    parameters:
+        - name: job_id
+            in: path
+            required: true
+            type: string
+    responses:
+        200:
+            description: Job cancelled/removed
+        404:
+            description: Unknown or expired job
+    """
+    job = telegram_service.jobs.delete(job_id)
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify({'job_id': job.id, 'status': job.status, 'deleted': True}), 200
+
+
+def _export_body(export) -> dict:
+    body = export.snapshot()
+    if body.get('status') == 'running' and not telegram_service.export_running(export.id):
+        body['status'] = 'interrupted'
+    body['path'] = export.directory
+    return body
+
+
+@app.route('/exports', methods=['POST'])
+def create_export():
+    """
+    Start a resumable full-history (or participant) export to NDJSON or Parquet part files
+    ---
+    parameters:
+        - name: body
+            in: body
+            required: true
+            schema:
+                type: object
+                properties:
+                    entity:
+                        type: string
+                    kind:
+                        type: string
+                        enum: [history, participants]
+                        description: participants exports every member as NDJSON
+                    format:
+                        type: string
+                        enum: [ndjson, parquet]
+                    media:
+                        type: boolean
+                        description: Also download photos (in parallel) and record their paths
+                    min_id:
+                        type: integer
+                        description: Stop at this message id (exclusive)
+    responses:
+        202:
+            description: Export started
+        400:
+            description: Invalid payload
+        429:
+            description: Too many exports running
+    """
+    data = request.get_json(silent=True) or {}
+    if not data.get('entity'):
+        return jsonify({'error': 'entity is required'}), 400
+    try:
+        min_id = int(data.get('min_id') or 0)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'min_id must be an integer'}), 400
+
+    try:
+        export = telegram_service.start_export(
+            str(data['entity']),
+            fmt=str(data.get('format', 'ndjson')).lower(),
+            media=_truthy(data.get('media', False)),
+            min_id=min_id,
+            kind=str(data.get('kind', 'history')).lower(),
+        )
+    except JobLimitError as exc:
+        response = jsonify({'error': str(exc)})
+        response.headers['Retry-After'] = '60'
+        return response, 429
+    except ValueError as exc:
+        return jsonify({'error': str(exc)}), 400
+
+    logger.info("Started export %s of %s", export.id, data['entity'])
+    response = jsonify(_export_body(export))
+    response.headers['Location'] = f'/exports/{export.id}'
+    return response, 202
+
+
+@app.route('/exports', methods=['GET'])
+def list_exports():
+    """
+    List exports stored under EXPORTS_DIR
+    ---
+    responses:
+        200:
+            description: Exports, newest first
+    """
+    return jsonify({'exports': [_export_body(export) for export in telegram_service.exports.list()]}), 200
+
+
+@app.route('/exports/<export_id>', methods=['GET'])
+def get_export(export_id: str):
+    """
+    Export status: cursor, messages written and finished part files
+    ---
+    parameters:
+        - name: export_id
+            in: path
+            required: true
+            type: string
+    responses:
+        200:
+            description: Export manifest
+        404:
+            description: Unknown export
+    """
+    export = telegram_service.exports.get(export_id)
+    if export is None:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(_export_body(export)), 200
+
+
+@app.route('/exports/<export_id>/resume', methods=['POST'])
+def resume_export(export_id: str):
+    """
+    Resume a cancelled, failed or interrupted export from its last checkpoint
+    ---
+    parameters:
+        - name: export_id
+            in: path
+            required: true
+            type: string
+    responses:
+        202:
+            description: Export resumed
+        404:
+            description: Unknown export
+        429:
+            description: Too many exports running
+    """
+    try:
+        export = telegram_service.resume_export(export_id)
+    except JobLimitError as exc:
+        return jsonify({'error': str(exc)}), 429
+    if export is None:
+        return jsonify({'error': 'Export not found'}), 404
+    return jsonify(_export_body(export)), 202
+
+
+@app.route('/exports/<export_id>', methods=['DELETE'])
+def delete_export(export_id: str):
+    """
+    Cancel an export; ?purge=true also deletes its files
+    ---
+    parameters:
+        - name: export_id
+            in: path
+            required: true
+            type: string
+        - name: purge
+            in: query
+            type: boolean
+    responses:
+        200:
+            description: Export cancelled (or deleted)
+        404:
+            description: Unknown export
+    """
+    purge = _truthy(request.args.get('purge'))
+    export = telegram_service.cancel_export(export_id, purge=purge)
+    if export is None:
+        return jsonify({'error': 'Export not found'}), 404
+    if purge:
+        return jsonify({'id': export_id, 'deleted': True}), 200
+    return jsonify(_export_body(export)), 200
+
+
 @app.route('/media/<token>', methods=['GET'])
 def serve_media(token: str):
     """
@@ -338,8 +1298,17 @@ def health_check():
         })
 
     # Verificar conexión Telegram
+    if not telegram_service.ready:
+        startup = telegram_service.startup_status()
+        issues.append({
+            "component": "telegram_client",
+            "status": "starting",
+            "attempts": startup["attempts"],
+            "last_error": startup["last_error"],
+            "fix": "Check logs and verify session is authorized",
+        })
     try:
-        telegram_connected = telegram_service._client and telegram_service._client.is_connected()
+        telegram_connected = bool(telegram_service._client and telegram_service._client.is_connected())
     except Exception:  # noqa: BLE001
         telegram_connected = False
         issues.append({
@@ -358,30 +1327,148 @@ def health_check():
     return jsonify({
         "status": "healthy",
         "telegram_connected": telegram_connected,
+        "listener": telegram_service.listener_stats(),
+        "bridge": telegram_service.admission.stats(),
+        "destinations": telegram_service.destination_stats(),
+        "response_cache": telegram_service.response_cache.stats() if telegram_service.response_cache.enabled else None,
+        "search_index": telegram_service.search_index.stats() if telegram_service.search_index else None,
         "timestamp": datetime.utcnow().isoformat(),
     }), 200
 
 
+@app.route('/health/live', methods=['GET'])
+@limiter.exempt
+def health_live():
+    """
+    Liveness probe: the process is up and its event loop thread is running
+    ---
+    responses:
+        200:
+            description: Alive (Telegram may still be connecting)
+        503:
+            description: The event loop thread died; restart the container
+    """
+    if not telegram_service.startup_status()["loop_alive"]:
+        return jsonify({"status": "dead"}), 503
+    return jsonify({"status": "alive"}), 200
+
+
+@app.route('/health/ready', methods=['GET'])
+@limiter.exempt
+def health_ready():
+    """
+    Readiness probe: the Telegram client is connected and authorised
+    ---
+    responses:
+        200:
+            description: Ready to serve Telegram requests
+        503:
+            description: Still connecting; see attempts and last_error
+    """
+    status = telegram_service.startup_status()
+    if not status["ready"]:
+        response = jsonify({"status": "starting", **status})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+    return jsonify({"status": "ready", **status}), 200
+
+
 @app.route('/last-response', methods=['GET'])
 def get_last_response():
     """
-    Get the last webhook payload
+    Get recent webhook deliveries
     ---
+    parameters:
+        - name: n
+            in: query
+            type: integer
+            description: Return the last n deliveries (newest first) with their metadata
+        - name: entity
+            in: query
+            type: string
+        - name: destination
+            in: query
+            type: string
+            description: Webhook URL the payload was sent to
     responses:
         200:
-            description: Payload returned
-        500:
-            description: Internal error
+            description: Last payload, or {deliveries} when n is given
+        400:
+            description: Invalid parameters
     """
+    entity = request.args.get('entity')
+    destination = request.args.get('destination')
+    raw_n = request.args.get('n')
     try:
-        with open(os.path.join(settings.data_dir, 'last_response.json'), 'r') as f:
-            data = json.load(f)
-        return jsonify(data), 200
-    except FileNotFoundError:
+        n = int(raw_n) if raw_n is not None else 1
+    except ValueError:
+        return jsonify({'error': 'n must be an integer'}), 400
+    if n < 1:
+        return jsonify({'error': 'n must be greater than zero'}), 400
+
+    deliveries = delivery_log.recent(min(n, delivery_log.capacity), entity=entity, destination=destination)
+    if raw_n is not None:
+        return _api_response({'deliveries': deliveries})
+    if not deliveries:
         return jsonify({'message': 'No response yet'}), 200
-    except Exception as e:
-        logger.error("Error reading last response: %s", e)
-        return jsonify({'error': 'Internal error'}), 500
+    return _api_response(deliveries[0]['payload'])
+
+
+@app.route('/admin/profile', methods=['GET'])
+def admin_profile():
+    """
+    Sample the stacks of every thread (collapsed format for flame graphs)
+    ---
+    parameters:
+      - name: seconds
+        in: query
+        type: number
+        default: 10
+      - name: interval_ms
+        in: query
+        type: number
+        default: 10
+      - name: thread
+        in: query
+        type: string
+        description: Restrict to a thread name (repeatable), e.g. TelegramServiceLoop
+    responses:
+      200:
+        description: Collapsed stacks, one "frame;frame;... count" line each
+      400:
+        description: Invalid parameters
+    """
+    try:
+        seconds = float(request.args.get('seconds', 10))
+        interval_ms = float(request.args.get('interval_ms', 10))
+    except ValueError:
+        return jsonify({'error': 'seconds and interval_ms must be numbers'}), 400
+    if seconds <= 0 or interval_ms <= 0:
+        return jsonify({'error': 'seconds and interval_ms must be positive'}), 400
+
+    seconds = min(seconds, settings.profile_max_seconds)
+    threads = set(request.args.getlist('thread')) or None
+    logger.info("Profiling threads for %.1fs every %.0fms", seconds, interval_ms)
+    samples = sample_stacks(seconds, interval_ms / 1000, thread_names=threads)
+    return Response(collapse(samples), mimetype='text/plain')
+
+
+@app.route('/admin/tasks', methods=['GET'])
+def admin_tasks():
+    """
+    List pending asyncio tasks on the Telethon loop with their await chains
+    ---
+    responses:
+      200:
+        description: Task dump
+      504:
+        description: The loop did not answer in time (it is probably blocked)
+    """
+    try:
+        tasks = telegram_service.describe_tasks()
+    except TimeoutError:
+        return jsonify({'error': 'Event loop did not respond; check the watchdog logs'}), 504
+    return jsonify({'count': len(tasks), 'tasks': tasks}), 200
 
 
 @app.errorhandler(500)
@@ -0,0 +1,122 @@
+import threading
+import time
+from typing import Callable, Dict, Iterator, Optional
+
+from . import metrics
+
+
+class AdmissionRejectedError(RuntimeError):
+    """Raised when every bridge slot is busy and the wait queue is full."""
+
+
+class DeadlineExceededError(TimeoutError):
+    """Raised when a bridge call did not finish before its request deadline."""
+
+
+def remaining(deadline: Optional[float]) -> Optional[float]:
+    """Seconds left until the ``time.monotonic()`` ``deadline`` (``None``: no deadline)."""
+    if deadline is None:
+        return None
+    return max(0.0, deadline - time.monotonic())
+
+
+class BridgeAdmission:
+    """Bounded admission in front of the Telethon loop.
+
+    At most ``max_in_flight`` Flask threads have work running on the loop;
+    up to ``max_queued`` more wait for a slot until their deadline. Anything
+    beyond that is rejected at once, so overload turns into fast 503s instead
+    of a backlog that makes every request slow.
+    """
+
+    def __init__(self, max_in_flight: int, max_queued: int) -> None:
+        self.max_in_flight = max_in_flight
+        self.max_queued = max_queued
+        self._slots = threading.BoundedSemaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._in_flight = 0
+        self._rejected = 0
+
+    def acquire(self, deadline: Optional[float], operation: str) -> Callable[[], None]:
+        """Wait for a slot; returns an idempotent ``release`` callable.
+
+        Raises ``AdmissionRejectedError`` when the queue is full and
+        ``DeadlineExceededError`` when no slot freed up before ``deadline``.
+        """
+        with self._lock:
+            if not self._slots.acquire(blocking=False):
+                if self._queued >= self.max_queued:
+                    self._rejected += 1
+                    metrics.BRIDGE_REJECTED.labels(operation).inc()
+                    raise AdmissionRejectedError("Too many requests in progress; retry shortly")
+                self._queued += 1
+                metrics.BRIDGE_QUEUED.set(self._queued)
+                acquired = False
+            else:
+                acquired = True
+        if not acquired:
+            try:
+                acquired = self._slots.acquire(timeout=remaining(deadline))
+            finally:
+                with self._lock:
+                    self._queued -= 1
+                    metrics.BRIDGE_QUEUED.set(self._queued)
+            if not acquired:
+                metrics.BRIDGE_TIMEOUTS.labels(operation).inc()
+                raise DeadlineExceededError("Timed out waiting for a free slot on the Telegram loop")
+        with self._lock:
+            self._in_flight += 1
+            metrics.BRIDGE_IN_FLIGHT.set(self._in_flight)
+
+        released = False
+
+        def release() -> None:
+            nonlocal released
+            with self._lock:
+                if released:
+                    return
+                released = True
+                self._in_flight -= 1
+                metrics.BRIDGE_IN_FLIGHT.set(self._in_flight)
+            self._slots.release()
+
+        return release
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "in_flight": self._in_flight,
+                "queued": self._queued,
+                "max_in_flight": self.max_in_flight,
+                "max_queued": self.max_queued,
+                "rejected": self._rejected,
+            }
+
+
+class AdmittedIterator:
+    """Iterator holding an admission slot until it is exhausted or closed.
+
+    Streaming responses should register ``close`` with the response so the
+    slot is returned even when the body is never iterated.
+    """
+
+    def __init__(self, iterator: Iterator, release: Callable[[], None]) -> None:
+        self._iterator = iterator
+        self._release = release
+
+    def __iter__(self) -> "AdmittedIterator":
+        return self
+
+    def __next__(self):
+        try:
+            return next(self._iterator)
+        except BaseException:
+            self.close()
+            raise
+
+    def close(self) -> None:
+        close = getattr(self._iterator, "close", None)
+        if close is not None:
+            close()
+        self._release()
@@ -0,0 +1,110 @@
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+# Telegram caps albums at ten items, which bounds how far past a page boundary
+# we need to look to complete a split album.
+ALBUM_MAX_PARTS = 10
+
+
+def grouped_id_of(message: Any) -> Optional[int]:
+    return getattr(message, "grouped_id", None) or None
+
+
+def group_albums(messages: List[Any]) -> List[List[Any]]:
+    """Collapse consecutive messages sharing a ``grouped_id`` into one group."""
+    groups: List[List[Any]] = []
+    for message in messages:
+        grouped_id = grouped_id_of(message)
+        if grouped_id and groups and grouped_id_of(groups[-1][0]) == grouped_id:
+            groups[-1].append(message)
+        else:
+            groups.append([message])
+    return groups
+
+
+def merge_album(parts: List[Dict]) -> Dict:
+    """Build one payload out of the serialised parts of an album.
+
+    The captioned part (or the first one) is used as the base payload so the
+    shape stays compatible with single messages; an ``album`` section lists
+    every part id and all media ``download_info`` entries.
+    """
+    ordered = sorted(parts, key=lambda part: part.get("id") or 0)
+    primary = next((part for part in ordered if part.get("message")), ordered[0])
+
+    combined = dict(primary)
+    combined["album"] = {
+        "grouped_id": primary.get("grouped_id"),
+        "message_ids": [part.get("id") for part in ordered],
+        "caption": primary.get("message") or "",
+        "media": [
+            part["media"]["download_info"]
+            for part in ordered
+            if isinstance(part.get("media"), dict) and part["media"].get("download_info")
+        ],
+    }
+    return combined
+
+
+class AlbumAggregator:
+    """Buffers live album parts by ``grouped_id`` for a short window.
+
+    Telegram delivers an album as separate updates that arrive within a few
+    hundred milliseconds. Each new part restarts the window; once it elapses
+    (or the album reaches ``ALBUM_MAX_PARTS``) the parts are emitted together.
+    Messages without a ``grouped_id`` are emitted straight away.
+    """
+
+    def __init__(self, window_seconds: float, emit: Callable[[List[Any]], Awaitable[Any]]) -> None:
+        self._window = window_seconds
+        self._emit = emit
+        self._pending: Dict[int, List[Any]] = {}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._flushing: Set[asyncio.Task] = set()
+
+    async def add(self, message: Any) -> None:
+        grouped_id = grouped_id_of(message)
+        if not grouped_id or self._window <= 0:
+            await self._emit([message])
+            return
+
+        parts = self._pending.setdefault(grouped_id, [])
+        parts.append(message)
+
+        timer = self._timers.pop(grouped_id, None)
+        if timer is not None:
+            timer.cancel()
+
+        if len(parts) >= ALBUM_MAX_PARTS:
+            await self._emit(self._take(grouped_id))
+            return
+
+        loop = asyncio.get_running_loop()
+        self._timers[grouped_id] = loop.call_later(self._window, self._flush, grouped_id)
+
+    def _take(self, grouped_id: int) -> List[Any]:
+        self._timers.pop(grouped_id, None)
+        parts = self._pending.pop(grouped_id, [])
+        parts.sort(key=lambda message: getattr(message, "id", 0))
+        return parts
+
+    def _flush(self, grouped_id: int) -> None:
+        parts = self._take(grouped_id)
+        if not parts:
+            return
+        task = asyncio.ensure_future(self._emit(parts))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def flush_all(self) -> None:
+        """Emit every buffered album now, without waiting for its window."""
+        for grouped_id in list(self._pending):
+            timer = self._timers.get(grouped_id)
+            if timer is not None:
+                timer.cancel()
+            parts = self._take(grouped_id)
+            if parts:
+                await self._emit(parts)
@@ -0,0 +1,182 @@
+import dataclasses
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+from typing import Any, Dict, FrozenSet, Hashable, Iterable, List, Optional, Set, Tuple
+
+from . import metrics
+from .encoding import json_dumps
+
+
+@dataclasses.dataclass(frozen=True)
+class CachedResponse:
+    payload: Any
+    body: bytes
+    etag: str
+    peers: FrozenSet[int] = frozenset()
+    expires_at: float = 0.0
+    hit: bool = False
+
+
+def compute_etag(items: Iterable[Dict]) -> str:
+    """ETag built from the highest message id plus every (id, edit_date) pair.
+
+    New messages raise the max id and edits change an ``edit_date``, so the
+    tag only changes when the visible content does.
+    """
+    digest = hashlib.sha1()
+    max_id = 0
+    for item in items:
+        message_id = int(item.get("id") or 0)
+        max_id = max(max_id, message_id)
+        digest.update(f"{message_id}:{item.get('edit_date') or ''};".encode())
+    return f"{max_id}-{digest.hexdigest()[:16]}"
+
+
+class LRUCache:
+    """Mapping bounded to ``max_entries`` (least recently used evicted first)
+    whose entries expire ``ttl_seconds`` after being set (``0``: never).
+
+    Not locked: the service only touches it from the Telethon loop.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0.0) -> None:
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl_seconds
+        self._entries: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if self.ttl > 0 and expires_at <= time.monotonic():
+            del self._entries[key]
+            return default
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any) -> None:
+        self._entries.pop(key, None)
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def pop(self, key: Hashable, default: Any = None) -> Any:
+        entry = self._entries.pop(key, None)
+        return default if entry is None else entry[1]
+
+
+class ResponseCache:
+    """TTL + LRU cache of encoded API responses, bounded by total body bytes.
+
+    Entries are tagged with the Telegram peer ids they were built from so the
+    listener can drop everything about a channel as soon as it posts. Each
+    peer also carries a generation counter: a fetch that started before an
+    invalidation is not stored, which keeps a slow miss from re-caching data
+    that is already stale.
+    """
+
+    def __init__(self, ttl_seconds: float, max_bytes: int) -> None:
+        self.ttl = ttl_seconds
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedResponse]" = OrderedDict()
+        self._keys_by_peer: Dict[int, Set[Hashable]] = {}
+        self._generations: Dict[int, int] = {}
+        self._size = 0
+        self._lock = Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0 and self.max_bytes > 0
+
+    def build(self, payload: Any, items: List[Dict], peers: Iterable[int] = ()) -> CachedResponse:
+        body = json_dumps(payload)
+        return CachedResponse(
+            payload=payload,
+            body=body,
+            etag=compute_etag(items),
+            peers=frozenset(peers),
+            expires_at=time.monotonic() + self.ttl,
+        )
+
+    def get(self, key: Hashable) -> Optional[CachedResponse]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                metrics.RESPONSE_CACHE_REQUESTS.labels("miss").inc()
+                return None
+            if entry.expires_at <= time.monotonic():
+                self._remove(key, "expired")
+                metrics.RESPONSE_CACHE_REQUESTS.labels("miss").inc()
+                return None
+            self._entries.move_to_end(key)
+        metrics.RESPONSE_CACHE_REQUESTS.labels("hit").inc()
+        return dataclasses.replace(entry, hit=True)
+
+    def generation(self, peers: Iterable[int]) -> Tuple[int, ...]:
+        with self._lock:
+            return tuple(self._generations.get(peer, 0) for peer in sorted(peers))
+
+    def put(self, key: Hashable, entry: CachedResponse, generation: Tuple[int, ...]) -> bool:
+        size = len(entry.body)
+        if size > self.max_bytes:
+            return False
+        with self._lock:
+            current = tuple(self._generations.get(peer, 0) for peer in sorted(entry.peers))
+            if current != generation:
+                return False
+            if key in self._entries:
+                self._remove(key, None)
+            self._entries[key] = entry
+            self._size += size
+            for peer in entry.peers:
+                self._keys_by_peer.setdefault(peer, set()).add(key)
+            while self._size > self.max_bytes:
+                self._remove(next(iter(self._entries)), "lru")
+            metrics.RESPONSE_CACHE_BYTES.set(self._size)
+        return True
+
+    def invalidate_peer(self, peer_id: int) -> int:
+        with self._lock:
+            self._generations[peer_id] = self._generations.get(peer_id, 0) + 1
+            keys = list(self._keys_by_peer.get(peer_id, ()))
+            for key in keys:
+                self._remove(key, "invalidated")
+            metrics.RESPONSE_CACHE_BYTES.set(self._size)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._keys_by_peer.clear()
+            self._size = 0
+            metrics.RESPONSE_CACHE_BYTES.set(0)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl,
+            }
+
+    def _remove(self, key: Hashable, reason: Optional[str]) -> None:
+        # Caller holds the lock.
+        entry = self._entries.pop(key, None)
+        if entry is None:
+            return
+        self._size -= len(entry.body)
+        for peer in entry.peers:
+            keys = self._keys_by_peer.get(peer)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._keys_by_peer[peer]
+        if reason:
+            metrics.RESPONSE_CACHE_EVICTIONS.labels(reason).inc()
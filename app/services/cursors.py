@@ -0,0 +1,135 @@
+import bisect
+from datetime import datetime, timezone
+from threading import Lock
+from typing import Any, Dict, Iterable, List, Optional
+
+from .search import normalise_entity
+from .state import JsonStateFile
+
+# Past this many disjoint ranges the two lowest are merged, i.e. the gap
+# between them is treated as delivered. Old gaps are rarely re-fetched, and
+# this keeps a cursor a few KiB at most however ids arrive.
+MAX_RANGES = 1000
+
+
+class IdRanges:
+    """Sorted, merged ``[start, end]`` id ranges (both inclusive)."""
+
+    def __init__(self, ranges: Optional[Iterable[Iterable[int]]] = None) -> None:
+        self._starts: List[int] = []
+        self._ends: List[int] = []
+        for start, end in ranges or ():
+            self.add(int(start), int(end))
+
+    def __contains__(self, message_id: int) -> bool:
+        index = bisect.bisect_right(self._starts, message_id) - 1
+        return index >= 0 and self._ends[index] >= message_id
+
+    def __len__(self) -> int:
+        return len(self._starts)
+
+    @property
+    def max(self) -> int:
+        return self._ends[-1] if self._ends else 0
+
+    def add(self, start: int, end: Optional[int] = None) -> None:
+        end = start if end is None else end
+        if end < start:
+            start, end = end, start
+        # First range that could touch [start, end] (adjacent ids merge too).
+        lo = bisect.bisect_left(self._ends, start - 1)
+        hi = bisect.bisect_right(self._starts, end + 1)
+        if lo < hi:
+            start = min(start, self._starts[lo])
+            end = max(end, self._ends[hi - 1])
+        self._starts[lo:hi] = [start]
+        self._ends[lo:hi] = [end]
+        while len(self._starts) > MAX_RANGES:
+            self._ends[0] = self._ends[1]
+            del self._starts[1], self._ends[1]
+
+    def to_list(self) -> List[List[int]]:
+        return [[start, end] for start, end in zip(self._starts, self._ends)]
+
+
+class DeliveryCursors:
+    """Which message ids were already delivered to each (webhook, peer).
+
+    Kept in a ``JsonStateFile`` keyed by ``"<peer_id>|<webhook_url>"``; the
+    in-memory ``IdRanges`` are the source of truth and are copied into the
+    state on every update, which ``save_soon`` then persists.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._state = JsonStateFile(path)
+        self._lock = Lock()
+        self._ranges: Dict[str, IdRanges] = {
+            key: IdRanges(value.get("seen") or ())
+            for key, value in self._state.snapshot().items()
+            if isinstance(value, dict)
+        }
+
+    @property
+    def state(self) -> JsonStateFile:
+        return self._state
+
+    @staticmethod
+    def key(webhook_url: str, peer_id: int) -> str:
+        return f"{peer_id}|{webhook_url}"
+
+    def seen(self, key: str, message_ids: Iterable[int]) -> bool:
+        """True when every id in ``message_ids`` was already delivered."""
+        with self._lock:
+            ranges = self._ranges.get(key)
+            return ranges is not None and all(message_id in ranges for message_id in message_ids)
+
+    def record(
+        self,
+        key: str,
+        webhook_url: str,
+        peer_id: int,
+        entity: Optional[str],
+        start: int,
+        end: Optional[int] = None,
+    ) -> None:
+        with self._lock:
+            ranges = self._ranges.setdefault(key, IdRanges())
+            ranges.add(start, end)
+            previous = self._state.get(key) or {}
+            self._state.set(key, {
+                "webhook_url": webhook_url,
+                "peer_id": peer_id,
+                "entity": previous.get("entity") or entity,
+                "last_id": ranges.max,
+                "seen": ranges.to_list(),
+                "updated_at": datetime.now(timezone.utc).isoformat(),
+            })
+
+    def _matches(self, value: Dict[str, Any], webhook_url: Optional[str], entity: Optional[str]) -> bool:
+        if webhook_url is not None and value.get("webhook_url") != webhook_url:
+            return False
+        if entity is not None:
+            wanted = normalise_entity(entity)
+            if wanted not in (normalise_entity(value.get("entity")), str(value.get("peer_id"))):
+                return False
+        return True
+
+    def list(self, webhook_url: Optional[str] = None, entity: Optional[str] = None) -> List[Dict[str, Any]]:
+        return [
+            value
+            for value in self._state.snapshot().values()
+            if isinstance(value, dict) and self._matches(value, webhook_url, entity)
+        ]
+
+    def reset(self, webhook_url: Optional[str] = None, entity: Optional[str] = None) -> int:
+        with self._lock:
+            keys = [
+                key
+                for key, value in self._state.snapshot().items()
+                if isinstance(value, dict) and self._matches(value, webhook_url, entity)
+            ]
+            for key in keys:
+                self._state.pop(key)
+                self._ranges.pop(key, None)
+        self._state.flush()
+        return len(keys)
@@ -0,0 +1,161 @@
+import atexit
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime, timezone
+from typing import Any, Deque, Dict, List, Optional
+
+from .encoding import json_dumps
+
+logger = logging.getLogger(__name__)
+
+# How much of an existing log is scanned on startup to refill the ring buffer.
+_TAIL_BYTES = 4 * 1024 * 1024
+
+
+class DeliveryLog:
+    """Recent webhook deliveries kept in memory, optionally appended to disk.
+
+    ``record`` only touches a bounded deque, so delivering never waits on
+    disk. When ``path`` is set, a writer thread appends the queued entries
+    as NDJSON in one write per batch and rotates the file once it exceeds
+    ``max_bytes`` (``path.1`` ... ``path.<backups>``, like logging's
+    RotatingFileHandler).
+    """
+
+    def __init__(
+        self,
+        capacity: int = 100,
+        path: Optional[str] = None,
+        max_bytes: int = 50 * 1024 * 1024,
+        backups: int = 5,
+        flush_interval: float = 1.0,
+    ) -> None:
+        self._entries: Deque[Dict[str, Any]] = deque(maxlen=max(1, capacity))
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._path = path
+        self._max_bytes = max_bytes
+        self._backups = backups
+        self._flush_interval = flush_interval
+        self._pending: List[Dict[str, Any]] = []
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+        if path:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            self._load_tail()
+            self._writer = threading.Thread(target=self._write_loop, name="DeliveryLogWriter", daemon=True)
+            self._writer.start()
+            atexit.register(self.flush)
+
+    @property
+    def capacity(self) -> int:
+        return self._entries.maxlen or 0
+
+    def record(
+        self,
+        payload: Dict[str, Any],
+        destination: Optional[str],
+        entity: Optional[str] = None,
+        status: Optional[str] = None,
+    ) -> None:
+        entry = {
+            "delivered_at": datetime.now(timezone.utc).isoformat(),
+            "destination": destination,
+            "entity": entity,
+            "status": status,
+            "payload": payload,
+        }
+        with self._lock:
+            self._entries.append(entry)
+            if self._path:
+                self._pending.append(entry)
+        if self._path:
+            self._wakeup.set()
+
+    def recent(
+        self,
+        n: int = 1,
+        entity: Optional[str] = None,
+        destination: Optional[str] = None,
+    ) -> List[Dict[str, Any]]:
+        """Newest-first deliveries, optionally filtered by entity and destination."""
+        with self._lock:
+            entries = list(self._entries)
+        matches: List[Dict[str, Any]] = []
+        for entry in reversed(entries):
+            if entity is not None and entry.get("entity") != entity:
+                continue
+            if destination is not None and entry.get("destination") != destination:
+                continue
+            matches.append(entry)
+            if len(matches) >= n:
+                break
+        return matches
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+            if batch and self._path:
+                self._append(b"".join(json_dumps(entry) + b"\n" for entry in batch))
+
+    def _append(self, data: bytes) -> None:
+        try:
+            self._rotate_if_needed(len(data))
+            # One O_APPEND write per batch: concurrent readers see whole lines.
+            fd = os.open(self._path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+            try:
+                os.write(fd, data)
+            finally:
+                os.close(fd)
+        except OSError as exc:
+            logger.error("Unable to append to delivery log %s: %s", self._path, exc)
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Give bursts a moment to accumulate so they land in one write.
+            time.sleep(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _rotate_if_needed(self, incoming: int) -> None:
+        try:
+            size = os.path.getsize(self._path)
+        except FileNotFoundError:
+            return
+        if size + incoming <= self._max_bytes:
+            return
+        if self._backups <= 0:
+            os.unlink(self._path)
+            return
+        for index in range(self._backups - 1, 0, -1):
+            source = f"{self._path}.{index}"
+            if os.path.exists(source):
+                os.replace(source, f"{self._path}.{index + 1}")
+        os.replace(self._path, f"{self._path}.1")
+
+    def _load_tail(self) -> None:
+        try:
+            with open(self._path, "rb") as handle:
+                handle.seek(0, os.SEEK_END)
+                size = handle.tell()
+                handle.seek(max(0, size - _TAIL_BYTES))
+                chunk = handle.read()
+        except FileNotFoundError:
+            return
+        except OSError as exc:
+            logger.error("Unable to read delivery log %s: %s", self._path, exc)
+            return
+        lines = chunk.splitlines()
+        if size > _TAIL_BYTES and lines:
+            lines = lines[1:]  # first line is probably cut
+        for line in lines[-self.capacity:]:
+            try:
+                self._entries.append(json.loads(line))
+            except ValueError:
+                continue
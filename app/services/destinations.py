@@ -0,0 +1,289 @@
+import asyncio
+import concurrent.futures
+import json
+import logging
+import re
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+from .encoding import encode_payload, parse_webhook_encoding
+from .pipeline import OVERFLOW_POLICIES, EventPipeline
+from .search import normalise_entity
+
+logger = logging.getLogger(__name__)
+
+_NAME = re.compile(r"^[A-Za-z0-9_-]+$")
+
+
+class CircuitBreaker:
+    """Stops deliveries to a destination after repeated failures.
+
+    ``failure_threshold`` consecutive failures open the circuit for
+    ``reset_seconds``; after that one trial delivery is let through
+    (half-open) and its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int, reset_seconds: float) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if self._opened_at is None:
+                return "closed"
+            if self._trial or time.monotonic() - self._opened_at >= self.reset_seconds:
+                return "half_open"
+            return "open"
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial or time.monotonic() - self._opened_at < self.reset_seconds:
+                return False
+            self._trial = True
+            return True
+
+    def record(self, success: bool) -> bool:
+        """Record a delivery outcome; returns True when this opened the circuit."""
+        with self._lock:
+            self._trial = False
+            if success:
+                self._failures = 0
+                self._opened_at = None
+                return False
+            self._failures += 1
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                opened = self._opened_at is None
+                self._opened_at = time.monotonic()
+                return opened
+            return False
+
+
+class Destination:
+    """A named webhook target with its own queue, workers, threads and breaker.
+
+    Deliveries are queued and POSTed by ``concurrency`` workers through a
+    private thread pool, so a slow or failing destination backs up (and
+    eventually drops, per ``overflow``) only its own queue. The primary
+    webhooks (``N8N_WEBHOOK_URL``, ``LISTENER_WEBHOOK_URL`` or a request's
+    ``webhook_url``) are destinations too, just not configured by name; they
+    run without a breaker (``breaker=None``) so every delivery is attempted.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        url: str,
+        headers: Dict[str, str],
+        encoding: Tuple[str, Optional[str]],
+        timeout: float,
+        concurrency: int,
+        queue_size: int,
+        overflow: str,
+        breaker: Optional[CircuitBreaker],
+        entities: Iterable[str] = (),
+    ) -> None:
+        self.name = name
+        self.url = url
+        self.headers = headers
+        self.encoding = encoding
+        self.timeout = timeout
+        self.breaker = breaker
+        self.entities = {normalise_entity(entity) for entity in entities} - {None}
+        self._executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=concurrency,
+            thread_name_prefix=f"webhook-{name}",
+        )
+        self._pipeline = EventPipeline(
+            f"webhook:{name}",
+            self._deliver,
+            queue_size=queue_size,
+            workers=concurrency,
+            overflow=overflow,
+            on_drop=self._dropped,
+        )
+        self._webhook_service = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def matches(self, entity: Optional[str]) -> bool:
+        return "*" in self.entities or normalise_entity(entity) in self.entities
+
+    async def start(self, loop: asyncio.AbstractEventLoop, webhook_service) -> None:
+        self._loop = loop
+        self._webhook_service = webhook_service
+        await self._pipeline.start()
+
+    async def close(self) -> None:
+        """Deliver what is queued, then stop the workers and the thread pool."""
+        await self._pipeline.join()
+        await self._pipeline.stop()
+        self._executor.shutdown(wait=False)
+
+    async def submit(
+        self,
+        payload: Dict,
+        encoded: Tuple[bytes, Dict[str, str]],
+        entity: Optional[str],
+    ) -> "asyncio.Future[str]":
+        """Queue a delivery; the future resolves to the HTTP status, ``"error"``,
+        ``"circuit_open"`` or ``"dropped"``.
+        """
+        done = self._loop.create_future()
+        await self._pipeline.submit((payload, encoded, entity, done))
+        return done
+
+    @staticmethod
+    def _resolve(done: "asyncio.Future[str]", status: str) -> None:
+        if not done.done():
+            done.set_result(status)
+
+    def _dropped(self, item: Tuple) -> None:
+        self._resolve(item[-1], "dropped")
+
+    async def _deliver(self, item: Tuple) -> None:
+        payload, encoded, entity, done = item
+        status = "error"
+        try:
+            status = await self._post(payload, encoded, entity)
+        finally:
+            self._resolve(done, status)
+
+    async def _post(self, payload: Dict, encoded: Tuple[bytes, Dict[str, str]], entity: Optional[str]) -> str:
+        if self.breaker is not None and not self.breaker.allow():
+            metrics.WEBHOOK_DESTINATION_DELIVERIES.labels(self.name, "circuit_open").inc()
+            return "circuit_open"
+        status = await self._webhook_service.send(
+            self._loop,
+            self.url,
+            payload,
+            self.headers,
+            self.encoding,
+            entity=entity,
+            encoded=encoded,
+            timeout=self.timeout,
+            executor=self._executor,
+        )
+        status = status or "error"
+        result = f"{status[0]}xx" if status[0].isdigit() else status
+        metrics.WEBHOOK_DESTINATION_DELIVERIES.labels(self.name, result).inc()
+        if self.breaker is None:
+            return status
+        success = result in ("2xx", "3xx")
+        if self.breaker.record(success):
+            logger.warning(
+                "Webhook destination %s failed %s times in a row; pausing it for %ss",
+                self.name,
+                self.breaker.failure_threshold,
+                self.breaker.reset_seconds,
+            )
+        metrics.WEBHOOK_CIRCUIT_OPEN.labels(self.name).set(0 if self.breaker.state == "closed" else 1)
+        return status
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "url": self.url,
+            "entities": sorted(self.entities),
+            "circuit": self.breaker.state if self.breaker is not None else None,
+            "timeout_seconds": self.timeout,
+            **self._pipeline.stats(),
+        }
+
+
+def _number(spec: Dict[str, Any], key: str, default: float, minimum: float, cast=float) -> Any:
+    value = spec.get(key, default)
+    try:
+        value = cast(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"{key} must be a number") from None
+    if value < minimum:
+        raise ValueError(f"{key} must be at least {minimum}")
+    return value
+
+
+def parse_destinations(
+    raw: Optional[str],
+    base_headers: Dict[str, str],
+    default_encoding: str,
+    queue_size: int,
+) -> Dict[str, Destination]:
+    """Build destinations from the ``WEBHOOK_DESTINATIONS`` JSON object.
+
+    Raises ``ValueError`` on malformed configuration so it fails at startup.
+    """
+    if not raw:
+        return {}
+    try:
+        parsed = json.loads(raw)
+    except json.JSONDecodeError as exc:
+        raise ValueError(f"WEBHOOK_DESTINATIONS is not valid JSON: {exc}") from None
+    if not isinstance(parsed, dict):
+        raise ValueError("WEBHOOK_DESTINATIONS must be a JSON object of name -> settings")
+
+    destinations: Dict[str, Destination] = {}
+    for name, spec in parsed.items():
+        label = f"WEBHOOK_DESTINATIONS.{name}"
+        if not _NAME.match(name):
+            raise ValueError(f"{label}: names may only contain letters, digits, '_' and '-'")
+        if isinstance(spec, str):
+            spec = {"url": spec}
+        if not isinstance(spec, dict) or not spec.get("url"):
+            raise ValueError(f"{label}: url is required")
+        headers = spec.get("headers") or {}
+        entities = spec.get("entities") or []
+        if not isinstance(headers, dict):
+            raise ValueError(f"{label}: headers must be an object")
+        if isinstance(entities, str):
+            entities = [entities]
+        overflow = spec.get("overflow", "drop_oldest")
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"{label}: overflow must be one of: {', '.join(OVERFLOW_POLICIES)}")
+        try:
+            destinations[name] = Destination(
+                name,
+                str(spec["url"]),
+                {**base_headers, **{str(key): str(value) for key, value in headers.items()}},
+                parse_webhook_encoding(spec.get("encoding") or default_encoding, f"{label}.encoding"),
+                timeout=_number(spec, "timeout", 30.0, 0.1),
+                concurrency=_number(spec, "concurrency", 2, 1, int),
+                queue_size=_number(spec, "queue_size", queue_size, 1, int),
+                overflow=overflow,
+                breaker=CircuitBreaker(
+                    _number(spec, "failure_threshold", 5, 1, int),
+                    _number(spec, "reset_seconds", 30.0, 0),
+                ),
+                entities=[str(entity) for entity in entities],
+            )
+        except ValueError as exc:
+            raise ValueError(f"{label}: {exc}") from None
+    return destinations
+
+
+def encode_once(
+    payload: Dict,
+    encodings: Iterable[Tuple[str, Optional[str]]],
+) -> Dict[Tuple[str, Optional[str]], Tuple[bytes, Dict[str, str]]]:
+    """Encode ``payload`` once per distinct encoding, to share across destinations."""
+    return {encoding: encode_payload(payload, encoding) for encoding in dict.fromkeys(encodings)}
+
+
+def select_destinations(
+    destinations: Dict[str, Destination],
+    entity: Optional[str],
+    names: Iterable[str] = (),
+) -> List[Destination]:
+    """Destinations named by the request plus those configured for ``entity``."""
+    chosen = [destinations[name] for name in names if name in destinations]
+    chosen.extend(
+        destination
+        for destination in destinations.values()
+        if destination not in chosen and destination.matches(entity)
+    )
+    return chosen
@@ -0,0 +1,123 @@
+import gzip
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+# JSON goes through orjson when it is installed and falls back to the stdlib.
+# msgpack and zstandard are optional: the formats they provide are only
+# offered (and accepted in WEBHOOK_ENCODING) when the package imports.
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover - optional dependency
+    msgpack = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover - optional dependency
+    zstandard = None
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+
+GZIP_LEVEL = 5
+ZSTD_LEVEL = 3
+
+
+def _default(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return obj.isoformat()
+    if isinstance(obj, (bytes, bytearray)):
+        return list(obj)
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _default_str(obj: Any) -> Any:
+    try:
+        return _default(obj)
+    except TypeError:
+        return str(obj)
+
+
+def json_dumps(obj: Any) -> bytes:
+    """Compact JSON; unknown objects are rendered with ``str``."""
+    if orjson is not None:
+        try:
+            return orjson.dumps(obj, default=_default_str)
+        except (TypeError, orjson.JSONEncodeError):
+            pass  # e.g. ints beyond 64 bits or non-str keys; the stdlib copes
+    return json.dumps(obj, separators=(",", ":"), default=_default_str).encode()
+
+
+def to_jsonable(obj: Any) -> Any:
+    """Round-trip ``obj`` through JSON so it only holds plain JSON types.
+
+    Datetimes become ISO 8601 strings and bytes become lists of ints, the
+    same representation ``DateTimeEncoder`` has always produced.
+    """
+    if orjson is not None:
+        try:
+            return orjson.loads(orjson.dumps(obj, default=_default))
+        except (TypeError, orjson.JSONEncodeError):
+            pass
+    return json.loads(json.dumps(obj, default=_default))
+
+
+def available_content_types() -> List[str]:
+    return [JSON, MSGPACK] if msgpack is not None else [JSON]
+
+
+def available_encodings() -> List[str]:
+    return ["zstd", "gzip"] if zstandard is not None else ["gzip"]
+
+
+def encode(obj: Any, content_type: str = JSON) -> bytes:
+    if content_type == MSGPACK:
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+        return msgpack.packb(obj, default=_default_str, use_bin_type=True)
+    return json_dumps(obj)
+
+
+def compress(body: bytes, content_encoding: Optional[str]) -> bytes:
+    if content_encoding == "gzip":
+        return gzip.compress(body, compresslevel=GZIP_LEVEL)
+    if content_encoding == "zstd":
+        if zstandard is None:
+            raise RuntimeError("zstandard is not installed")
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+    return body
+
+
+def parse_webhook_encoding(spec: Optional[str], source_label: str = "WEBHOOK_ENCODING") -> Tuple[str, Optional[str]]:
+    """Parse ``json``, ``msgpack``, ``json+gzip``, ``msgpack+zstd``... into (content type, encoding).
+
+    Raises ``ValueError`` for unknown formats or ones whose optional package is
+    missing, so misconfiguration fails at startup instead of on delivery.
+    """
+    fmt, _, compression = (spec or "json").strip().lower().partition("+")
+    content_type = {"json": JSON, "msgpack": MSGPACK}.get(fmt)
+    if content_type is None:
+        raise ValueError(f"{source_label}: unknown format '{fmt}' (use json or msgpack)")
+    if content_type not in available_content_types():
+        raise ValueError(f"{source_label}: msgpack requested but the msgpack package is not installed")
+    content_encoding = compression or None
+    if content_encoding not in (None, "gzip", "zstd"):
+        raise ValueError(f"{source_label}: unknown compression '{compression}' (use gzip or zstd)")
+    if content_encoding and content_encoding not in available_encodings():
+        raise ValueError(f"{source_label}: zstd requested but the zstandard package is not installed")
+    return content_type, content_encoding
+
+
+def encode_payload(payload: Any, spec: Tuple[str, Optional[str]] = (JSON, None)) -> Tuple[bytes, Dict[str, str]]:
+    """Encode a webhook payload; returns the body and the headers describing it."""
+    content_type, content_encoding = spec
+    body = compress(encode(payload, content_type), content_encoding)
+    headers = {"Content-Type": content_type}
+    if content_encoding:
+        headers["Content-Encoding"] = content_encoding
+    return body, headers
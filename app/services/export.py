@@ -0,0 +1,263 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterator, List, Optional
+
+from .encoding import json_dumps
+from .state import JsonStateFile
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # pragma: no cover - optional dependency
+    pyarrow = None
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FORMATS = ("ndjson", "parquet")
+# "history" walks the messages, "participants" the members of a group/channel.
+EXPORT_KINDS = ("history", "participants")
+
+# Flat columns written to Parquet parts; the full message stays available as
+# JSON in ``payload`` so nothing is lost for fields without a column.
+_PARQUET_COLUMNS = (
+    ("id", "int64"),
+    ("date", "string"),
+    ("edit_date", "string"),
+    ("message", "string"),
+    ("grouped_id", "int64"),
+    ("reply_to_msg_id", "int64"),
+    ("views", "int64"),
+    ("forwards", "int64"),
+    ("media_type", "string"),
+    ("media_path", "string"),
+    ("payload", "string"),
+)
+
+
+def parquet_available() -> bool:
+    return pyarrow is not None
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+def _parquet_row(payload: Dict[str, Any]) -> Dict[str, Any]:
+    media = payload.get("media") if isinstance(payload.get("media"), dict) else {}
+    reply_to = payload.get("reply_to") if isinstance(payload.get("reply_to"), dict) else {}
+    return {
+        "id": payload.get("id"),
+        "date": payload.get("date"),
+        "edit_date": payload.get("edit_date"),
+        "message": payload.get("message"),
+        "grouped_id": payload.get("grouped_id"),
+        "reply_to_msg_id": reply_to.get("reply_to_msg_id"),
+        "views": payload.get("views"),
+        "forwards": payload.get("forwards"),
+        "media_type": media.get("_"),
+        "media_path": (media.get("download_info") or {}).get("relative_path"),
+        "payload": json_dumps(payload).decode(),
+    }
+
+
+class Export:
+    """One channel export: rolling part files plus a checkpointed manifest.
+
+    The manifest records the history cursor and the committed size of the
+    part being written after every page. On resume the part is truncated
+    back to that size, so a crash mid-page never leaves duplicate rows.
+    Methods that touch disk are meant to run on an executor thread.
+    """
+
+    def __init__(self, directory: str) -> None:
+        self.directory = directory
+        self._manifest = JsonStateFile(os.path.join(directory, "manifest.json"))
+        self._lock = threading.Lock()
+
+    @classmethod
+    def create(
+        cls,
+        root: str,
+        entity: str,
+        fmt: str,
+        media: bool,
+        part_rows: int,
+        min_id: int = 0,
+        kind: str = "history",
+    ) -> "Export":
+        export_id = uuid.uuid4().hex
+        export = cls(os.path.join(root, export_id))
+        os.makedirs(export.directory, exist_ok=True)
+        for key, value in {
+            "id": export_id,
+            "kind": kind,
+            "entity": entity,
+            "format": fmt,
+            "media": media,
+            "min_id": min_id,
+            "part_rows": part_rows,
+            "status": "running",
+            "error": None,
+            "created_at": _now(),
+            "updated_at": _now(),
+            "cursor": 0 if kind == "history" else None,
+            "messages": 0,
+            "pages": 0,
+            "parts": [],
+            "current_part": {"index": 0, "rows": 0, "bytes": 0},
+        }.items():
+            export._manifest.set(key, value)
+        export._manifest.flush()
+        return export
+
+    @property
+    def id(self) -> str:
+        return self._manifest.get("id")
+
+    def get(self, key: str, default: Any = None) -> Any:
+        return self._manifest.get(key, default)
+
+    def snapshot(self) -> Dict[str, Any]:
+        return self._manifest.snapshot()
+
+    def _staging_path(self, index: int) -> str:
+        suffix = "ndjson" if self.get("format") == "ndjson" else "staging.ndjson"
+        return os.path.join(self.directory, f"part-{index:05d}.{suffix}")
+
+    def prepare_resume(self) -> None:
+        """Drop anything written after the last checkpoint."""
+        current = self.get("current_part")
+        path = self._staging_path(current["index"])
+        if os.path.exists(path) and os.path.getsize(path) > current["bytes"]:
+            with open(path, "r+b") as handle:
+                handle.truncate(current["bytes"])
+            logger.info("Export %s: truncated %s to its last checkpoint", self.id, path)
+        self.set_status("running")
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        """Every committed row, in write order (NDJSON exports only)."""
+        files = [os.path.join(self.directory, part["file"]) for part in self.get("parts", [])]
+        files.append(self._staging_path(self.get("current_part")["index"]))
+        for path in files:
+            if not os.path.exists(path):
+                continue
+            with open(path, "rb") as handle:
+                for line in handle:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def write_page(self, rows: List[Dict[str, Any]], cursor: int) -> None:
+        with self._lock:
+            current = dict(self.get("current_part"))
+            if rows:
+                data = b"".join(json_dumps(row) + b"\n" for row in rows)
+                path = self._staging_path(current["index"])
+                with open(path, "ab") as handle:
+                    handle.write(data)
+                    handle.flush()
+                    os.fsync(handle.fileno())
+                current["rows"] += len(rows)
+                current["bytes"] += len(data)
+            self._manifest.set("current_part", current)
+            self._manifest.set("cursor", cursor)
+            self._manifest.set("messages", self.get("messages", 0) + len(rows))
+            self._manifest.set("pages", self.get("pages", 0) + 1)
+            self._manifest.set("updated_at", _now())
+            self._manifest.flush()
+            if current["rows"] >= self.get("part_rows"):
+                self._roll()
+
+    def _roll(self) -> None:
+        current = self.get("current_part")
+        if not current["rows"]:
+            return
+        staging = self._staging_path(current["index"])
+        if self.get("format") == "parquet":
+            final = os.path.join(self.directory, f"part-{current['index']:05d}.parquet")
+            self._write_parquet(staging, final)
+        else:
+            final = staging
+        parts = list(self.get("parts", []))
+        parts.append({"file": os.path.basename(final), "rows": current["rows"]})
+        self._manifest.set("parts", parts)
+        self._manifest.set("current_part", {"index": current["index"] + 1, "rows": 0, "bytes": 0})
+        self._manifest.flush()
+        if final != staging:
+            os.unlink(staging)
+
+    @staticmethod
+    def _write_parquet(source: str, target: str) -> None:
+        schema = pyarrow.schema([(name, getattr(pyarrow, kind)()) for name, kind in _PARQUET_COLUMNS])
+        with open(source, "rb") as handle:
+            rows = [_parquet_row(json.loads(line)) for line in handle if line.strip()]
+        table = pyarrow.Table.from_pylist(rows, schema=schema)
+        tmp_path = f"{target}.tmp"
+        pyarrow.parquet.write_table(table, tmp_path, compression="zstd")
+        os.replace(tmp_path, target)
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        with self._lock:
+            if status == "completed":
+                self._roll()
+            self._manifest.set("error", error)
+            self.set_status(status)
+
+    def set_status(self, status: str) -> None:
+        self._manifest.set("status", status)
+        self._manifest.set("updated_at", _now())
+        self._manifest.flush()
+
+
+class ExportManager:
+    """Exports stored under ``root``; manifests are reloaded on startup."""
+
+    def __init__(self, root: str, part_rows: int) -> None:
+        self.root = root
+        self.part_rows = part_rows
+        self._exports: Dict[str, Export] = {}
+        self._lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+        for name in sorted(os.listdir(root)):
+            if os.path.exists(os.path.join(root, name, "manifest.json")):
+                export = Export(os.path.join(root, name))
+                if export.id:
+                    self._exports[export.id] = export
+
+    def create(self, entity: str, fmt: str, media: bool, min_id: int = 0, kind: str = "history") -> Export:
+        if kind not in EXPORT_KINDS:
+            raise ValueError(f"kind must be one of: {', '.join(EXPORT_KINDS)}")
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(EXPORT_FORMATS)}")
+        if kind == "participants" and fmt != "ndjson":
+            raise ValueError("participant exports are written as ndjson")
+        if fmt == "parquet" and not parquet_available():
+            raise ValueError("parquet exports need the pyarrow package")
+        export = Export.create(self.root, entity, fmt, media, self.part_rows, min_id=min_id, kind=kind)
+        with self._lock:
+            self._exports[export.id] = export
+        return export
+
+    def get(self, export_id: str) -> Optional[Export]:
+        with self._lock:
+            return self._exports.get(export_id)
+
+    def list(self) -> List[Export]:
+        with self._lock:
+            exports = list(self._exports.values())
+        return sorted(exports, key=lambda export: export.get("created_at") or "", reverse=True)
+
+    def interrupted(self) -> List[Export]:
+        """Exports still marked running, i.e. the process died while writing them."""
+        return [export for export in self.list() if export.get("status") == "running"]
+
+    def delete(self, export_id: str) -> Optional[Export]:
+        with self._lock:
+            export = self._exports.pop(export_id, None)
+        if export is not None:
+            shutil.rmtree(export.directory, ignore_errors=True)
+        return export
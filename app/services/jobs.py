@@ -0,0 +1,194 @@
+import concurrent.futures
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class JobLimitError(RuntimeError):
+    """Raised when starting a job would exceed the concurrent job limit."""
+
+
+def _iso(timestamp: Optional[float]) -> Optional[str]:
+    if timestamp is None:
+        return None
+    return datetime.fromtimestamp(timestamp, timezone.utc).isoformat()
+
+
+class Job:
+    """A background pull running on the Telethon loop.
+
+    The coroutine reports through ``page()`` and ``item()`` as it goes, so
+    callers can follow progress and read partial results while it runs.
+    Counters are only written from the loop thread; readers take the
+    condition lock.
+    """
+
+    def __init__(self, kind: str, params: Dict[str, Any]) -> None:
+        self.id = uuid.uuid4().hex
+        self.kind = kind
+        self.params = params
+        self.status = "running"
+        self.error: Optional[str] = None
+        self.created_at = time.time()
+        self.finished_at: Optional[float] = None
+        self.pages = 0
+        self.messages = 0
+        self.media = 0
+        self.items: List[Dict[str, Any]] = []
+        self.future: Optional[concurrent.futures.Future] = None
+        self._cond = threading.Condition()
+
+    @property
+    def done(self) -> bool:
+        return self.status != "running"
+
+    def page(self) -> None:
+        with self._cond:
+            self.pages += 1
+
+    def item(self, payload: Dict[str, Any], messages: int = 1) -> None:
+        media = payload.get("album", {}).get("media") if isinstance(payload.get("album"), dict) else None
+        if media is None:
+            media = [1] if isinstance(payload.get("media"), dict) and payload["media"].get("download_info") else []
+        with self._cond:
+            self.items.append(payload)
+            self.messages += messages
+            self.media += len(media)
+            self._cond.notify_all()
+
+    def finish(self, status: str, error: Optional[str] = None) -> None:
+        with self._cond:
+            self.status = status
+            self.error = error
+            self.finished_at = time.time()
+            self._cond.notify_all()
+
+    def slice(self, offset: int, limit: int) -> List[Dict[str, Any]]:
+        with self._cond:
+            return self.items[offset:offset + limit]
+
+    def follow(self, heartbeat: float = 15.0) -> Iterator[Optional[Dict[str, Any]]]:
+        """Yield items as they arrive until the job ends.
+
+        ``None`` is yielded when nothing arrived for ``heartbeat`` seconds so
+        streaming responses can keep the connection alive.
+        """
+        index = 0
+        while True:
+            with self._cond:
+                if index >= len(self.items) and not self.done:
+                    self._cond.wait(heartbeat)
+                batch = self.items[index:]
+                finished = self.done
+            index += len(batch)
+            if batch:
+                yield from batch
+            elif not finished:
+                yield None
+            if finished and index >= len(self.items):
+                return
+
+    def snapshot(self, ttl: float) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "job_id": self.id,
+                "kind": self.kind,
+                "status": self.status,
+                "params": self.params,
+                "progress": {
+                    "pages": self.pages,
+                    "messages": self.messages,
+                    "media": self.media,
+                    "items": len(self.items),
+                },
+                "error": self.error,
+                "created_at": _iso(self.created_at),
+                "finished_at": _iso(self.finished_at),
+                "expires_at": _iso(self.finished_at + ttl) if self.finished_at else None,
+            }
+
+
+class JobManager:
+    """Tracks background jobs, caps how many run at once and expires old ones."""
+
+    def __init__(self, max_concurrent: int, ttl_seconds: float) -> None:
+        self.max_concurrent = max_concurrent
+        self.ttl = ttl_seconds
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        kind: str,
+        params: Dict[str, Any],
+        schedule: Callable[[Job], concurrent.futures.Future],
+    ) -> Job:
+        """Create a job and hand it to ``schedule``, which must start the work."""
+        self.purge()
+        job = Job(kind, params)
+        with self._lock:
+            running = sum(1 for existing in self._jobs.values() if not existing.done)
+            if running >= self.max_concurrent:
+                raise JobLimitError(f"at most {self.max_concurrent} jobs can run at once")
+            self._jobs[job.id] = job
+        try:
+            job.future = schedule(job)
+        except Exception:
+            # Never started: free the slot instead of leaving it "running".
+            with self._lock:
+                self._jobs.pop(job.id, None)
+            raise
+        job.future.add_done_callback(lambda future: self._on_done(job, future))
+        logger.info("Started %s job %s", kind, job.id)
+        return job
+
+    @staticmethod
+    def _on_done(job: Job, future: concurrent.futures.Future) -> None:
+        if future.cancelled():
+            job.finish("cancelled")
+        elif future.exception() is not None:
+            logger.error("Job %s failed: %s", job.id, future.exception())
+            job.finish("failed", str(future.exception()))
+        else:
+            job.finish("succeeded")
+
+    def get(self, job_id: str) -> Optional[Job]:
+        self.purge()
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def list(self) -> List[Job]:
+        self.purge()
+        with self._lock:
+            return sorted(self._jobs.values(), key=lambda job: job.created_at, reverse=True)
+
+    def cancel(self, job_id: str) -> Optional[Job]:
+        job = self.get(job_id)
+        if job is not None and not job.done and job.future is not None:
+            job.future.cancel()
+        return job
+
+    def delete(self, job_id: str) -> Optional[Job]:
+        job = self.cancel(job_id)
+        if job is not None:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+        return job
+
+    def purge(self) -> None:
+        cutoff = time.time() - self.ttl
+        with self._lock:
+            expired = [
+                job_id
+                for job_id, job in self._jobs.items()
+                if job.finished_at is not None and job.finished_at < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
+        if expired:
+            logger.info("Expired %s finished jobs", len(expired))
@@ -0,0 +1,200 @@
+from threading import Lock
+from typing import Optional, Set
+
+from prometheus_client import Counter, Gauge, Histogram
+
+# Registered on the default registry so `/metrics` (prometheus-flask-exporter)
+# exposes them next to the per-route HTTP metrics.
+
+PIPELINE_QUEUE_DEPTH = Gauge(
+    "telegram_pipeline_queue_depth",
+    "Events waiting in a pipeline queue",
+    ["pipeline"],
+)
+PIPELINE_EVENT_LATENCY = Histogram(
+    "telegram_pipeline_event_latency_seconds",
+    "Time from enqueue until a pipeline worker finished processing the event",
+    ["pipeline"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120),
+)
+PIPELINE_EVENTS_DROPPED = Counter(
+    "telegram_pipeline_events_dropped_total",
+    "Events discarded because a pipeline queue was full",
+    ["pipeline"],
+)
+PIPELINE_EVENTS_FAILED = Counter(
+    "telegram_pipeline_events_failed_total",
+    "Events whose processing raised an exception",
+    ["pipeline"],
+)
+
+MTPROTO_LATENCY = Histogram(
+    "telegram_mtproto_request_seconds",
+    "Latency of Telethon/MTProto calls",
+    ["method", "entity"],
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+MTPROTO_ERRORS = Counter(
+    "telegram_mtproto_errors_total",
+    "Telethon/MTProto calls that raised",
+    ["method", "error"],
+)
+FLOOD_WAIT_SECONDS = Counter(
+    "telegram_flood_wait_seconds_total",
+    "Seconds Telegram asked us to wait through FloodWaitError",
+    ["method"],
+)
+CLIENT_WAIT_SECONDS = Histogram(
+    "telegram_client_wait_seconds",
+    "Time spent waiting for a free Telegram client slot",
+    buckets=(0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 15, 60),
+)
+SERIALISE_SECONDS = Histogram(
+    "telegram_serialise_seconds",
+    "Time spent converting a Telethon message to a JSON-ready dict (media excluded)",
+    ["entity"],
+    buckets=(0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.05),
+)
+MEDIA_DOWNLOAD_SECONDS = Histogram(
+    "telegram_media_download_seconds",
+    "Latency of media downloads",
+    ["entity"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60),
+)
+MEDIA_BYTES = Counter(
+    "telegram_media_bytes_total",
+    "Bytes of media downloaded from Telegram",
+    ["entity"],
+)
+MEDIA_CACHE = Counter(
+    "telegram_media_cache_total",
+    "Media lookups served from disk (hit) or downloaded (miss)",
+    ["result"],
+)
+WEBHOOK_LATENCY = Histogram(
+    "telegram_webhook_request_seconds",
+    "Latency of webhook POSTs by response status and source entity",
+    ["status", "entity"],
+    buckets=(0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+WEBHOOK_DESTINATION_DELIVERIES = Counter(
+    "telegram_webhook_destination_deliveries_total",
+    "Deliveries per named webhook destination by outcome",
+    ["destination", "result"],
+)
+WEBHOOK_CIRCUIT_OPEN = Gauge(
+    "telegram_webhook_circuit_open",
+    "1 while a destination's circuit breaker is open or half-open",
+    ["destination"],
+)
+BRIDGE_WAIT_SECONDS = Histogram(
+    "telegram_bridge_wait_seconds",
+    "Time between a Flask thread submitting a coroutine and the event loop starting it",
+    ["operation"],
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+BRIDGE_IN_FLIGHT = Gauge(
+    "telegram_bridge_in_flight",
+    "Flask requests whose work is currently running on the Telethon loop",
+)
+BRIDGE_QUEUED = Gauge(
+    "telegram_bridge_queued",
+    "Flask requests waiting for a free bridge slot",
+)
+BRIDGE_REJECTED = Counter(
+    "telegram_bridge_rejected_total",
+    "Requests turned away with 503 because the bridge queue was full",
+    ["operation"],
+)
+BRIDGE_TIMEOUTS = Counter(
+    "telegram_bridge_timeouts_total",
+    "Requests that hit REQUEST_TIMEOUT_SECONDS, queued or running",
+    ["operation"],
+)
+EVENT_LOOP_LAG = Gauge(
+    "telegram_event_loop_lag_seconds",
+    "Most recent scheduling delay measured on the TelegramServiceLoop thread",
+)
+EVENT_LOOP_STALLS = Counter(
+    "telegram_event_loop_stalls_total",
+    "Times the loop watchdog saw a callback block TelegramServiceLoop past its threshold",
+)
+TIME_TO_READY = Gauge(
+    "telegram_time_to_ready_seconds",
+    "Seconds from service creation until the Telegram client was connected and authorised",
+)
+STARTUP_FAILURES = Counter(
+    "telegram_startup_failures_total",
+    "Failed attempts to connect the Telegram client during startup",
+)
+
+LISTENER_UPDATES = Counter(
+    "telegram_listener_updates_total",
+    "Edits and deletions received by the listener and applied locally",
+    ["kind"],
+)
+
+RESPONSE_CACHE_REQUESTS = Counter(
+    "telegram_response_cache_requests_total",
+    "Response cache lookups for /trigger and /message",
+    ["result"],
+)
+RESPONSE_CACHE_EVICTIONS = Counter(
+    "telegram_response_cache_evictions_total",
+    "Entries removed from the response cache",
+    ["reason"],
+)
+RESPONSE_CACHE_BYTES = Gauge(
+    "telegram_response_cache_bytes",
+    "Encoded bytes currently held by the response cache",
+)
+
+SEARCH_INDEXED = Counter(
+    "telegram_search_indexed_total",
+    "Messages written to the full-text search index",
+)
+SEARCH_INDEX_DROPPED = Counter(
+    "telegram_search_index_dropped_total",
+    "Messages not indexed because the search writer queue was full",
+)
+SEARCH_INDEX_REMOVED = Counter(
+    "telegram_search_index_removed_total",
+    "Messages removed from the full-text search index after being deleted in Telegram",
+)
+SEARCH_QUERY_SECONDS = Histogram(
+    "telegram_search_query_seconds",
+    "Time spent answering /search queries",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1),
+)
+
+
+class EntityLabels:
+    """Caps how many distinct entity label values the metrics above can take.
+
+    The first ``limit`` entities seen keep their own label; the rest are
+    reported as ``other`` so ad-hoc requests cannot explode series counts.
+    """
+
+    def __init__(self, limit: int = 50) -> None:
+        self._limit = limit
+        self._seen: Set[str] = set()
+        self._lock = Lock()
+
+    def set_limit(self, limit: int) -> None:
+        self._limit = limit
+
+    def __call__(self, entity: Optional[str]) -> str:
+        if not entity:
+            return "none"
+        if entity in self._seen:
+            return entity
+        with self._lock:
+            if entity in self._seen:
+                return entity
+            if len(self._seen) < self._limit:
+                self._seen.add(entity)
+                return entity
+        return "other"
+
+
+entity_label = EntityLabels()
@@ -0,0 +1,81 @@
+from typing import Any, Dict, List, Optional
+
+from telethon.tl.functions.channels import GetParticipantsRequest
+from telethon.tl.types import ChannelParticipantsSearch
+
+# Telegram returns at most 200 participants per GetParticipantsRequest.
+PAGE_SIZE = 200
+
+# A search whose results stop short of its reported count hit the server-side
+# cap; it is then split into one search per extra character. Names outside
+# this alphabet are still found while the plain listing and the shorter
+# prefixes are below the cap.
+SEARCH_ALPHABET = "abcdefghijklmnopqrstuvwxyz0123456789"
+MAX_PREFIX_LENGTH = 3
+
+
+def request_page(target: Any, query: str, offset: int) -> GetParticipantsRequest:
+    return GetParticipantsRequest(target, ChannelParticipantsSearch(query), offset, PAGE_SIZE, hash=0)
+
+
+def participant_row(user: Any, participant: Optional[Any] = None) -> Dict[str, Any]:
+    role = type(participant).__name__[len("ChannelParticipant"):].lower() if participant is not None else ""
+    joined = getattr(participant, "date", None)
+    return {
+        "id": user.id,
+        "first_name": getattr(user, "first_name", None),
+        "last_name": getattr(user, "last_name", None),
+        "username": getattr(user, "username", None),
+        "phone": getattr(user, "phone", None),
+        "bot": bool(getattr(user, "bot", False)),
+        "deleted": bool(getattr(user, "deleted", False)),
+        "role": role or "member",
+        "joined": joined.isoformat() if joined else None,
+    }
+
+
+def page_rows(response: Any) -> List[Dict[str, Any]]:
+    by_user = {
+        getattr(participant, "user_id", None): participant
+        for participant in getattr(response, "participants", None) or []
+    }
+    return [participant_row(user, by_user.get(user.id)) for user in getattr(response, "users", None) or []]
+
+
+class SearchPlan:
+    """Offsets of every participant search an export runs, as a JSON cursor.
+
+    The export starts with the plain listing (empty query). Any search that
+    ends before reaching its ``count`` is marked done and expanded into
+    ``query + c`` for every ``c`` in ``SEARCH_ALPHABET``, up to
+    ``MAX_PREFIX_LENGTH`` characters. The same user shows up under several
+    prefixes, so callers de-duplicate by user id.
+    """
+
+    def __init__(self, cursor: Optional[Dict[str, Any]] = None) -> None:
+        queries = (cursor or {}).get("queries") if isinstance(cursor, dict) else None
+        self.queries: Dict[str, Dict[str, Any]] = {
+            query: dict(state) for query, state in (queries or {"": {"offset": 0, "done": False}}).items()
+        }
+
+    def pending(self) -> List[str]:
+        return [query for query, state in self.queries.items() if not state["done"]]
+
+    def offset(self, query: str) -> int:
+        return self.queries[query]["offset"]
+
+    def advance(self, query: str, offset: int) -> None:
+        self.queries[query]["offset"] = offset
+
+    def complete(self, query: str, capped: bool) -> List[str]:
+        """Mark ``query`` done; returns the narrower searches added when it was capped."""
+        self.queries[query]["done"] = True
+        if not capped or len(query) >= MAX_PREFIX_LENGTH:
+            return []
+        children = [query + char for char in SEARCH_ALPHABET if query + char not in self.queries]
+        for child in children:
+            self.queries[child] = {"offset": 0, "done": False}
+        return children
+
+    def cursor(self) -> Dict[str, Any]:
+        return {"queries": {query: dict(state) for query, state in self.queries.items()}}
@@ -0,0 +1,140 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+OVERFLOW_POLICIES = ("block", "drop_newest", "drop_oldest")
+
+
+@dataclass
+class _QueuedEvent:
+    item: Any
+    enqueued_at: float
+
+
+class EventPipeline:
+    """Bounded asyncio queue drained by a fixed pool of worker coroutines.
+
+    Producers only enqueue, so a Telethon update handler returns immediately
+    even when delivery is slow. What happens when the queue is full depends on
+    ``overflow``: ``block`` waits for room, ``drop_newest`` discards the
+    incoming event and ``drop_oldest`` evicts the oldest queued one; either
+    way ``on_drop``, when given, is called with the discarded item.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        process: Callable[[Any], Awaitable[None]],
+        queue_size: int,
+        workers: int,
+        overflow: str = "drop_oldest",
+        on_drop: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self._name = name
+        self._process = process
+        self._queue_size = max(1, queue_size)
+        self._worker_count = max(1, workers)
+        self._overflow = overflow
+        self._on_drop = on_drop
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._processed = 0
+        self._dropped = 0
+        self._failed = 0
+
+    @property
+    def name(self) -> str:
+        return self._name
+
+    async def start(self) -> None:
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self._queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(), name=f"{self._name}-worker-{index}")
+            for index in range(self._worker_count)
+        ]
+        logger.info(
+            "Pipeline %s started with %s workers (queue size %s, overflow %s)",
+            self._name,
+            self._worker_count,
+            self._queue_size,
+            self._overflow,
+        )
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+    async def submit(self, item: Any) -> bool:
+        """Enqueue ``item``; returns ``False`` when it was dropped."""
+        if self._queue is None:
+            raise RuntimeError(f"Pipeline {self._name} is not running")
+
+        queued = _QueuedEvent(item=item, enqueued_at=time.monotonic())
+        if self._overflow == "block":
+            await self._queue.put(queued)
+        else:
+            try:
+                self._queue.put_nowait(queued)
+            except asyncio.QueueFull:
+                if self._overflow == "drop_newest":
+                    self._record_drop(item)
+                    return False
+                evicted = self._queue.get_nowait()
+                self._queue.task_done()
+                self._record_drop(evicted.item)
+                self._queue.put_nowait(queued)
+
+        metrics.PIPELINE_QUEUE_DEPTH.labels(self._name).set(self._queue.qsize())
+        return True
+
+    async def join(self) -> None:
+        if self._queue is not None:
+            await self._queue.join()
+
+    def _record_drop(self, item: Any) -> None:
+        self._dropped += 1
+        metrics.PIPELINE_EVENTS_DROPPED.labels(self._name).inc()
+        logger.warning("Pipeline %s queue full; dropped an event (%s policy)", self._name, self._overflow)
+        if self._on_drop is not None:
+            self._on_drop(item)
+
+    async def _worker(self) -> None:
+        assert self._queue is not None
+        while True:
+            queued = await self._queue.get()
+            metrics.PIPELINE_QUEUE_DEPTH.labels(self._name).set(self._queue.qsize())
+            try:
+                await self._process(queued.item)
+                self._processed += 1
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                self._failed += 1
+                metrics.PIPELINE_EVENTS_FAILED.labels(self._name).inc()
+                logger.error("Pipeline %s failed to process event: %s", self._name, exc)
+            finally:
+                self._queue.task_done()
+                metrics.PIPELINE_EVENT_LATENCY.labels(self._name).observe(time.monotonic() - queued.enqueued_at)
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "queue_depth": self._queue.qsize() if self._queue is not None else 0,
+            "queue_size": self._queue_size,
+            "workers": self._worker_count,
+            "overflow": self._overflow,
+            "processed": self._processed,
+            "dropped": self._dropped,
+            "failed": self._failed,
+        }
@@ -0,0 +1,145 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import Counter
+from typing import Dict, List, Optional, Set
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    filename = code.co_filename
+    parts = filename.split(os.sep)
+    short = os.sep.join(parts[-2:]) if len(parts) > 1 else filename
+    return f"{code.co_name} ({short}:{frame.f_lineno})".replace(";", ":")
+
+
+def sample_stacks(
+    duration: float,
+    interval: float = 0.01,
+    thread_names: Optional[Set[str]] = None,
+) -> Counter:
+    """Sample every thread's Python stack for ``duration`` seconds.
+
+    Returns a Counter keyed by ``thread;outer;...;inner`` frames, i.e. the
+    collapsed-stack format consumed by flamegraph.pl and speedscope.
+    """
+    samples: Counter = Counter()
+    own_ident = threading.get_ident()
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == own_ident:
+                continue
+            name = names.get(ident, f"thread-{ident}")
+            if thread_names and name not in thread_names:
+                continue
+            stack: List[str] = []
+            while frame is not None:
+                stack.append(_frame_label(frame))
+                frame = frame.f_back
+            stack.append(name.replace(";", ":"))
+            samples[";".join(reversed(stack))] += 1
+        time.sleep(interval)
+    return samples
+
+
+def collapse(samples: Counter) -> str:
+    return "\n".join(f"{stack} {count}" for stack, count in samples.most_common()) + "\n"
+
+
+def _await_chain(task: asyncio.Task) -> List[str]:
+    chain: List[str] = []
+    awaitable = task.get_coro()
+    while awaitable is not None:
+        frame = getattr(awaitable, "cr_frame", None) or getattr(awaitable, "gi_frame", None)
+        name = getattr(awaitable, "__qualname__", type(awaitable).__name__)
+        if frame is not None:
+            chain.append(f"{name} ({frame.f_code.co_filename}:{frame.f_lineno})")
+        else:
+            chain.append(type(awaitable).__name__)
+        awaitable = getattr(awaitable, "cr_await", None) or getattr(awaitable, "gi_yieldfrom", None)
+    return chain
+
+
+def describe_tasks(loop: asyncio.AbstractEventLoop, timeout: float = 5.0) -> List[Dict[str, object]]:
+    """List the live asyncio tasks on ``loop`` with their current await points."""
+
+    async def _collect() -> List[Dict[str, object]]:
+        current = asyncio.current_task()
+        return [
+            {
+                "name": task.get_name(),
+                "coroutine": getattr(task.get_coro(), "__qualname__", repr(task.get_coro())),
+                "awaiting": _await_chain(task),
+            }
+            for task in asyncio.all_tasks()
+            if task is not current
+        ]
+
+    return asyncio.run_coroutine_threadsafe(_collect(), loop).result(timeout=timeout)
+
+
+class LoopWatchdog:
+    """Logs the loop thread's stack whenever the event loop stops ticking.
+
+    A heartbeat callback is rescheduled on the loop every ``interval``
+    seconds; a monitor thread checks that it keeps firing. If a callback runs
+    for longer than ``threshold`` seconds (typically a synchronous call hiding
+    in an async path), the blocking stack is logged once per stall.
+    """
+
+    def __init__(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        loop_thread: threading.Thread,
+        threshold: float,
+        interval: float = 0.1,
+    ) -> None:
+        self._loop = loop
+        self._loop_thread = loop_thread
+        self._threshold = threshold
+        self._interval = interval
+        self._last_beat = time.monotonic()
+        self._stop = threading.Event()
+        self._monitor = threading.Thread(target=self._watch, name="LoopWatchdog", daemon=True)
+        self.stalls = 0
+
+    def start(self) -> None:
+        self._loop.call_soon_threadsafe(self._beat)
+        self._monitor.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _beat(self) -> None:
+        self._last_beat = time.monotonic()
+        if not self._stop.is_set():
+            self._loop.call_later(self._interval, self._beat)
+
+    def _watch(self) -> None:
+        reported_beat = None
+        while not self._stop.wait(self._interval / 2):
+            last_beat = self._last_beat
+            blocked_for = time.monotonic() - last_beat - self._interval
+            if blocked_for < self._threshold or reported_beat == last_beat:
+                continue
+            reported_beat = last_beat
+            self.stalls += 1
+            metrics.EVENT_LOOP_STALLS.inc()
+            frame = sys._current_frames().get(self._loop_thread.ident)
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else "<no frame>"
+            logger.warning(
+                "Event loop %s blocked for %.0f ms; current stack:\n%s",
+                self._loop_thread.name,
+                blocked_for * 1000,
+                stack,
+            )
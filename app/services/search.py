@@ -0,0 +1,283 @@
+import atexit
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Messages waiting for the writer; past this, new ones are dropped (and
+# counted) rather than letting a stalled disk grow memory without bound.
+MAX_PENDING = 10000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id INTEGER NOT NULL,
+    id INTEGER NOT NULL,
+    entity TEXT,
+    ts INTEGER,
+    date TEXT,
+    grouped_id INTEGER,
+    text TEXT NOT NULL,
+    PRIMARY KEY (chat_id, id)
+);
+CREATE INDEX IF NOT EXISTS messages_ts ON messages (ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    text,
+    content='messages',
+    content_rowid='rowid',
+    tokenize='unicode61 remove_diacritics 2'
+);
+CREATE TRIGGER IF NOT EXISTS messages_ai AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_ad AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_au AFTER UPDATE OF text ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text);
+    INSERT INTO messages_fts (rowid, text) VALUES (new.rowid, new.text);
+END;
+"""
+
+# Re-fetching an unchanged message is a no-op; only edits rewrite the FTS row.
+_UPSERT = """
+INSERT INTO messages (chat_id, id, entity, ts, date, grouped_id, text)
+VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (chat_id, id) DO UPDATE SET text = excluded.text
+WHERE messages.text != excluded.text
+"""
+_DELETE = "DELETE FROM messages WHERE chat_id = ? AND id = ?"
+
+
+def normalise_entity(entity: Optional[str]) -> Optional[str]:
+    if entity is None:
+        return None
+    return str(entity).strip().lstrip("@").lower() or None
+
+
+def _chat_id(payload: Dict[str, Any]) -> Optional[int]:
+    peer = payload.get("peer_id")
+    if not isinstance(peer, dict):
+        return None
+    for key in ("channel_id", "chat_id", "user_id"):
+        if peer.get(key) is not None:
+            return int(peer[key])
+    return None
+
+
+def _timestamp(value: Any) -> Optional[int]:
+    if not value:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(value))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return int(parsed.timestamp())
+
+
+def parse_date(value: str) -> int:
+    """ISO date or datetime (naive means UTC) as epoch seconds; raises ``ValueError``."""
+    timestamp = _timestamp(value)
+    if timestamp is None:
+        raise ValueError(f"invalid date '{value}'")
+    return timestamp
+
+
+def _quote_terms(query: str) -> str:
+    return " ".join('"{}"'.format(term.replace('"', '""')) for term in query.split())
+
+
+class SearchIndex:
+    """SQLite FTS5 index of every message the service serialises.
+
+    ``add`` only appends to an in-memory list; a writer thread upserts the
+    pending rows in one transaction per batch, so indexing never blocks the
+    Telethon loop. Readers use their own per-thread connections and, with
+    the database in WAL mode, never wait on the writer.
+    """
+
+    def __init__(self, path: str, flush_interval: float = 0.5) -> None:
+        self.path = path
+        self._flush_interval = flush_interval
+        self._pending: List[Tuple] = []
+        self._pending_removals: List[Tuple[int, int]] = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._local = threading.local()
+        self._indexed = 0
+        self._dropped = 0
+        self._removed = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        # Raises sqlite3.OperationalError when SQLite was built without FTS5.
+        self._writer_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._writer_conn.execute("PRAGMA journal_mode=WAL")
+        self._writer_conn.execute("PRAGMA synchronous=NORMAL")
+        self._writer_conn.executescript(_SCHEMA)
+
+        self._writer = threading.Thread(target=self._write_loop, name="SearchIndexWriter", daemon=True)
+        self._writer.start()
+        atexit.register(self.flush)
+
+    def add(self, payload: Dict[str, Any], entity: Optional[str] = None) -> None:
+        text = payload.get("message")
+        chat_id = _chat_id(payload)
+        if not text or chat_id is None or payload.get("id") is None:
+            return
+        row = (
+            chat_id,
+            int(payload["id"]),
+            normalise_entity(entity),
+            _timestamp(payload.get("date")),
+            payload.get("date"),
+            payload.get("grouped_id"),
+            text,
+        )
+        with self._lock:
+            if len(self._pending) >= MAX_PENDING:
+                self._dropped += 1
+                metrics.SEARCH_INDEX_DROPPED.inc()
+                return
+            self._pending.append(row)
+        self._wakeup.set()
+
+    def remove(self, chat_id: int, message_ids: Iterable[int]) -> None:
+        """Drop deleted messages; ``chat_id`` is the bare id stored in ``peer_id``."""
+        with self._lock:
+            self._pending_removals.extend((int(chat_id), int(message_id)) for message_id in message_ids)
+        self._wakeup.set()
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                batch, self._pending = self._pending, []
+                removals, self._pending_removals = self._pending_removals, []
+            if not batch and not removals:
+                return
+            try:
+                with self._writer_conn:
+                    self._writer_conn.execute("BEGIN")
+                    self._writer_conn.executemany(_UPSERT, batch)
+                    # After the upserts, so a deletion wins over a stale copy
+                    # fetched in the same window.
+                    self._writer_conn.executemany(_DELETE, removals)
+            except sqlite3.Error as exc:
+                logger.error("Unable to index %s messages in %s: %s", len(batch), self.path, exc)
+                return
+            self._indexed += len(batch)
+            self._removed += len(removals)
+            metrics.SEARCH_INDEXED.inc(len(batch))
+            metrics.SEARCH_INDEX_REMOVED.inc(len(removals))
+
+    def _write_loop(self) -> None:
+        while True:
+            self._wakeup.wait()
+            # Let bursts (a /trigger page, an album) land in one transaction.
+            time.sleep(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _reader(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA query_only=1")
+            conn.row_factory = sqlite3.Row
+            self._local.conn = conn
+        return conn
+
+    def search(
+        self,
+        query: str,
+        entity: Optional[str] = None,
+        date_from: Optional[int] = None,
+        date_to: Optional[int] = None,
+        limit: int = 20,
+        offset: int = 0,
+    ) -> Dict[str, Any]:
+        """Best matches first (bm25). ``query`` uses FTS5 syntax; if it does not
+        parse, every term is searched as a literal instead.
+        """
+        try:
+            return self._search(query, entity, date_from, date_to, limit, offset)
+        except sqlite3.OperationalError:
+            # FTS5 reports bad queries under several messages (syntax error,
+            # unterminated string, unknown special query, ...); quoted terms
+            # always parse, so anything still failing is a real database error.
+            return self._search(_quote_terms(query), entity, date_from, date_to, limit, offset)
+
+    def _search(
+        self,
+        query: str,
+        entity: Optional[str],
+        date_from: Optional[int],
+        date_to: Optional[int],
+        limit: int,
+        offset: int,
+    ) -> Dict[str, Any]:
+        started = time.perf_counter()
+        where = ["messages_fts MATCH ?"]
+        params: List[Any] = [query]
+        entity = normalise_entity(entity)
+        if entity is not None:
+            if entity.lstrip("-").isdigit():
+                where.append("(m.entity = ? OR m.chat_id = ?)")
+                params.extend([entity, int(entity)])
+            else:
+                where.append("m.entity = ?")
+                params.append(entity)
+        if date_from is not None:
+            where.append("m.ts >= ?")
+            params.append(date_from)
+        if date_to is not None:
+            where.append("m.ts < ?")
+            params.append(date_to)
+        clause = " AND ".join(where)
+        joined = "FROM messages_fts JOIN messages m ON m.rowid = messages_fts.rowid"
+
+        conn = self._reader()
+        total = conn.execute(f"SELECT count(*) {joined} WHERE {clause}", params).fetchone()[0]
+        rows = conn.execute(
+            f"SELECT m.entity, m.chat_id, m.id, m.date, m.grouped_id, m.text, "
+            f"snippet(messages_fts, 0, '<b>', '</b>', '…', 16) AS snippet, "
+            f"bm25(messages_fts) AS score "
+            f"{joined} WHERE {clause} ORDER BY score LIMIT ? OFFSET ?",
+            params + [limit, offset],
+        ).fetchall()
+        metrics.SEARCH_QUERY_SECONDS.observe(time.perf_counter() - started)
+        return {
+            "total": total,
+            "results": [
+                {
+                    "entity": row["entity"],
+                    "chat_id": row["chat_id"],
+                    "id": row["id"],
+                    "date": row["date"],
+                    "grouped_id": row["grouped_id"],
+                    "message": row["text"],
+                    "snippet": row["snippet"],
+                    "score": round(-row["score"], 4),
+                }
+                for row in rows
+            ],
+        }
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            pending = len(self._pending)
+        return {
+            "path": self.path,
+            "pending": pending,
+            "indexed": self._indexed,
+            "dropped": self._dropped,
+            "removed": self._removed,
+        }
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import logging
+import os
+import tempfile
+from threading import Lock
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def atomic_write_json(path: str, data: Any) -> None:
+    """Write ``data`` to ``path`` so readers never observe a partial file."""
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=directory)
+    try:
+        with os.fdopen(fd, "w") as handle:
+            json.dump(data, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonStateFile:
+    """Small JSON object kept in memory and persisted atomically on demand.
+
+    Updates only mark the state dirty; ``save_soon`` coalesces bursts of
+    updates into a single write on the default executor so callers on the
+    event loop never block on disk I/O.
+    """
+
+    def __init__(self, path: str) -> None:
+        self._path = path
+        self._lock = Lock()
+        # Held from snapshot to rename so concurrent flushes land in order:
+        # a flush that started earlier can never overwrite a newer snapshot.
+        self._write_lock = Lock()
+        self._dirty = False
+        self._save_handle: Optional[asyncio.TimerHandle] = None
+        self._data: Dict[str, Any] = self._load()
+
+    @property
+    def path(self) -> str:
+        return self._path
+
+    def _load(self) -> Dict[str, Any]:
+        try:
+            with open(self._path, "r") as handle:
+                data = json.load(handle)
+        except FileNotFoundError:
+            return {}
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Unable to read state file %s: %s", self._path, exc)
+            return {}
+        if not isinstance(data, dict):
+            logger.error("State file %s does not contain a JSON object; ignoring it", self._path)
+            return {}
+        return data
+
+    def get(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            return self._data.get(key, default)
+
+    def set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._dirty = True
+
+    def pop(self, key: str, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data:
+                return default
+            self._dirty = True
+            return self._data.pop(key)
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return json.loads(json.dumps(self._data))
+
+    def flush(self) -> None:
+        with self._write_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                data = json.loads(json.dumps(self._data))
+                self._dirty = False
+            try:
+                atomic_write_json(self._path, data)
+            except Exception as exc:  # noqa: BLE001
+                with self._lock:
+                    self._dirty = True
+                logger.error("Unable to persist state file %s: %s", self._path, exc)
+
+    def save_soon(self, loop: asyncio.AbstractEventLoop, delay: float = 1.0) -> None:
+        """Schedule a flush on ``loop``'s executor unless one is already pending."""
+        if self._save_handle is not None:
+            return
+
+        def _run() -> None:
+            self._save_handle = None
+            loop.run_in_executor(None, self.flush)
+
+        self._save_handle = loop.call_later(delay, _run)
@@ -1,21 +1,87 @@
 import asyncio
+import atexit
+import concurrent.futures
+import contextlib
+import glob
+import hashlib
 import json
 import logging
 import os
+import sqlite3
+import time
+from collections import OrderedDict
 from datetime import datetime
-from threading import Thread
-from typing import Dict, List, Optional
+from threading import Event, Thread
+from typing import Any, Awaitable, Callable, Collection, Dict, Hashable, Iterator, List, Optional, Sequence, Set, Tuple
 
 from itsdangerous import BadSignature, SignatureExpired, URLSafeTimedSerializer
-from telethon import TelegramClient, events
+from telethon import TelegramClient, errors, events, utils
 from telethon.tl.functions.messages import GetHistoryRequest
 from telethon.tl.types import MessageMediaDocument, MessageMediaPhoto, PeerChannel
 
 from app.config import Settings
+from . import metrics
+from .admission import AdmittedIterator, BridgeAdmission, DeadlineExceededError, remaining
+from .albums import ALBUM_MAX_PARTS, AlbumAggregator, group_albums, grouped_id_of, merge_album
+from .cache import CachedResponse, LRUCache, ResponseCache
+from .cursors import DeliveryCursors
+from .destinations import Destination, encode_once, parse_destinations, select_destinations
+from .encoding import parse_webhook_encoding, to_jsonable
+from .export import Export, ExportManager
+from .jobs import Job, JobLimitError, JobManager
+from .participants import SearchPlan, page_rows, request_page
+from .pipeline import EventPipeline
+from .profiling import LoopWatchdog, describe_tasks
+from .search import SearchIndex
+from .state import JsonStateFile
 from .webhook import WebhookService
 
 logger = logging.getLogger(__name__)
 
+# Upper bound Telegram accepts for ids in a single messages.getMessages /
+# channels.getMessages call.
+MAX_IDS_PER_REQUEST = 100
+
+# First delay between Telegram connection attempts; it doubles up to
+# STARTUP_RETRY_MAX_SECONDS.
+STARTUP_RETRY_INITIAL_SECONDS = 1.0
+
+# The loop cancels a request's work at its deadline; the Flask thread waits
+# this much longer for that to land before assuming the loop is blocked.
+BRIDGE_RESULT_GRACE_SECONDS = 1.0
+
+# Downloaded files remembered (path plus photo/document id) so repeat fetches
+# skip the download; older entries fall back to a fresh download.
+MEDIA_CACHE_MAX_ENTRIES = 10000
+
+# Primary webhooks (N8N_WEBHOOK_URL, the listener's, or a request's
+# webhook_url) each get a Destination on first use; beyond this many distinct
+# request URLs the least recently used one is drained and closed. One worker
+# and no circuit breaker keep every POST attempted and in order, as when they
+# were sent inline.
+PRIMARY_DESTINATIONS_MAX = 16
+PRIMARY_WEBHOOK_TIMEOUT_SECONDS = 30.0
+# Deliveries a request can queue ahead of its webhook before serialising waits.
+PRIMARY_QUEUE_SIZE = 100
+
+# How long shutdown waits for queued listener events to be delivered; kept
+# below gunicorn's default 30s graceful timeout.
+SHUTDOWN_DRAIN_SECONDS = 10.0
+
+
+class ServiceNotReadyError(RuntimeError):
+    """Raised when Telegram work is requested before the client is connected."""
+
+
+def _media_id(media) -> Optional[int]:
+    item = getattr(media, "photo", None) or getattr(media, "document", None)
+    return getattr(item, "id", None)
+
+
+def _peer_id(message) -> Optional[int]:
+    peer = getattr(message, "peer_id", None)
+    return utils.get_peer_id(peer) if peer is not None else None
+
 
 class DateTimeEncoder(json.JSONEncoder):
     def default(self, obj):  # noqa: D401 - inherited docstring not needed
@@ -27,35 +93,227 @@ class DateTimeEncoder(json.JSONEncoder):
 
 
 class TelegramService:
-    def __init__(self, settings: Settings, webhook_service: WebhookService) -> None:
+    def __init__(
+        self,
+        settings: Settings,
+        webhook_service: WebhookService,
+        client_factory: Optional[Callable[[], TelegramClient]] = None,
+    ) -> None:
         self._settings = settings
         self._webhook_service = webhook_service
+        self._client_factory = client_factory or self._default_client_factory
+        self._client: Optional[TelegramClient] = None
+        self._created_at = time.monotonic()
+        self._ready = Event()
+        self._startup_attempts = 0
+        self._startup_error: Optional[str] = None
+        self._time_to_ready: Optional[float] = None
+        self._listener_pipeline: Optional[EventPipeline] = None
+        self._edit_pipeline: Optional[EventPipeline] = None
+        self._album_aggregator: Optional[AlbumAggregator] = None
+        self._listener_target = None
+        self._listener_key: Optional[str] = None
+        self._listener_state = JsonStateFile(os.path.join(self._settings.data_dir, "listener_state.json"))
+        self._catching_up = False
+        # Live events held while a catch-up runs, capped at LISTENER_QUEUE_SIZE.
+        self._live_backlog: List = []
+        self._live_backlog_overflow = 0
+        # Listener ids taken in but not yet delivered with a 2xx (queued,
+        # in flight, failed or dropped). The cursor never passes the lowest
+        # of them, so a catch-up after a restart replays them.
+        self._listener_unacked: Set[int] = set()
+        self._listener_acked_max = 0
+        self._listener_retry_due = False
+        self._listener_drops_seen = 0
+        self._background_tasks: set = set()
+        self._shut_down = False
+        # (peer id, message id) -> (file path, photo/document id). The media
+        # id tells an edit that swaps the media apart from a caption edit.
+        self._media_files = LRUCache(MEDIA_CACHE_MAX_ENTRIES)
+        self.response_cache = ResponseCache(
+            self._settings.response_cache_ttl_seconds,
+            self._settings.response_cache_max_bytes,
+        )
+        self.jobs = JobManager(self._settings.jobs_max_concurrent, self._settings.jobs_ttl_seconds)
+        self.exports = ExportManager(self._settings.exports_dir, self._settings.export_part_rows)
+        self._export_tasks: Dict[str, asyncio.Task] = {}
+        self.admission = BridgeAdmission(self._settings.bridge_max_in_flight, self._settings.bridge_max_queued)
+        self.delivery_cursors: Optional[DeliveryCursors] = None
+        if self._settings.delivery_cursors:
+            self.delivery_cursors = DeliveryCursors(os.path.join(self._settings.data_dir, "delivery_cursors.json"))
+        self.search_index: Optional[SearchIndex] = None
+        if self._settings.search_index:
+            try:
+                self.search_index = SearchIndex(self._settings.search_index_path)
+            except sqlite3.Error as exc:
+                logger.error("Full-text search disabled; cannot open %s: %s", self._settings.search_index_path, exc)
+        metrics.entity_label.set_limit(self._settings.metrics_max_entities)
 
         self._loop = asyncio.new_event_loop()
         self._thread = Thread(target=self._run_loop, name="TelegramServiceLoop", daemon=True)
         self._thread.start()
 
+        self._watchdog: Optional[LoopWatchdog] = None
+        if self._settings.loop_watchdog_threshold_ms > 0:
+            self._watchdog = LoopWatchdog(
+                self._loop,
+                self._thread,
+                threshold=self._settings.loop_watchdog_threshold_ms / 1000,
+            )
+            self._watchdog.start()
+
         self._media_serializer = URLSafeTimedSerializer(
             self._settings.media_signing_secret,
             salt="telegram-analysis-media",
         )
 
-        init_future = asyncio.run_coroutine_threadsafe(self._initialise(), self._loop)
-        init_future.result()
+        # Configuration errors fail here, at import time; only the Telegram
+        # connection itself is retried in the background.
+        self._base_webhook_headers = self._webhook_service.build_headers()
+        self._listener_headers = self._webhook_service.build_headers(self._settings.listener_headers_raw)
+        try:
+            self._webhook_encoding = parse_webhook_encoding(self._settings.webhook_encoding)
+            self._listener_encoding = parse_webhook_encoding(
+                self._settings.listener_webhook_encoding or self._settings.webhook_encoding,
+                "LISTENER_WEBHOOK_ENCODING",
+            )
+            self.destinations: Dict[str, Destination] = parse_destinations(
+                self._settings.webhook_destinations_raw,
+                self._base_webhook_headers,
+                self._settings.webhook_encoding,
+                self._settings.listener_queue_size,
+            )
+        except ValueError as exc:
+            raise RuntimeError(str(exc)) from exc
+        self._listener_webhook = self._settings.listener_webhook or self._settings.default_webhook
+        self._primaries: "OrderedDict[str, Destination]" = OrderedDict()
+
+        # Connecting can take long (or FloodWait), so it runs on the loop and
+        # the HTTP server starts serving liveness/readiness right away.
+        asyncio.run_coroutine_threadsafe(self._start(), self._loop)
+        atexit.register(self.shutdown)
+
+    def shutdown(self, timeout: float = SHUTDOWN_DRAIN_SECONDS) -> None:
+        """Deliver queued listener events before the process exits.
+
+        gunicorn calls this from its ``worker_exit`` hook (gunicorn.conf.py).
+        The ``atexit`` fallback runs after thread pools are shut down, so it
+        can only persist state. The loop thread is a daemon, so anything
+        still queued when this returns is lost.
+        """
+        if self._shut_down or not self._thread.is_alive():
+            return
+        self._shut_down = True
+        future = asyncio.run_coroutine_threadsafe(self._drain(), self._loop)
+        try:
+            future.result(timeout)
+        except Exception as exc:  # noqa: BLE001
+            future.cancel()
+            logger.warning("Listener queues not drained on shutdown: %r", exc)
+        self._listener_state.flush()
+
+    async def _drain(self) -> None:
+        # Albums still inside their window go to the queue first.
+        if self._album_aggregator is not None:
+            await self._album_aggregator.flush_all()
+        for pipeline in (self._listener_pipeline, self._edit_pipeline):
+            if pipeline is not None:
+                await pipeline.join()
+                await pipeline.stop()
+        # Then the webhook queues those deliveries landed in.
+        await asyncio.gather(*(
+            destination.close()
+            for destination in [*self.destinations.values(), *self._primaries.values()]
+        ))
+
+    @property
+    def ready(self) -> bool:
+        return self._ready.is_set()
+
+    def wait_ready(self, timeout: Optional[float] = None) -> bool:
+        return self._ready.wait(timeout)
+
+    def startup_status(self) -> Dict[str, object]:
+        return {
+            "ready": self.ready,
+            "attempts": self._startup_attempts,
+            "last_error": self._startup_error,
+            "time_to_ready_seconds": round(self._time_to_ready, 3) if self._time_to_ready is not None else None,
+            "loop_alive": self._thread.is_alive(),
+            "listening": self._listener_target is not None,
+        }
+
+    def _require_ready(self) -> None:
+        if not self.ready:
+            raise ServiceNotReadyError(self._startup_error or "Telegram client is still connecting")
+
+    async def _start(self) -> None:
+        """Connect with exponential backoff, then start the listener and exports."""
+        delay = STARTUP_RETRY_INITIAL_SECONDS
+        while True:
+            self._startup_attempts += 1
+            try:
+                await self._initialise()
+                break
+            except Exception as exc:  # noqa: BLE001
+                self._startup_error = str(exc)
+                metrics.STARTUP_FAILURES.inc()
+                if self._client is not None:
+                    with contextlib.suppress(Exception):
+                        await self._client.disconnect()
+                wait = max(delay, getattr(exc, "seconds", 0) or 0)
+                logger.error(
+                    "Telegram startup attempt %s failed: %s; retrying in %.0fs",
+                    self._startup_attempts,
+                    exc,
+                    wait,
+                )
+                await asyncio.sleep(wait)
+                delay = min(delay * 2, self._settings.startup_retry_max_seconds)
+
+        self._startup_error = None
+        self._time_to_ready = time.monotonic() - self._created_at
+        metrics.TIME_TO_READY.set(self._time_to_ready)
+        self._ready.set()
+        logger.info("Telegram service ready after %.2fs", self._time_to_ready)
+
+        for destination in self.destinations.values():
+            await destination.start(self._loop, self._webhook_service)
 
         if self._settings.listener_entity:
-            listener_future = asyncio.run_coroutine_threadsafe(self._start_listener(), self._loop)
             try:
-                listener_future.result()
+                await self._start_listener()
             except Exception as exc:  # noqa: BLE001
                 logger.error("Failed to start listener: %s", exc)
 
+        for export in self.exports.interrupted():
+            logger.info("Resuming interrupted export %s of %s", export.id, export.get("entity"))
+            try:
+                await self._launch_export(export, resume=True)
+            except Exception as exc:  # noqa: BLE001
+                logger.error("Could not resume export %s: %s", export.id, exc)
+
+    def _default_client_factory(self) -> TelegramClient:
+        return TelegramClient(
+            self._settings.session_path,
+            self._settings.api_id,
+            self._settings.api_hash,
+        )
+
     def _run_loop(self) -> None:
         asyncio.set_event_loop(self._loop)
         self._loop.run_forever()
 
     async def _initialise(self) -> None:
-        self._client_lock = asyncio.Lock()  # type: ignore[attr-defined]
+        # Bounds concurrent MTProto work (history pulls, lookups, redownloads)
+        # so batch triggers can run in parallel without flooding Telegram.
+        self._client_semaphore = asyncio.Semaphore(self._settings.telegram_max_concurrency)
+        # Usernames can be renamed or handed to another peer, so resolved
+        # entities expire; the bound keeps batch polling of many channels flat.
+        self._entity_cache = LRUCache(
+            self._settings.entity_cache_max_entries,
+            self._settings.entity_cache_ttl_seconds,
+        )
 
         # NUEVO: Verificar que existen archivos/directorios esenciales
         missing_items = []
@@ -89,11 +347,7 @@ class TelegramService:
         os.makedirs(session_dir, exist_ok=True)
         os.makedirs(self._settings.media_dir, exist_ok=True)
 
-        self._client = TelegramClient(
-            self._settings.session_path,
-            self._settings.api_id,
-            self._settings.api_hash,
-        )
+        self._client = self._client_factory()
 
         await self._client.connect()
         if not await self._client.is_user_authorized():
@@ -107,16 +361,109 @@ class TelegramService:
         await self._client.start()
         logger.info("Telegram client started")
 
-        self._base_webhook_headers = self._webhook_service.build_headers()
-        self._listener_headers = self._webhook_service.build_headers(self._settings.listener_headers_raw)
-        self._listener_webhook = self._settings.listener_webhook or self._settings.default_webhook
+        self._spawn(self._monitor_loop_lag())
+
+    async def _monitor_loop_lag(self, interval: float = 0.5) -> None:
+        while True:
+            started = self._loop.time()
+            await asyncio.sleep(interval)
+            metrics.EVENT_LOOP_LAG.set(max(0.0, self._loop.time() - started - interval))
+
+    async def _mtproto(self, method: str, entity: Optional[str], awaitable):
+        """Await a Telethon call while recording latency, errors and FloodWaits."""
+        started = time.perf_counter()
+        try:
+            return await awaitable
+        except errors.FloodWaitError as exc:
+            metrics.FLOOD_WAIT_SECONDS.labels(method).inc(exc.seconds)
+            metrics.MTPROTO_ERRORS.labels(method, type(exc).__name__).inc()
+            raise
+        except Exception as exc:  # noqa: BLE001
+            metrics.MTPROTO_ERRORS.labels(method, type(exc).__name__).inc()
+            raise
+        finally:
+            metrics.MTPROTO_LATENCY.labels(method, metrics.entity_label(entity)).observe(time.perf_counter() - started)
+
+    @contextlib.asynccontextmanager
+    async def _client_slot(self):
+        started = time.perf_counter()
+        async with self._client_semaphore:
+            metrics.CLIENT_WAIT_SECONDS.observe(time.perf_counter() - started)
+            yield
+
+    def _run_coroutine(self, coro, operation: str, deadline: Optional[float] = None) -> concurrent.futures.Future:
+        """Schedule ``coro`` on the Telethon loop, recording how long it queued.
+
+        With a ``deadline`` (``time.monotonic()`` based) the coroutine is
+        cancelled on the loop when it expires and the future raises
+        ``DeadlineExceededError``.
+        """
+        if not self.ready:
+            coro.close()
+            self._require_ready()
+        submitted = time.perf_counter()
+
+        async def _timed():
+            metrics.BRIDGE_WAIT_SECONDS.labels(operation).observe(time.perf_counter() - submitted)
+            if deadline is None:
+                return await coro
+            try:
+                return await asyncio.wait_for(coro, remaining(deadline))
+            except asyncio.TimeoutError:
+                raise DeadlineExceededError(
+                    f"{operation} did not finish within REQUEST_TIMEOUT_SECONDS={self._settings.request_timeout_seconds:g}"
+                ) from None
+
+        return asyncio.run_coroutine_threadsafe(_timed(), self._loop)
+
+    def _deadline(self) -> Optional[float]:
+        timeout = self._settings.request_timeout_seconds
+        return time.monotonic() + timeout if timeout > 0 else None
+
+    @staticmethod
+    def _result_timeout(deadline: Optional[float]) -> Optional[float]:
+        left = remaining(deadline)
+        return None if left is None else left + BRIDGE_RESULT_GRACE_SECONDS
+
+    def _call(self, coro, operation: str):
+        """Run ``coro`` for a Flask thread: admitted, bounded by the request deadline.
+
+        Raises ``AdmissionRejectedError`` when the bridge is saturated and
+        ``DeadlineExceededError`` when the work (queueing included) outlives
+        ``REQUEST_TIMEOUT_SECONDS``; the work is cancelled in that case.
+        """
+        deadline = self._deadline()
+        try:
+            release = self.admission.acquire(deadline, operation)
+        except Exception:
+            coro.close()
+            raise
+        try:
+            future = self._run_coroutine(coro, operation, deadline)
+            try:
+                return future.result(timeout=self._result_timeout(deadline))
+            except DeadlineExceededError:
+                metrics.BRIDGE_TIMEOUTS.labels(operation).inc()
+                raise
+            except concurrent.futures.TimeoutError:
+                # The loop did not even get to cancel it: it is blocked.
+                future.cancel()
+                metrics.BRIDGE_TIMEOUTS.labels(operation).inc()
+                raise DeadlineExceededError(f"{operation} timed out; the Telegram loop is not responding") from None
+        finally:
+            release()
 
     async def _resolve_entity(self, entity: str):
+        cached = self._entity_cache.get(entity)
+        if cached is not None:
+            return cached
         if entity.isdigit():
             entity_obj = PeerChannel(int(entity))
         else:
             entity_obj = entity
-        return await self._client.get_entity(entity_obj)
+        resolved = await self._mtproto("get_entity", entity, self._client.get_entity(entity_obj))
+        self._entity_cache.set(entity, resolved)
+        return resolved
 
     async def _enrich_with_media(self, message, serialized: Dict, entity: Optional[str] = None) -> None:
         media = getattr(message, "media", None)
@@ -128,14 +475,30 @@ class TelegramService:
         if not (is_photo or is_image_document):
             return
 
-        os.makedirs(self._settings.media_dir, exist_ok=True)
-
-        try:
-            target_prefix = os.path.join(self._settings.media_dir, str(message.id))
-            file_path = await self._client.download_media(media, file=target_prefix)
-        except Exception as exc:  # noqa: BLE001
-            logger.warning("Unable to download media for message %s: %s", getattr(message, "id", "?"), exc)
-            return
+        key = (_peer_id(message), message.id)
+        target_prefix = self._media_prefix(*key)
+        file_path, _ = self._media_files.get(key, (None, None))
+        if file_path and os.path.exists(file_path):
+            metrics.MEDIA_CACHE.labels("hit").inc()
+        else:
+            metrics.MEDIA_CACHE.labels("miss").inc()
+            label = metrics.entity_label(entity)
+            started = time.perf_counter()
+            try:
+                os.makedirs(os.path.dirname(target_prefix), exist_ok=True)
+                file_path = await self._mtproto(
+                    "download_media",
+                    entity,
+                    self._client.download_media(media, file=target_prefix),
+                )
+            except Exception as exc:  # noqa: BLE001
+                logger.warning("Unable to download media for message %s: %s", getattr(message, "id", "?"), exc)
+                return
+            metrics.MEDIA_DOWNLOAD_SECONDS.labels(label).observe(time.perf_counter() - started)
+            if file_path:
+                self._media_files.set(key, (file_path, _media_id(media)))
+                with contextlib.suppress(OSError):
+                    metrics.MEDIA_BYTES.labels(label).inc(os.path.getsize(file_path))
 
         if not file_path:
             return
@@ -159,11 +522,30 @@ class TelegramService:
         media_dict = serialized.setdefault("media", {})
         media_dict["download_info"] = download_info
 
+    def _media_prefix(self, peer_id: Optional[int], message_id: int) -> str:
+        """Download target without extension; one directory per chat, since
+        message ids are only unique within a channel."""
+        if peer_id is None:
+            return os.path.join(self._settings.media_dir, str(message_id))
+        return os.path.join(self._settings.media_dir, str(peer_id), str(message_id))
+
     async def _serialise_message(self, message, entity: Optional[str] = None) -> Dict:
-        payload = json.loads(json.dumps(message.to_dict(), cls=DateTimeEncoder))
+        started = time.perf_counter()
+        payload = to_jsonable(message.to_dict())
+        metrics.SERIALISE_SECONDS.labels(metrics.entity_label(entity)).observe(time.perf_counter() - started)
+        if self.search_index is not None:
+            self.search_index.add(payload, entity)
         await self._enrich_with_media(message, payload, entity)
         return payload
 
+    async def _serialise_group(self, messages: List, entity: Optional[str] = None) -> Dict:
+        if len(messages) == 1:
+            return await self._serialise_message(messages[0], entity)
+        # Album parts download their media concurrently and collapse into a
+        # single payload carrying the caption and every download_info entry.
+        parts = await asyncio.gather(*(self._serialise_message(message, entity) for message in messages))
+        return merge_album(list(parts))
+
     def _build_signed_media_url(
         self,
         relative_path: str,
@@ -181,15 +563,19 @@ class TelegramService:
         return f"/media/{token}"
 
     async def _redownload_media(self, entity: str, message_id: int, absolute_path: str) -> Optional[str]:
-        async with self._client_lock:
+        async with self._client_slot():
             target = await self._resolve_entity(entity)
-            message = await self._client.get_messages(target, ids=int(message_id))
+            message = await self._mtproto("get_messages", entity, self._client.get_messages(target, ids=int(message_id)))
             if isinstance(message, list):
                 message = message[0] if message else None
             if not message or not getattr(message, "media", None):
                 return None
             try:
-                downloaded = await self._client.download_media(message.media, file=absolute_path)
+                downloaded = await self._mtproto(
+                    "download_media",
+                    entity,
+                    self._client.download_media(message.media, file=absolute_path),
+                )
             except Exception as exc:  # noqa: BLE001
                 logger.warning("Unable to redownload media for %s/%s: %s", entity, message_id, exc)
                 return None
@@ -224,110 +610,1123 @@ class TelegramService:
             if entity and message_id:
                 os.makedirs(os.path.dirname(absolute_path), exist_ok=True)
                 try:
-                    future = asyncio.run_coroutine_threadsafe(
+                    future = self._run_coroutine(
                         self._redownload_media(str(entity), int(message_id), absolute_path),
-                        self._loop,
+                        "redownload",
                     )
                     future.result(timeout=30)
                 except Exception as exc:  # noqa: BLE001
                     logger.warning("Failed to redownload missing media: %s", exc)
         return absolute_path
 
-    async def _dispatch_webhook(self, payload: Dict, webhook_url: Optional[str], headers: Dict[str, str]) -> None:
-        if not webhook_url:
-            return
-        await self._webhook_service.send(self._loop, webhook_url, payload, headers)
-        await self._webhook_service.store_last_response(self._loop, payload)
+    async def _dispatch_webhook(
+        self,
+        payload: Dict,
+        webhook_url: Optional[str],
+        headers: Dict[str, str],
+        encoding: Optional[Tuple[str, Optional[str]]] = None,
+        entity: Optional[str] = None,
+        destinations: Sequence[Destination] = (),
+        listener: bool = False,
+    ) -> Optional["asyncio.Future[str]"]:
+        """Queue ``payload`` for ``webhook_url`` and ``destinations``.
+
+        The payload is encoded once per distinct encoding and shared. Every
+        target, the primary ``webhook_url`` included, delivers from its own
+        queue, so a slow one never holds up the others. Returns a future for
+        the ``webhook_url`` status, or ``None`` without one.
+        """
+        encoding = encoding or self._webhook_encoding
+        encodings = [destination.encoding for destination in destinations]
+        if webhook_url:
+            encodings.append(encoding)
+        if not encodings:
+            return None
+        encoded = await self._loop.run_in_executor(None, encode_once, payload, encodings)
+        done = None
+        if webhook_url:
+            # No await between lookup and submit, so a retired primary is
+            # never handed a delivery after its queue was drained.
+            primary = await self._primary_destination(webhook_url, headers, encoding, listener)
+            done = await primary.submit(payload, encoded[encoding], entity)
+        for destination in destinations:
+            await destination.submit(payload, encoded[destination.encoding], entity)
+        return done
+
+    async def _primary_destination(
+        self,
+        url: str,
+        headers: Dict[str, str],
+        encoding: Tuple[str, Optional[str]],
+        listener: bool,
+    ) -> Destination:
+        """The destination behind a primary webhook, started on first use.
 
-    async def _fetch_history(self, entity: str, limit: int, webhook_url: Optional[str]) -> List[Dict]:
+        The listener's keeps ``LISTENER_QUEUE_SIZE`` and ``LISTENER_OVERFLOW``
+        (a dropped event is replayed by a catch-up); the others block, so a
+        large pull waits for room instead of losing deliveries.
+        """
+        if listener:
+            name = "primary:listener"
+        elif url == self._settings.default_webhook:
+            name = "primary:default"
+        else:
+            name = "primary:" + hashlib.sha1(url.encode()).hexdigest()[:8]
+        destination = self._primaries.get(name)
+        if destination is not None:
+            self._primaries.move_to_end(name)
+            return destination
+        destination = Destination(
+            name,
+            url,
+            headers,
+            encoding,
+            timeout=PRIMARY_WEBHOOK_TIMEOUT_SECONDS,
+            concurrency=1,
+            queue_size=self._settings.listener_queue_size if listener else PRIMARY_QUEUE_SIZE,
+            overflow=self._settings.listener_overflow if listener else "block",
+            breaker=None,
+        )
+        await destination.start(self._loop, self._webhook_service)
+        self._primaries[name] = destination
+        while len(self._primaries) > PRIMARY_DESTINATIONS_MAX:
+            _, retired = self._primaries.popitem(last=False)
+            self._spawn(retired.close())
+        return destination
+
+    def unknown_destinations(self, names: Sequence[str]) -> List[str]:
+        return [name for name in names if name not in self.destinations]
+
+    def _destinations_for(self, entity: Optional[str], names: Sequence[str] = ()) -> List[Destination]:
+        return select_destinations(self.destinations, entity, names)
+
+    async def _fetch_history(
+        self,
+        entity: str,
+        limit: int,
+        webhook_url: Optional[str],
+        since_id: int = 0,
+        progress: Optional[Job] = None,
+        redeliver: bool = False,
+        destinations: Sequence[str] = (),
+    ) -> List[Dict]:
+        """Pull up to ``limit`` messages newest first, forwarding each payload.
+
+        ``progress``, when given, is told about every page and payload so a
+        background job can report on (and serve) a pull that is still running.
+
+        With a webhook and delivery cursors enabled, messages already
+        delivered to that webhook are skipped before serialisation (and left
+        out of the result) unless ``redeliver`` is set. ``destinations``
+        names extra webhook destinations on top of those configured for
+        ``entity``.
+        """
         if limit <= 0:
             return []
 
         webhook_headers = self._base_webhook_headers
         effective_webhook = webhook_url or self._settings.default_webhook
-        async with self._client_lock:
+        aggregate = self._settings.album_aggregation
+        all_serialised: List[Dict] = []
+        targets = self._destinations_for(entity, destinations)
+        cursors = self.delivery_cursors if effective_webhook else None
+        cursor_key: Optional[str] = None
+        peer_id = 0
+        skipped = 0
+        failed = False
+        span: List[int] = []
+        deliveries: List[Tuple[List[int], "asyncio.Future[str]"]] = []
+
+        async def emit(group: List) -> None:
+            nonlocal skipped
+            ids = [message.id for message in group]
+            span[:] = [min(span + ids), max(span + ids)]
+            if cursor_key and not redeliver and cursors.seen(cursor_key, ids):
+                skipped += len(group)
+                return
+            serialised = await self._serialise_group(group, entity)
+            serialised["source_entity"] = entity
+            all_serialised.append(serialised)
+            if progress is not None:
+                progress.item(serialised, len(group))
+            if effective_webhook or targets:
+                done = await self._dispatch_webhook(
+                    serialised, effective_webhook, webhook_headers, entity=entity, destinations=targets
+                )
+                if done is not None:
+                    deliveries.append((ids, done))
+
+        async with self._client_slot():
             target = await self._resolve_entity(entity)
+            if cursors is not None:
+                peer_id = utils.get_peer_id(target)
+                cursor_key = cursors.key(effective_webhook, peer_id)
 
             offset_id = 0
-            all_serialised: List[Dict] = []
-
-            while len(all_serialised) < limit:
-                history = await self._client(GetHistoryRequest(
-                    peer=target,
-                    offset_id=offset_id,
-                    offset_date=None,
-                    add_offset=0,
-                    limit=min(100, limit - len(all_serialised)),
-                    max_id=0,
-                    min_id=0,
-                    hash=0,
-                ))
+            fetched = 0
+            carry: List = []
 
+            while fetched < limit:
+                history = await self._get_history_page(
+                    target,
+                    offset_id,
+                    min(100, limit - fetched),
+                    min_id=since_id,
+                    entity=entity,
+                )
+                if progress is not None:
+                    progress.page()
                 if not history.messages:
                     break
 
-                for message in history.messages:
-                    serialised = await self._serialise_message(message, entity)
-                    serialised["source_entity"] = entity
-                    all_serialised.append(serialised)
-                    if effective_webhook:
-                        await self._dispatch_webhook(serialised, effective_webhook, webhook_headers)
+                page = list(history.messages)
+                fetched += len(page)
+                offset_id = page[-1].id
+                messages = carry + page
+                carry = []
 
-                    if len(all_serialised) >= limit:
-                        break
+                if aggregate and grouped_id_of(messages[-1]):
+                    if fetched < limit:
+                        # The album may continue on the next page; hold it back.
+                        carry = self._split_trailing_album(messages)
+                    else:
+                        messages.extend(await self._complete_album(target, messages[-1], min_id=since_id, entity=entity))
 
-                offset_id = history.messages[-1].id
+                groups = group_albums(messages) if aggregate else [[message] for message in messages]
+                for group in groups:
+                    await emit(group)
 
+            if carry:
+                await emit(carry)
+
+        # The webhook POSTs run on its own queue; wait for them outside the
+        # client slot so the pull still answers only once they are delivered.
+        for ids, done in deliveries:
+            status = await done
+            if not cursor_key:
+                continue
+            if status.startswith("2"):
+                for message_id in ids:
+                    cursors.record(cursor_key, effective_webhook, peer_id, entity, message_id)
+            else:
+                failed = True
+
+        if cursor_key and span and not failed:
+            # History pages are contiguous, so ids missing inside the span
+            # were deleted and never need delivering either.
+            cursors.record(cursor_key, effective_webhook, peer_id, entity, span[0], span[1])
+        if cursor_key:
+            cursors.state.save_soon(self._loop)
+        if skipped:
+            logger.info("Skipped %s messages of %s already delivered to %s", skipped, entity, effective_webhook)
         return all_serialised
 
-    async def _fetch_single(self, entity: str, message_id: int, webhook_url: Optional[str]) -> Optional[Dict]:
+    async def _get_history_page(
+        self,
+        target,
+        offset_id: int,
+        limit: int,
+        add_offset: int = 0,
+        min_id: int = 0,
+        entity: Optional[str] = None,
+    ):
+        return await self._mtproto("GetHistoryRequest", entity, self._client(GetHistoryRequest(
+            peer=target,
+            offset_id=offset_id,
+            offset_date=None,
+            add_offset=add_offset,
+            limit=limit,
+            max_id=0,
+            min_id=min_id,
+            hash=0,
+        )))
+
+    @staticmethod
+    def _split_trailing_album(messages: List) -> List:
+        grouped_id = grouped_id_of(messages[-1])
+        index = len(messages)
+        while index > 0 and grouped_id_of(messages[index - 1]) == grouped_id:
+            index -= 1
+        trailing = messages[index:]
+        del messages[index:]
+        return trailing
+
+    async def _complete_album(self, target, last_message, min_id: int = 0, entity: Optional[str] = None) -> List:
+        """Fetch the remaining (older) parts of an album cut by ``limit``."""
+        history = await self._get_history_page(
+            target,
+            last_message.id,
+            ALBUM_MAX_PARTS - 1,
+            min_id=min_id,
+            entity=entity,
+        )
+        grouped_id = grouped_id_of(last_message)
+        remaining: List = []
+        for message in history.messages:
+            if grouped_id_of(message) != grouped_id:
+                break
+            remaining.append(message)
+        return remaining
+
+    async def _fetch_single(
+        self,
+        entity: str,
+        message_id: int,
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+    ) -> Optional[Dict]:
+        found = await self._fetch_by_ids(entity, [int(message_id)], webhook_url, destinations)
+        return found.get(int(message_id))
+
+    async def _fetch_by_ids(
+        self,
+        entity: str,
+        message_ids: List[int],
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+    ) -> Dict[int, Dict]:
+        """Fetch ``message_ids`` from one entity with one call per 100 ids.
+
+        Returns the serialised messages keyed by id; ids Telegram does not
+        return (deleted or never existed) are simply absent.
+        """
         webhook_headers = self._base_webhook_headers
         effective_webhook = webhook_url or self._settings.default_webhook
+        targets = self._destinations_for(entity, destinations)
+        unique_ids = list(dict.fromkeys(int(message_id) for message_id in message_ids))
 
-        async with self._client_lock:
+        async with self._client_slot():
             target = await self._resolve_entity(entity)
-            message = await self._client.get_messages(target, ids=int(message_id))
-
-            if isinstance(message, list):
-                message = message[0] if message else None
+            chunks = [
+                unique_ids[start:start + MAX_IDS_PER_REQUEST]
+                for start in range(0, len(unique_ids), MAX_IDS_PER_REQUEST)
+            ]
+            responses = await asyncio.gather(*(
+                self._mtproto("get_messages", entity, self._client.get_messages(target, ids=chunk))
+                for chunk in chunks
+            ))
 
-            if not message:
-                return None
+        messages = {
+            message.id: message
+            for response in responses
+            for message in (response or [])
+            if message is not None and getattr(message, "id", None) in unique_ids
+        }
+        ordered = [messages[message_id] for message_id in unique_ids if message_id in messages]
+        serialised_list = await asyncio.gather(*(self._serialise_message(message, entity) for message in ordered))
 
-            serialised = await self._serialise_message(message, entity)
+        found: Dict[int, Dict] = {}
+        deliveries = []
+        for message, serialised in zip(ordered, serialised_list):
             serialised["source_entity"] = entity
-            if effective_webhook:
-                await self._dispatch_webhook(serialised, effective_webhook, webhook_headers)
-            return serialised
+            found[message.id] = serialised
+            if effective_webhook or targets:
+                deliveries.append(await self._dispatch_webhook(
+                    serialised, effective_webhook, webhook_headers, entity=entity, destinations=targets
+                ))
+        await asyncio.gather(*(done for done in deliveries if done is not None))
+        return found
+
+    async def _fetch_bulk(
+        self,
+        lookups: List[Tuple[str, int]],
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+    ) -> Dict[str, List[Dict]]:
+        ids_by_entity: Dict[str, List[int]] = {}
+        for entity, message_id in lookups:
+            ids_by_entity.setdefault(entity, []).append(message_id)
+
+        entities = list(ids_by_entity)
+        outcomes = await asyncio.gather(
+            *(self._fetch_by_ids(entity, ids_by_entity[entity], webhook_url, destinations) for entity in entities),
+            return_exceptions=True,
+        )
+
+        found_by_entity: Dict[str, Dict[int, Dict]] = {}
+        errors: List[Dict] = []
+        for entity, outcome in zip(entities, outcomes):
+            if isinstance(outcome, BaseException):
+                logger.error("Bulk lookup failed for %s: %s", entity, outcome)
+                errors.append({"entity": entity, "error": str(outcome)})
+                found_by_entity[entity] = {}
+            else:
+                found_by_entity[entity] = outcome
+
+        messages: List[Dict] = []
+        missing: List[Dict] = []
+        seen = set()
+        for entity, message_id in lookups:
+            if (entity, message_id) in seen:
+                continue
+            seen.add((entity, message_id))
+            serialised = found_by_entity[entity].get(message_id)
+            if serialised is None:
+                missing.append({"entity": entity, "message_id": message_id})
+            else:
+                messages.append(serialised)
+        return {"messages": messages, "missing": missing, "errors": errors}
 
     async def _start_listener(self) -> None:
-        if not self._listener_webhook:
+        if not self._listener_webhook and not self._destinations_for(self._settings.listener_entity):
             logger.info("Listener configured but webhook missing; skipping real-time forwarding")
             return
 
         target = await self._resolve_entity(self._settings.listener_entity)  # type: ignore[arg-type]
-        headers = self._listener_headers
-        webhook_url = self._listener_webhook
+
+        self._listener_pipeline = EventPipeline(
+            "listener",
+            self._deliver_listener_message,
+            queue_size=self._settings.listener_queue_size,
+            workers=self._settings.listener_workers,
+            overflow=self._settings.listener_overflow,
+        )
+        await self._listener_pipeline.start()
+
+        window = self._settings.album_window_seconds if self._settings.album_aggregation else 0
+        self._album_aggregator = AlbumAggregator(window, self._listener_pipeline.submit)
+
+        self._listener_target = target
+        self._listener_key = str(utils.get_peer_id(target))
+        self._catching_up = True
+
+        listener_peer = utils.get_peer_id(target)
 
         @self._client.on(events.NewMessage(chats=target))
         async def handler(event):  # noqa: ANN001 - Telethon provides event
-            async with self._client_lock:
-                serialised = await self._serialise_message(event.message, self._settings.listener_entity)
-                await self._dispatch_webhook(serialised, webhook_url, headers)
+            self.response_cache.invalidate_peer(listener_peer)
+            # Only enqueue here: serialising, downloading media and POSTing the
+            # webhook happen in the pipeline workers so bursts never stall the
+            # update loop or hold the client lock used by /trigger. Album parts
+            # are buffered first so each album is delivered once.
+            if self._catching_up:
+                if len(self._live_backlog) < self._settings.listener_queue_size:
+                    self._live_backlog.append(event.message)
+                else:
+                    # Past the cap the event only holds the cursor back; the
+                    # next re-page from the cursor delivers it.
+                    self._listener_unacked.add(event.message.id)
+                    self._live_backlog_overflow += 1
+                return
+            if event.message.id <= self._listener_cursor():
+                return
+            self._listener_unacked.add(event.message.id)
+            await self._album_aggregator.add(event.message)
+
+        if self._settings.listener_edit_mode != "off":
+            # One worker keeps edits and deletions of a message in order.
+            self._edit_pipeline = EventPipeline(
+                "listener_edits",
+                self._apply_listener_update,
+                queue_size=self._settings.listener_queue_size,
+                workers=1,
+                overflow=self._settings.listener_overflow,
+            )
+            await self._edit_pipeline.start()
+
+            @self._client.on(events.MessageEdited(chats=target))
+            async def edited_handler(event):  # noqa: ANN001 - Telethon provides event
+                self.response_cache.invalidate_peer(listener_peer)
+                await self._edit_pipeline.submit(("edited", event.message))
+
+            # Telegram only says which chat a deletion came from for channels
+            # and supergroups, so deletions in basic groups never match.
+            @self._client.on(events.MessageDeleted(chats=target))
+            async def deleted_handler(event):  # noqa: ANN001 - Telethon provides event
+                self.response_cache.invalidate_peer(listener_peer)
+                await self._edit_pipeline.submit(("deleted", list(event.deleted_ids)))
 
         title = getattr(target, "title", str(target))
         logger.info("Listening for new messages on %s", title)
 
-    def get_last_messages(self, entity: str, limit: int, webhook_url: Optional[str]) -> List[Dict]:
-        future = asyncio.run_coroutine_threadsafe(
-            self._fetch_history(entity, limit, webhook_url),
-            self._loop,
+        self._spawn(self._catch_up_listener())
+        if self._settings.listener_reconnect_check_seconds > 0:
+            self._spawn(self._watch_connection())
+
+    def _spawn(self, coro) -> asyncio.Task:
+        task = self._loop.create_task(coro)
+        self._background_tasks.add(task)
+        task.add_done_callback(self._background_tasks.discard)
+        return task
+
+    def _listener_cursor(self) -> int:
+        state = self._listener_state.get(self._listener_key or "") or {}
+        return int(state.get("last_id") or 0)
+
+    def _ack_listener(self, message_ids: List[int], delivered: bool) -> None:
+        """Record a delivery outcome and move the cursor over the delivered prefix."""
+        if not delivered:
+            logger.warning("Listener delivery of %s failed; it will be retried by a catch-up", message_ids)
+            self._listener_retry_due = True
+            return
+        self._listener_unacked.difference_update(message_ids)
+        self._listener_acked_max = max(self._listener_acked_max, *message_ids)
+        high_water = self._listener_acked_max
+        if self._listener_unacked:
+            high_water = min(high_water, min(self._listener_unacked) - 1)
+        self._advance_listener_cursor(high_water)
+
+    def _advance_listener_cursor(self, message_id: int) -> None:
+        if not self._listener_key or message_id <= self._listener_cursor():
+            return
+        self._listener_state.set(self._listener_key, {
+            "entity": self._settings.listener_entity,
+            "last_id": int(message_id),
+        })
+        self._listener_state.save_soon(self._loop)
+
+    def _listener_delivered(self, message_id: int) -> bool:
+        """True when this process already delivered ``message_id`` with a 2xx."""
+        return message_id <= self._listener_acked_max and message_id not in self._listener_unacked
+
+    async def _catch_up_listener(self) -> None:
+        """Deliver messages posted while the listener was down, oldest first.
+
+        Live events that arrive meanwhile are parked in ``_live_backlog`` and
+        replayed afterwards, skipping anything the backfill already covered.
+        Events past the backlog cap are left to the next retry.
+        """
+        self._catching_up = True
+        self._live_backlog_overflow = 0
+        try:
+            last_id = self._listener_cursor()
+            if not last_id:
+                latest = await self._mtproto(
+                    "get_messages",
+                    self._settings.listener_entity,
+                    self._client.get_messages(self._listener_target, limit=1),
+                )
+                if latest:
+                    self._advance_listener_cursor(latest[0].id)
+                    await self._loop.run_in_executor(None, self._listener_state.flush)
+                logger.info("No listener cursor stored; starting from message %s", self._listener_cursor())
+            elif self._settings.listener_catchup_limit > 0:
+                delivered = await self._backfill_listener(last_id)
+                if delivered:
+                    logger.info("Listener catch-up delivered %s missed messages", delivered)
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Listener catch-up failed: %s", exc)
+        finally:
+            backlog, self._live_backlog = self._live_backlog, []
+            self._catching_up = False
+            if self._live_backlog_overflow:
+                logger.warning(
+                    "%s live events arrived past the catch-up backlog cap (LISTENER_QUEUE_SIZE); "
+                    "they will be re-paged from the cursor",
+                    self._live_backlog_overflow,
+                )
+                self._listener_retry_due = True
+
+        cursor = self._listener_cursor()
+        for message in sorted(backlog, key=lambda item: item.id):
+            if message.id > cursor:
+                self._listener_unacked.add(message.id)
+                await self._album_aggregator.add(message)
+
+    async def _deliver_in_order(self, messages: List) -> None:
+        done = await self._deliver_listener_message(messages)
+        if done is not None:
+            await asyncio.wait([done])
+
+    async def _backfill_listener(self, last_id: int) -> int:
+        # Page forwards from the cursor (negative add_offset) so the oldest
+        # missed messages are delivered first and memory stays bounded. Each
+        # group waits for its webhook POST, so the gap reaches the receiver in
+        # order and before the live backlog is released.
+        delivered = 0
+        cursor = last_id
+        carry: List = []
+        aggregate = self._settings.album_aggregation
+        while delivered < self._settings.listener_catchup_limit:
+            history = await self._get_history_page(
+                self._listener_target,
+                cursor + 1,
+                100,
+                add_offset=-100,
+                min_id=cursor,
+                entity=self._settings.listener_entity,
+            )
+            page = sorted((message for message in history.messages if message.id > cursor), key=lambda item: item.id)
+            if not page:
+                break
+            cursor = page[-1].id
+            messages = carry + page
+            carry = []
+            if aggregate and grouped_id_of(messages[-1]):
+                carry = self._split_trailing_album(messages)
+            groups = group_albums(messages) if aggregate else [[message] for message in messages]
+            for group in groups:
+                if all(self._listener_delivered(message.id) for message in group):
+                    continue
+                await self._deliver_in_order(group)
+                delivered += len(group)
+        if carry:
+            await self._deliver_in_order(carry)
+            delivered += len(carry)
+        if delivered >= self._settings.listener_catchup_limit:
+            logger.warning(
+                "Listener catch-up stopped after LISTENER_CATCHUP_LIMIT=%s messages; older gap left undelivered",
+                self._settings.listener_catchup_limit,
+            )
+        return delivered
+
+    async def _watch_connection(self) -> None:
+        was_connected = True
+        while True:
+            await asyncio.sleep(self._settings.listener_reconnect_check_seconds)
+            connected = self._client.is_connected()
+            dropped = self._listener_pipeline.stats()["dropped"]
+            if dropped > self._listener_drops_seen:
+                self._listener_drops_seen = dropped
+                self._listener_retry_due = True
+            if connected and not was_connected and not self._catching_up:
+                logger.info("Telegram connection restored; catching up listener")
+                await self._catch_up_listener()
+            elif connected and self._listener_retry_due and not self._catching_up:
+                # Failed or dropped events hold the cursor back; re-page from
+                # it and deliver whatever this process has not delivered yet.
+                self._listener_retry_due = False
+                logger.info("Retrying failed or dropped listener events")
+                await self._catch_up_listener()
+            was_connected = connected
+
+    async def _deliver_listener_message(self, messages: List) -> Optional["asyncio.Future[str]"]:
+        """Queue ``messages`` for the listener webhooks; returns the primary's future."""
+        message_ids = [message.id for message in messages]
+        self._listener_unacked.update(message_ids)
+        serialised = await self._serialise_group(messages, self._settings.listener_entity)
+        done = await self._dispatch_webhook(
+            serialised,
+            self._listener_webhook,
+            self._listener_headers,
+            self._listener_encoding,
+            entity=self._settings.listener_entity,
+            destinations=self._destinations_for(self._settings.listener_entity),
+            listener=True,
+        )
+        if done is None:
+            self._ack_listener(message_ids, True)
+            return None
+        # Acknowledged when the webhook queue delivers it; this worker moves on.
+        done.add_done_callback(
+            lambda future: self._ack_listener(
+                message_ids, not future.cancelled() and future.result().startswith("2")
+            )
+        )
+        return done
+
+    async def _apply_listener_update(self, update: Tuple[str, Any]) -> None:
+        """Bring the search index and media cache in line with an edit or
+        deletion, then forward it according to ``LISTENER_EDIT_MODE``.
+        """
+        kind, value = update
+        if kind == "edited":
+            payload = await self._apply_edit(value)
+        else:
+            payload = await self._apply_deletion(value)
+        if payload is None:
+            return
+        metrics.LISTENER_UPDATES.labels(kind).inc()
+        if self._settings.listener_edit_mode in ("delta", "full"):
+            await self._dispatch_webhook(
+                payload,
+                self._listener_webhook,
+                self._listener_headers,
+                self._listener_encoding,
+                entity=self._settings.listener_entity,
+                destinations=self._destinations_for(self._settings.listener_entity),
+                listener=True,
+            )
+
+    async def _apply_edit(self, message) -> Optional[Dict]:
+        # Reactions, views and poll results also arrive as edits but leave
+        # edit_date unset; only real edits are applied.
+        if getattr(message, "edit_date", None) is None:
+            return None
+        entity = self._settings.listener_entity
+        cached = self._media_files.get((int(self._listener_key), message.id))
+        if cached is not None and cached[1] != _media_id(getattr(message, "media", None)):
+            await self._evict_media([message.id])
+
+        if self._settings.listener_edit_mode == "full":
+            payload = await self._serialise_message(message, entity)
+            payload["event"] = "edited"
+            payload["source_entity"] = entity
+        else:
+            payload = to_jsonable(message.to_dict())
+            if self.search_index is not None:
+                self.search_index.add(payload, entity)
+            payload = {
+                "event": "edited",
+                "source_entity": entity,
+                "chat_id": int(self._listener_key),
+                "id": message.id,
+                "grouped_id": payload.get("grouped_id"),
+                "date": payload.get("date"),
+                "edit_date": payload.get("edit_date"),
+                "message": payload.get("message"),
+            }
+        if not getattr(message, "message", None) and self.search_index is not None:
+            self.search_index.remove(utils.resolve_id(int(self._listener_key))[0], [message.id])
+        return payload
+
+    async def _apply_deletion(self, message_ids: List[int]) -> Optional[Dict]:
+        if not message_ids:
+            return None
+        await self._evict_media(message_ids)
+        if self.search_index is not None:
+            self.search_index.remove(utils.resolve_id(int(self._listener_key))[0], message_ids)
+        return {
+            "event": "deleted",
+            "source_entity": self._settings.listener_entity,
+            "chat_id": int(self._listener_key),
+            "ids": sorted(message_ids),
+        }
+
+    async def _evict_media(self, message_ids: List[int]) -> None:
+        """Forget and remove the listener chat's downloaded files so the next
+        fetch re-downloads them."""
+        peer_id = int(self._listener_key)
+        prefixes = [self._media_prefix(peer_id, message_id) for message_id in message_ids]
+        for message_id in message_ids:
+            self._media_files.pop((peer_id, message_id))
+
+        def _remove() -> None:
+            for prefix in prefixes:
+                for path in glob.glob(glob.escape(prefix) + ".*"):
+                    with contextlib.suppress(OSError):
+                        os.unlink(path)
+
+        await self._loop.run_in_executor(None, _remove)
+
+    async def _cached_fetch(
+        self,
+        key: Hashable,
+        entities: List[str],
+        fetch: Callable[[Optional[str]], Awaitable[Any]],
+        items: Callable[[Any], List[Dict]],
+        webhook_url: Optional[str],
+        cacheable: Callable[[Any], bool] = lambda payload: True,
+        destinations: Sequence[str] = (),
+        client_etags: Collection[str] = (),
+    ) -> CachedResponse:
+        """Serve ``key`` from the response cache or run ``fetch`` and store it.
+
+        A hit skips MTProto, serialisation and media work entirely; the
+        cached payloads are still forwarded to the webhook so callers see the
+        same side effects as on a miss. Entries are kept per webhook target,
+        and a hit whose ETag is in ``client_etags`` (answered with ``304``)
+        is not forwarded again.
+        """
+        cache = self.response_cache
+        effective_webhook = webhook_url or self._settings.default_webhook
+        key = (key, effective_webhook, tuple(sorted(destinations)))
+        try:
+            peers = {utils.get_peer_id(await self._resolve_entity(entity)) for entity in entities}
+        except Exception:  # noqa: BLE001 - let the real fetch report the error
+            payload = await fetch(webhook_url)
+            return cache.build(payload, items(payload))
+
+        cached = cache.get(key)
+        if cached is not None:
+            if "*" in client_etags or cached.etag in client_etags:
+                return cached
+            deliveries = []
+            for payload in items(cached.payload):
+                entity = payload.get("source_entity")
+                targets = self._destinations_for(entity, destinations)
+                if effective_webhook or targets:
+                    deliveries.append(await self._dispatch_webhook(
+                        payload, effective_webhook, self._base_webhook_headers, entity=entity, destinations=targets
+                    ))
+            await asyncio.gather(*(done for done in deliveries if done is not None))
+            return cached
+
+        generation = cache.generation(peers)
+        payload = await fetch(webhook_url)
+        entry = cache.build(payload, items(payload), peers)
+        if cacheable(payload):
+            cache.put(key, entry, generation)
+        return entry
+
+    async def _export_row(self, message, entity: str, media: bool, slots: asyncio.Semaphore) -> Dict:
+        if not media:
+            row = to_jsonable(message.to_dict())
+            if self.search_index is not None:
+                self.search_index.add(row, entity)
+            return row
+        async with slots:
+            return await self._serialise_message(message, entity)
+
+    async def _export_history(self, export: Export) -> None:
+        """Walk the whole history newest to oldest, checkpointing every page."""
+        entity = export.get("entity")
+        media = bool(export.get("media"))
+        min_id = int(export.get("min_id") or 0)
+        media_slots = asyncio.Semaphore(self._settings.export_media_concurrency)
+        target = await self._resolve_entity(entity)
+        cursor = int(export.get("cursor") or 0)
+        while True:
+            # Take the client slot per page so live requests interleave
+            # with the export instead of waiting for all of it.
+            async with self._client_slot():
+                history = await self._get_history_page(target, cursor, 100, min_id=min_id, entity=entity)
+            if not history.messages:
+                break
+            rows = await asyncio.gather(*(
+                self._export_row(message, entity, media, media_slots) for message in history.messages
+            ))
+            cursor = history.messages[-1].id
+            await self._loop.run_in_executor(None, export.write_page, list(rows), cursor)
+
+    async def _export_participants(self, export: Export) -> None:
+        """Stream every member to NDJSON, splitting capped searches by prefix.
+
+        Each page is de-duplicated by user id and written together with the
+        offsets of every search, so a resumed export continues each search
+        where it stopped and never writes a user twice.
+        """
+        entity = export.get("entity")
+        target = await self._resolve_entity(entity)
+        plan = SearchPlan(export.get("cursor"))
+        seen = await self._loop.run_in_executor(None, lambda: {row["id"] for row in export.rows()})
+        search_slots = asyncio.Semaphore(self._settings.participant_search_concurrency)
+        write_lock = asyncio.Lock()
+
+        async def crawl(query: str) -> None:
+            while True:
+                async with search_slots, self._client_slot():
+                    response = await self._mtproto(
+                        "GetParticipantsRequest",
+                        entity,
+                        self._client(request_page(target, query, plan.offset(query))),
+                    )
+                users = getattr(response, "users", None) or []
+                offset = plan.offset(query) + len(users)
+                async with write_lock:
+                    rows = [row for row in page_rows(response) if row["id"] not in seen]
+                    seen.update(row["id"] for row in rows)
+                    plan.advance(query, offset)
+                    children = plan.complete(query, offset < response.count) if not users else []
+                    await self._loop.run_in_executor(None, export.write_page, rows, plan.cursor())
+                if not users:
+                    break
+            if children:
+                logger.info("Export %s: search %r is capped; splitting into %s prefixes", export.id, query, len(children))
+                await asyncio.gather(*(crawl(child) for child in children))
+
+        await asyncio.gather(*(crawl(query) for query in plan.pending()))
+
+    async def _run_export(self, export: Export) -> None:
+        entity = export.get("entity")
+        try:
+            if export.get("kind") == "participants":
+                await self._export_participants(export)
+            else:
+                await self._export_history(export)
+            await self._loop.run_in_executor(None, export.finish, "completed")
+            logger.info("Export %s of %s completed: %s rows", export.id, entity, export.get("messages"))
+        except asyncio.CancelledError:
+            await self._loop.run_in_executor(None, export.finish, "cancelled")
+            raise
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Export %s of %s failed: %s", export.id, entity, exc)
+            await self._loop.run_in_executor(None, export.finish, "failed", str(exc))
+
+    async def _launch_export(self, export: Export, resume: bool = False) -> None:
+        if export.id in self._export_tasks:
+            return
+        if len(self._export_tasks) >= self._settings.exports_max_concurrent:
+            raise JobLimitError(f"at most {self._settings.exports_max_concurrent} exports can run at once")
+        if resume:
+            await self._loop.run_in_executor(None, export.prepare_resume)
+        task = self._spawn(self._run_export(export))
+        self._export_tasks[export.id] = task
+        task.add_done_callback(lambda _: self._export_tasks.pop(export.id, None))
+
+    async def _cancel_export(self, export: Export) -> None:
+        task = self._export_tasks.get(export.id)
+        if task is None:
+            # Interrupted by a restart and not resumed yet: without this the
+            # next startup would resume it.
+            if export.get("status") == "running":
+                await self._loop.run_in_executor(None, export.set_status, "cancelled")
+            return
+        task.cancel()
+        # Wait until the task has recorded the cancellation in its manifest.
+        with contextlib.suppress(asyncio.CancelledError):
+            await task
+
+    def start_export(
+        self,
+        entity: str,
+        fmt: str = "ndjson",
+        media: bool = False,
+        min_id: int = 0,
+        kind: str = "history",
+    ) -> Export:
+        """Start a history or participant export; raises ``JobLimitError`` or ``ValueError``."""
+        self._require_ready()
+        if len(self._export_tasks) >= self._settings.exports_max_concurrent:
+            raise JobLimitError(f"at most {self._settings.exports_max_concurrent} exports can run at once")
+        export = self.exports.create(entity, fmt, media, min_id=min_id, kind=kind)
+        try:
+            self._run_coroutine(self._launch_export(export), "export").result()
+        except JobLimitError:
+            # Another export took the last slot meanwhile; a manifest left
+            # behind would be picked up as interrupted on the next startup.
+            self.exports.delete(export.id)
+            raise
+        return export
+
+    def resume_export(self, export_id: str) -> Optional[Export]:
+        export = self.exports.get(export_id)
+        if export is not None and export.get("status") != "completed":
+            self._run_coroutine(self._launch_export(export, resume=True), "export").result()
+        return export
+
+    def cancel_export(self, export_id: str, purge: bool = False) -> Optional[Export]:
+        export = self.exports.get(export_id)
+        if export is None:
+            return None
+        self._run_coroutine(self._cancel_export(export), "export").result(timeout=30)
+        if purge:
+            self.exports.delete(export_id)
+        return export
+
+    def export_running(self, export_id: str) -> bool:
+        return export_id in self._export_tasks
+
+    def describe_tasks(self) -> List[Dict[str, object]]:
+        return describe_tasks(self._loop)
+
+    def listener_stats(self) -> Optional[Dict[str, object]]:
+        if self._listener_pipeline is None:
+            return None
+        stats = self._listener_pipeline.stats()
+        if self._edit_pipeline is not None:
+            stats["edits"] = self._edit_pipeline.stats()
+        return stats
+
+    def destination_stats(self) -> Dict[str, Dict[str, object]]:
+        return {
+            name: destination.stats()
+            for name, destination in [*self.destinations.items(), *self._primaries.items()]
+        }
+
+    async def _fetch_batch_item(self, spec: Dict, webhook_url: Optional[str]) -> Dict:
+        entity = spec["entity"]
+        try:
+            messages = await self._fetch_history(
+                entity,
+                spec["limit"],
+                webhook_url,
+                since_id=spec.get("since_id", 0),
+                redeliver=spec.get("redeliver", False),
+                destinations=spec.get("destinations", ()),
+            )
+        except Exception as exc:  # noqa: BLE001
+            logger.error("Batch fetch failed for %s: %s", entity, exc)
+            return {"entity": entity, "error": str(exc)}
+        return {"entity": entity, "count": len(messages), "messages": messages}
+
+    def delivery_cursors_active(self, webhook_url: Optional[str]) -> bool:
+        """Whether a pull forwarding to ``webhook_url`` skips already delivered messages."""
+        return self.delivery_cursors is not None and bool(webhook_url or self._settings.default_webhook)
+
+    def get_last_messages(
+        self,
+        entity: str,
+        limit: int,
+        webhook_url: Optional[str],
+        since_id: int = 0,
+        redeliver: bool = False,
+        destinations: Sequence[str] = (),
+    ) -> List[Dict]:
+        return self._call(
+            self._fetch_history(
+                entity, limit, webhook_url, since_id=since_id, redeliver=redeliver, destinations=destinations
+            ),
+            "history",
+        )
+
+    def get_last_messages_cached(
+        self,
+        entity: str,
+        limit: int,
+        webhook_url: Optional[str],
+        since_id: int = 0,
+        redeliver: bool = False,
+        destinations: Sequence[str] = (),
+        client_etags: Collection[str] = (),
+    ) -> CachedResponse:
+        return self._call(
+            self._cached_fetch(
+                ("trigger", entity, limit, since_id),
+                [entity],
+                lambda url: self._fetch_history(
+                    entity, limit, url, since_id=since_id, redeliver=redeliver, destinations=destinations
+                ),
+                lambda payload: payload,
+                webhook_url,
+                destinations=destinations,
+                client_etags=client_etags,
+            ),
+            "history",
+        )
+
+    def start_history_job(
+        self,
+        entity: str,
+        limit: int,
+        webhook_url: Optional[str],
+        since_id: int = 0,
+        redeliver: bool = False,
+        destinations: Sequence[str] = (),
+    ) -> Job:
+        """Run ``get_last_messages`` as a background job; raises ``JobLimitError`` when full."""
+        self._require_ready()
+        return self.jobs.start(
+            "history",
+            {
+                "entity": entity,
+                "limit": limit,
+                "since_id": since_id,
+                "redeliver": redeliver,
+                "destinations": list(destinations),
+            },
+            lambda job: self._run_coroutine(
+                self._fetch_history(
+                    entity,
+                    limit,
+                    webhook_url,
+                    since_id=since_id,
+                    progress=job,
+                    redeliver=redeliver,
+                    destinations=destinations,
+                ),
+                "job",
+            ),
+        )
+
+    def iter_batch(self, specs: List[Dict], webhook_url: Optional[str]) -> AdmittedIterator:
+        """Fetch every spec concurrently and yield per-entity results as they finish.
+
+        Each spec is a dict with ``entity``, ``limit`` and ``since_id``. Failures
+        are reported in the yielded item's ``error`` field instead of raising;
+        specs still running at the request deadline report a timeout. The
+        whole batch takes one bridge slot, acquired here (so rejection raises
+        immediately) and held until the iterator is exhausted or closed.
+        """
+        deadline = self._deadline()
+        release = self.admission.acquire(deadline, "batch")
+        return AdmittedIterator(self._iter_batch(specs, webhook_url, deadline), release)
+
+    def _iter_batch(self, specs: List[Dict], webhook_url: Optional[str], deadline: Optional[float]) -> Iterator[Dict]:
+        futures = {
+            self._run_coroutine(self._fetch_batch_item(spec, webhook_url), "batch", deadline): index
+            for index, spec in enumerate(specs)
+        }
+        pending = set(futures)
+        try:
+            for future in concurrent.futures.as_completed(futures, timeout=self._result_timeout(deadline)):
+                pending.discard(future)
+                index = futures[future]
+                try:
+                    result = future.result()
+                except DeadlineExceededError as exc:
+                    metrics.BRIDGE_TIMEOUTS.labels("batch").inc()
+                    result = {"entity": specs[index]["entity"], "error": str(exc)}
+                result["index"] = index
+                yield result
+        except concurrent.futures.TimeoutError:
+            for future in pending:
+                future.cancel()
+                metrics.BRIDGE_TIMEOUTS.labels("batch").inc()
+                index = futures[future]
+                yield {"entity": specs[index]["entity"], "error": "batch timed out; the Telegram loop is not responding", "index": index}
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def get_batch(self, specs: List[Dict], webhook_url: Optional[str]) -> List[Dict]:
+        results = sorted(self.iter_batch(specs, webhook_url), key=lambda item: item["index"])
+        for result in results:
+            result.pop("index", None)
+        return results
+
+    def get_message_by_id(
+        self,
+        entity: str,
+        message_id: int,
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+    ) -> Optional[Dict]:
+        return self._call(
+            self._fetch_single(entity, message_id, webhook_url, destinations),
+            "message",
         )
-        return future.result()
 
-    def get_message_by_id(self, entity: str, message_id: int, webhook_url: Optional[str]) -> Optional[Dict]:
-        future = asyncio.run_coroutine_threadsafe(
-            self._fetch_single(entity, message_id, webhook_url),
-            self._loop,
+    def get_message_by_id_cached(
+        self,
+        entity: str,
+        message_id: int,
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+        client_etags: Collection[str] = (),
+    ) -> CachedResponse:
+        """Cached single lookup; the payload is ``[message]`` or ``None`` when not found."""
+
+        async def fetch(url: Optional[str]) -> Optional[List[Dict]]:
+            message = await self._fetch_single(entity, message_id, url, destinations)
+            return [message] if message else None
+
+        return self._call(
+            self._cached_fetch(
+                ("message", entity, int(message_id)),
+                [entity],
+                fetch,
+                lambda payload: payload or [],
+                webhook_url,
+                destinations=destinations,
+                client_etags=client_etags,
+            ),
+            "message",
+        )
+
+    def get_messages_by_ids(
+        self,
+        lookups: List[Tuple[str, int]],
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+    ) -> Dict[str, List[Dict]]:
+        """Look up many ``(entity, message_id)`` pairs, preserving request order.
+
+        Returns ``messages`` (found, in request order), ``missing`` (pairs that
+        Telegram did not return) and per-entity ``errors``.
+        """
+        return self._call(
+            self._fetch_bulk(lookups, webhook_url, destinations),
+            "messages",
+        )
+
+    def get_messages_by_ids_cached(
+        self,
+        lookups: List[Tuple[str, int]],
+        webhook_url: Optional[str],
+        destinations: Sequence[str] = (),
+        client_etags: Collection[str] = (),
+    ) -> CachedResponse:
+        return self._call(
+            self._cached_fetch(
+                ("messages", tuple(lookups)),
+                list(dict.fromkeys(entity for entity, _ in lookups)),
+                lambda url: self._fetch_bulk(lookups, url, destinations),
+                lambda payload: payload["messages"],
+                webhook_url,
+                cacheable=lambda payload: not payload["errors"],
+                destinations=destinations,
+                client_etags=client_etags,
+            ),
+            "messages",
         )
-        return future.result()
@@ -1,19 +1,31 @@
 import asyncio
+import concurrent.futures
 import json
 import logging
 import os
-from typing import Dict, Optional
+import time
+from typing import Dict, Optional, Tuple
 
 import requests
 
+from . import metrics
+from .delivery_log import DeliveryLog
+from .encoding import JSON, encode_payload
+
 logger = logging.getLogger(__name__)
 
 
 class WebhookService:
-    def __init__(self, base_headers_raw: Optional[str], data_dir: str) -> None:
+    def __init__(
+        self,
+        base_headers_raw: Optional[str],
+        data_dir: str,
+        delivery_log: Optional[DeliveryLog] = None,
+    ) -> None:
         self._base_headers_raw = base_headers_raw
         self._data_dir = data_dir
         os.makedirs(self._data_dir, exist_ok=True)
+        self.delivery_log = delivery_log or DeliveryLog()
 
     @staticmethod
     def _parse_headers(raw_value: Optional[str], source_label: str) -> Dict[str, str]:
@@ -56,27 +68,43 @@ class WebhookService:
             headers.update(self._parse_headers(override_raw, 'LISTENER_WEBHOOK_HEADERS'))
         return headers
 
-    async def send(self, loop: asyncio.AbstractEventLoop, url: Optional[str], payload: Dict, headers: Dict[str, str]) -> None:
+    async def send(
+        self,
+        loop: asyncio.AbstractEventLoop,
+        url: Optional[str],
+        payload: Dict,
+        headers: Dict[str, str],
+        encoding: Tuple[str, Optional[str]] = (JSON, None),
+        entity: Optional[str] = None,
+        encoded: Optional[Tuple[bytes, Dict[str, str]]] = None,
+        timeout: float = 30,
+        executor: Optional[concurrent.futures.Executor] = None,
+    ) -> Optional[str]:
+        """POST ``payload``; returns the HTTP status as a string, or ``"error"``.
+
+        ``encoded`` is a body already produced by ``encode_payload`` (shared
+        by several destinations); ``executor`` defaults to the loop's.
+        """
         if not url:
-            return
+            return None
+        entity = entity or payload.get("source_entity")
+        label = metrics.entity_label(entity)
 
-        def _post() -> None:
+        def _post() -> str:
+            started = time.perf_counter()
+            status = "error"
             try:
-                response = requests.post(url, json=payload, headers=headers, timeout=30)
+                # Encoding happens here, on the executor, so large payloads
+                # never hold up the Telethon loop.
+                body, body_headers = encoded or encode_payload(payload, encoding)
+                response = requests.post(url, data=body, headers={**headers, **body_headers}, timeout=timeout)
+                status = str(response.status_code)
                 logger.info("Sent message to %s, status: %s", url, response.status_code)
             except Exception as exc:  # noqa: BLE001
                 logger.error("Error sending to webhook %s: %s", url, exc)
+            finally:
+                metrics.WEBHOOK_LATENCY.labels(status, label).observe(time.perf_counter() - started)
+                self.delivery_log.record(payload, url, entity, status)
+            return status
 
-        await loop.run_in_executor(None, _post)
-
-    async def store_last_response(self, loop: asyncio.AbstractEventLoop, payload: Dict) -> None:
-        path = os.path.join(self._data_dir, 'last_response.json')
-
-        def _write() -> None:
-            try:
-                with open(path, 'w') as handle:
-                    json.dump(payload, handle)
-            except Exception as exc:  # noqa: BLE001
-                logger.error("Error writing last response: %s", exc)
-
-        await loop.run_in_executor(None, _write)
+        return await loop.run_in_executor(executor, _post)
@@ -0,0 +1,102 @@
+"""Telegram message corpus used by the benchmarks and load test.
+
+``corpus.json`` stores messages exactly as ``Message.to_dict()`` produces them
+(encoded with :class:`app.services.telegram.DateTimeEncoder`). The committed
+file is synthetic: hand-built messages covering the shapes seen in channel
+posts, not a capture of a real channel (its ``source`` field says so; a
+recorded corpus says ``"recorded"``). ``load_corpus``
+rebuilds real Telethon TL objects from it so the hot paths run against the
+same object graph they see in production.
+
+Re-record from a live channel (uses the service's session and env settings)::
+
+    python -m benchmarks.corpus --record @channel --limit 200
+"""
+
+import argparse
+import inspect
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from telethon.tl import types
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "corpus.json")
+
+_SIGNATURES: Dict[type, inspect.Signature] = {}
+
+
+def _annotation(cls: type, name: str) -> str:
+    signature = _SIGNATURES.get(cls)
+    if signature is None:
+        signature = _SIGNATURES[cls] = inspect.signature(cls.__init__)
+    parameter = signature.parameters.get(name)
+    return str(parameter.annotation) if parameter is not None else ""
+
+
+def _rebuild(value: Any, cls: type = None, name: str = "") -> Any:
+    if isinstance(value, dict) and "_" in value:
+        tl_class = getattr(types, value["_"])
+        kwargs = {
+            key: _rebuild(item, tl_class, key)
+            for key, item in value.items()
+            if key != "_" and key in inspect.signature(tl_class.__init__).parameters
+        }
+        return tl_class(**kwargs)
+    if isinstance(value, list):
+        if cls is not None and "bytes" in _annotation(cls, name) and all(isinstance(item, int) for item in value):
+            return bytes(value)
+        return [_rebuild(item) for item in value]
+    if isinstance(value, str) and cls is not None and "datetime" in _annotation(cls, name):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def load_corpus(path: str = CORPUS_PATH) -> List[Any]:
+    """Return the corpus as Telethon ``Message`` objects, newest first."""
+    with open(path, "r") as handle:
+        raw = json.load(handle)
+    messages = [_rebuild(item) for item in raw["messages"]]
+    messages.sort(key=lambda message: message.id, reverse=True)
+    return messages
+
+
+async def _record(entity: str, limit: int, path: str) -> None:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    from telethon import TelegramClient
+
+    from app.config import settings
+    from app.services.telegram import DateTimeEncoder
+
+    client = TelegramClient(settings.session_path, settings.api_id, settings.api_hash)
+    await client.connect()
+    try:
+        messages = await client.get_messages(entity, limit=limit)
+        payload = {
+            "source": "recorded",
+            "messages": [json.loads(json.dumps(message.to_dict(), cls=DateTimeEncoder)) for message in messages],
+        }
+    finally:
+        await client.disconnect()
+
+    with open(path, "w") as handle:
+        json.dump(payload, handle, indent=1)
+    print(f"Recorded {len(payload['messages'])} messages from {entity} into {path}")
+
+
+def main() -> None:
+    import asyncio
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--record", metavar="ENTITY", required=True, help="Channel or group to record from")
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--output", default=CORPUS_PATH)
+    args = parser.parse_args()
+    asyncio.run(_record(args.record, args.limit, args.output))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""In-process stand-in for ``TelegramClient`` used by benchmarks and load tests.
+
+It serves a fixed set of Telethon ``Message`` objects and implements the
+subset of the client API that :class:`app.services.telegram.TelegramService`
+uses. Every call sleeps for a configurable latency, and a fraction of calls
+can raise ``FloodWaitError`` to exercise back-pressure paths.
+"""
+
+import asyncio
+import os
+import random
+from dataclasses import dataclass
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from telethon import errors
+from telethon.tl.functions.messages import GetHistoryRequest
+from telethon.tl.types import Channel, ChatPhotoEmpty
+
+
+@dataclass
+class FakeLatency:
+    """Seconds each fake call sleeps; ``jitter`` adds up to that much on top."""
+
+    rpc: float = 0.0
+    download: float = 0.0
+    jitter: float = 0.0
+    flood_wait_ratio: float = 0.0
+    flood_wait_seconds: int = 1
+
+
+class FakeTelegramClient:
+    def __init__(
+        self,
+        messages: Iterable[Any],
+        latency: Optional[FakeLatency] = None,
+        media_bytes: int = 64 * 1024,
+        seed: int = 0,
+    ) -> None:
+        self._messages: Dict[int, Any] = {message.id: message for message in messages}
+        self._ordered: List[int] = sorted(self._messages, reverse=True)
+        self.latency = latency or FakeLatency()
+        self._media_payload = b"\0" * media_bytes
+        self._random = random.Random(seed)
+        self._handlers: List[tuple] = []
+        self._connected = False
+        self.calls: Dict[str, int] = {}
+
+    # -- connection -----------------------------------------------------
+    async def connect(self) -> None:
+        self._connected = True
+
+    async def disconnect(self) -> None:
+        self._connected = False
+
+    def is_connected(self) -> bool:
+        return self._connected
+
+    async def is_user_authorized(self) -> bool:
+        return True
+
+    async def start(self) -> "FakeTelegramClient":
+        self._connected = True
+        return self
+
+    # -- helpers --------------------------------------------------------
+    async def _delay(self, method: str, base: float) -> None:
+        self.calls[method] = self.calls.get(method, 0) + 1
+        if self.latency.flood_wait_ratio and self._random.random() < self.latency.flood_wait_ratio:
+            raise errors.FloodWaitError(request=None, capture=self.latency.flood_wait_seconds)
+        delay = base + (self._random.random() * self.latency.jitter if self.latency.jitter else 0.0)
+        if delay:
+            await asyncio.sleep(delay)
+
+    def add_message(self, message: Any) -> None:
+        self._messages[message.id] = message
+        self._ordered = sorted(self._messages, reverse=True)
+
+    @property
+    def max_id(self) -> int:
+        return self._ordered[0] if self._ordered else 0
+
+    # -- API used by TelegramService ------------------------------------
+    async def get_entity(self, entity: Any) -> Channel:
+        await self._delay("get_entity", self.latency.rpc)
+        channel_id = getattr(entity, "channel_id", None) or (abs(hash(str(entity))) % 10 ** 9)
+        return Channel(
+            id=channel_id,
+            title=str(entity),
+            photo=ChatPhotoEmpty(),
+            date=None,
+            access_hash=channel_id,
+            broadcast=True,
+        )
+
+    async def __call__(self, request: Any) -> SimpleNamespace:
+        if not isinstance(request, GetHistoryRequest):
+            raise NotImplementedError(type(request).__name__)
+        await self._delay("GetHistoryRequest", self.latency.rpc)
+        min_id = request.min_id or 0
+        if request.add_offset < 0:
+            newer = [mid for mid in reversed(self._ordered) if mid >= request.offset_id and mid > min_id]
+            selected = sorted(newer[:request.limit], reverse=True)
+        else:
+            selected = [
+                mid for mid in self._ordered
+                if (not request.offset_id or mid < request.offset_id) and mid > min_id
+            ][:request.limit]
+        return SimpleNamespace(messages=[self._messages[mid] for mid in selected], chats=[], users=[])
+
+    async def get_messages(self, entity: Any, ids: Any = None, limit: Optional[int] = None) -> Any:
+        await self._delay("get_messages", self.latency.rpc)
+        if ids is None:
+            return [self._messages[mid] for mid in self._ordered[:limit or 1]]
+        if isinstance(ids, list):
+            return [self._messages.get(int(mid)) for mid in ids]
+        return self._messages.get(int(ids))
+
+    async def download_media(self, media: Any, file: Optional[str] = None) -> Optional[str]:
+        await self._delay("download_media", self.latency.download)
+        if not file:
+            return None
+        path = file if os.path.splitext(file)[1] else f"{file}.jpg"
+        with open(path, "wb") as handle:
+            handle.write(self._media_payload)
+        return path
+
+    def on(self, event_builder: Any) -> Callable:
+        def decorator(handler: Callable) -> Callable:
+            self.add_event_handler(handler, event_builder)
+            return handler
+
+        return decorator
+
+    def add_event_handler(self, handler: Callable, event_builder: Any = None) -> None:
+        self._handlers.append((event_builder, handler))
+
+    async def emit(self, builder_type: type, **event_fields: Any) -> None:
+        """Deliver a fake update to handlers registered for ``builder_type``."""
+        event = SimpleNamespace(**event_fields)
+        for builder, handler in list(self._handlers):
+            if type(builder) is builder_type:  # MessageEdited subclasses NewMessage
+                await handler(event)
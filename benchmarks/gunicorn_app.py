@@ -0,0 +1,31 @@
+"""WSGI entry point used by ``python -m benchmarks.loadtest`` under gunicorn.
+
+gunicorn imports this module in its worker, after the fork, so the fake
+Telegram backend and the live producer live in the process that serves the
+requests. Settings arrive as JSON in ``LOADTEST_OPTIONS``; on exit the worker
+writes its producer count and MTProto call counts to ``stats_path`` for the
+parent's report.
+"""
+
+import atexit
+import json
+import os
+import threading
+
+from .loadtest import build_app
+
+_options = json.loads(os.environ["LOADTEST_OPTIONS"])
+app, _service, _client, _producer = build_app(_options)
+
+# The parent cannot reach the producer, so it stops on its own once the run
+# is over, before SIGTERM starts the worker_exit drain.
+_timer = threading.Timer(_options["duration"], _producer.stop)
+_timer.daemon = True
+_timer.start()
+
+
+@atexit.register
+def _write_stats() -> None:
+    _producer.stop()
+    with open(_options["stats_path"], "w") as handle:
+        json.dump({"emitted": _producer.emitted, "mtproto_calls": dict(_client.calls)}, handle)
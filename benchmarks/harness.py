@@ -0,0 +1,60 @@
+"""Shared setup for the offline benchmarks and the load test."""
+
+import dataclasses
+import os
+import tempfile
+import time
+from typing import Any, Iterable, Optional, Tuple
+
+_DUMMY_ENV = {
+    "TELEGRAM_API_ID": "1",
+    "TELEGRAM_API_HASH": "benchmark",
+    "TELEGRAM_PHONE": "+10000000000",
+    "TELEGRAM_USERNAME": "benchmark",
+    "API_KEY": "benchmark-key",
+}
+
+
+def bootstrap_env(data_dir: Optional[str] = None) -> str:
+    """Point the app at a throwaway data dir and satisfy required settings.
+
+    Must run before anything imports :mod:`app.config`, which reads the
+    environment at import time. Existing variables are left untouched.
+    """
+    data_dir = data_dir or tempfile.mkdtemp(prefix="telegram-analysis-bench-")
+    os.makedirs(os.path.join(data_dir, "media"), exist_ok=True)
+    for key, value in _DUMMY_ENV.items():
+        os.environ.setdefault(key, value)
+    os.environ["TELEGRAM_SESSION_DIR"] = data_dir
+    os.environ["DATA_DIR"] = data_dir
+    os.environ["TELEGRAM_MEDIA_DIR"] = os.path.join(data_dir, "media")
+    os.environ.pop("N8N_WEBHOOK_URL", None)
+    os.environ.pop("TELEGRAM_LISTENER_ENTITY", None)
+    return data_dir
+
+
+def build_service(messages: Iterable[Any], latency: Any = None, **overrides: Any) -> Tuple[Any, Any]:
+    """Create a ``TelegramService`` wired to a :class:`FakeTelegramClient`."""
+    from app.config import Settings
+    from app.services.telegram import TelegramService
+    from app.services.webhook import WebhookService
+
+    from .fake_client import FakeTelegramClient
+
+    settings = dataclasses.replace(Settings.from_env(), **overrides)
+    client = FakeTelegramClient(messages, latency=latency)
+    webhook_service = WebhookService(settings.webhook_headers_raw, settings.data_dir)
+    service = TelegramService(settings, webhook_service, client_factory=lambda: client)
+    wait_ready(service)
+    return service, client
+
+
+def wait_ready(service: Any, timeout: float = 30.0, listener: bool = False) -> None:
+    """Block until the service's background startup (and, optionally, its listener) is done."""
+    deadline = time.monotonic() + timeout
+    if not service.wait_ready(timeout):
+        raise RuntimeError(f"Telegram service not ready: {service.startup_status()['last_error']}")
+    while listener and not service.startup_status()["listening"]:
+        if time.monotonic() > deadline:
+            raise RuntimeError("Listener did not start in time")
+        time.sleep(0.05)
@@ -0,0 +1,423 @@
+"""End-to-end load test against a local fake Telegram backend.
+
+Serves the real Flask app (``app.main``) with its Telethon client replaced by
+:class:`FakeTelegramClient`, next to a local webhook sink that records arrival
+times and a producer that feeds live ``NewMessage`` events to the listener. A
+pool of HTTP clients then drives a weighted mix of ``/trigger``, ``/message``
+and ``/media`` requests for ``--duration`` seconds.
+
+By default the app runs under gunicorn with the repo's ``gunicorn.conf.py``
+(one gthread worker, ``GUNICORN_THREADS`` threads), the way it is deployed;
+the fake backend is installed inside the worker by
+:mod:`benchmarks.gunicorn_app`. ``--server werkzeug`` serves it in-process
+instead, which is quicker to start and profile but has an unbounded thread
+pool, so its latencies and RSS do not reflect the deployed setup.
+
+Example::
+
+    python -m benchmarks.loadtest --duration 30 --concurrency 16 \\
+        --mix trigger=5,message=3,media=2 --rpc-latency 0.05 \\
+        --download-latency 0.2 --flood-wait-ratio 0.01 --listener-rate 20
+
+The report lists p50/p95/p99 latency and throughput per request type, peak
+RSS of the serving process and the webhook end-to-end lag (message creation
+until the sink received it).
+"""
+
+import argparse
+import copy
+import json
+import os
+import random
+import resource
+import signal
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .harness import bootstrap_env, wait_ready
+
+
+def _percentile(values: List[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100 * (len(ordered) - 1)))))
+    return ordered[index]
+
+
+def _summary(values: List[float]) -> Dict[str, float]:
+    return {
+        "p50_ms": _percentile(values, 50) * 1000,
+        "p95_ms": _percentile(values, 95) * 1000,
+        "p99_ms": _percentile(values, 99) * 1000,
+        "mean_ms": (statistics.fmean(values) * 1000) if values else 0.0,
+    }
+
+
+class WebhookSink:
+    """Local HTTP endpoint that records when each webhook payload arrived."""
+
+    def __init__(self) -> None:
+        self.lags: List[float] = []
+        self.received: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        sink = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self) -> None:  # noqa: N802 - http.server naming
+                arrived = time.time()
+                body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+                self.send_response(200)
+                self.end_headers()
+                sink.record(self.path, body, arrived)
+
+            def log_message(self, *args) -> None:  # noqa: D401 - silence access log
+                return
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, name="WebhookSink", daemon=True)
+
+    def url(self, path: str) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/{path}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._server.shutdown()
+
+    def record(self, path: str, body: bytes, arrived: float) -> None:
+        created = None
+        if path == "/listener":
+            # Live messages are stamped with their creation time by the
+            # producer, so arrival minus ``date`` is the end-to-end lag.
+            try:
+                created = datetime.fromisoformat(json.loads(body)["date"]).timestamp()
+            except Exception:  # noqa: BLE001 - unexpected payloads only count as received
+                created = None
+        with self._lock:
+            self.received[path] = self.received.get(path, 0) + 1
+            if created is not None:
+                self.lags.append(max(0.0, arrived - created))
+
+
+class LiveProducer:
+    """Emits fake ``NewMessage`` updates at a fixed rate on the Telethon loop."""
+
+    def __init__(self, service, client, templates: List, rate: float) -> None:
+        self._service = service
+        self._client = client
+        self._templates = [template for template in templates if not getattr(template, "grouped_id", None)]
+        self._interval = 1.0 / rate if rate > 0 else 0
+        self._stop = threading.Event()
+        self.emitted = 0
+        self._thread = threading.Thread(target=self._run, name="LiveProducer", daemon=True)
+
+    def start(self) -> None:
+        if self._interval:
+            self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def _run(self) -> None:
+        import asyncio
+
+        from telethon import events
+
+        next_id = self._client.max_id + 1
+        index = 0
+        while not self._stop.wait(self._interval):
+            message = copy.copy(self._templates[index % len(self._templates)])
+            message.id = next_id
+            message.date = datetime.now(timezone.utc)
+            self._client.add_message(message)
+            asyncio.run_coroutine_threadsafe(
+                self._client.emit(events.NewMessage, message=message),
+                self._service._loop,
+            )
+            next_id += 1
+            index += 1
+            self.emitted += 1
+
+
+def _parse_mix(raw: str) -> List[Tuple[str, int]]:
+    mix = []
+    for part in raw.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in ("trigger", "message", "media"):
+            raise argparse.ArgumentTypeError(f"unknown request type: {name}")
+        mix.append((name, int(weight or 1)))
+    return mix
+
+
+def build_app(options: Dict[str, Any]) -> Tuple[Any, Any, Any, "LiveProducer"]:
+    """Import ``app.main`` against a fake backend and start the live producer.
+
+    Returns ``(flask_app, service, client, producer)``. The listener settings
+    must already be in the environment; ``options`` carries the fake latency
+    and producer settings (see ``_options``).
+    """
+    import app.services.telegram as telegram_module
+
+    from .corpus import load_corpus
+    from .fake_client import FakeLatency, FakeTelegramClient
+
+    corpus = load_corpus()
+    client = FakeTelegramClient(
+        corpus,
+        latency=FakeLatency(
+            rpc=options["rpc_latency"],
+            download=options["download_latency"],
+            jitter=options["jitter"],
+            flood_wait_ratio=options["flood_wait_ratio"],
+        ),
+    )
+    # app.main builds its TelegramService at import time with the default
+    # client factory; swap the Telethon class for the fake before importing.
+    telegram_module.TelegramClient = lambda *a, **k: client  # type: ignore[assignment]
+
+    import app.main as app_main
+
+    if not options["keep_rate_limits"]:
+        app_main.limiter.enabled = False
+    service = app_main.telegram_service
+    wait_ready(service, listener=True)
+    producer = LiveProducer(service, client, corpus, options["listener_rate"])
+    producer.start()
+    return app_main.app, service, client, producer
+
+
+def _options(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "rpc_latency": args.rpc_latency,
+        "download_latency": args.download_latency,
+        "jitter": args.jitter,
+        "flood_wait_ratio": args.flood_wait_ratio,
+        "listener_rate": args.listener_rate,
+        "keep_rate_limits": args.keep_rate_limits,
+        "duration": args.duration,
+    }
+
+
+def _serve_werkzeug(options: Dict[str, Any]) -> Tuple[str, Callable[[], Dict[str, Any]]]:
+    from werkzeug.serving import make_server
+
+    flask_app, _, client, producer = build_app(options)
+    server = make_server("127.0.0.1", 0, flask_app, threaded=True)
+    threading.Thread(target=server.serve_forever, name="LoadTestHTTP", daemon=True).start()
+
+    def stop() -> Dict[str, Any]:
+        producer.stop()
+        time.sleep(1.0)  # let in-flight listener deliveries reach the sink
+        server.shutdown()
+        return {
+            "emitted": producer.emitted,
+            "mtproto_calls": dict(client.calls),
+            "peak_rss_mib": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        }
+
+    return f"http://127.0.0.1:{server.server_port}", stop
+
+
+def _free_port() -> int:
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        return probe.getsockname()[1]
+
+
+def _serve_gunicorn(options: Dict[str, Any]) -> Tuple[str, Callable[[], Dict[str, Any]]]:
+    import requests
+
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    port = _free_port()
+    stats_path = os.path.join(tempfile.mkdtemp(prefix="telegram-analysis-loadtest-"), "worker.json")
+    env = {
+        **os.environ,
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "LOADTEST_OPTIONS": json.dumps({**options, "stats_path": stats_path}),
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", os.path.join(root, "gunicorn.conf.py"), "benchmarks.gunicorn_app:app"],
+        cwd=root,
+        env=env,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 60
+    while True:
+        if process.poll() is not None:
+            raise RuntimeError(f"gunicorn exited with status {process.returncode} before serving")
+        try:
+            if requests.get(f"{base_url}/health/live", timeout=1).ok:
+                break
+        except requests.RequestException:
+            pass
+        if time.monotonic() > deadline:
+            process.kill()
+            raise RuntimeError("gunicorn did not start serving within 60s")
+        time.sleep(0.2)
+
+    def stop() -> Dict[str, Any]:
+        time.sleep(1.0)  # let in-flight listener deliveries reach the sink
+        # SIGTERM runs the worker_exit drain, then the worker writes its stats.
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=60)
+        stats: Dict[str, Any] = {"emitted": 0, "mtproto_calls": {}}
+        try:
+            with open(stats_path) as handle:
+                stats.update(json.load(handle))
+        except (OSError, ValueError):
+            print("warning: the gunicorn worker left no stats", file=sys.stderr)
+        # Both gunicorn processes have been reaped, so this is the worker's peak.
+        stats["peak_rss_mib"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss / 1024
+        return stats
+
+    return base_url, stop
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=8, help="Parallel HTTP clients")
+    parser.add_argument("--mix", type=_parse_mix, default=_parse_mix("trigger=5,message=3,media=2"))
+    parser.add_argument("--trigger-limit", type=int, default=20)
+    parser.add_argument("--rpc-latency", type=float, default=0.05, help="Fake MTProto latency (seconds)")
+    parser.add_argument("--download-latency", type=float, default=0.1, help="Fake media download latency (seconds)")
+    parser.add_argument("--jitter", type=float, default=0.02)
+    parser.add_argument("--flood-wait-ratio", type=float, default=0.0, help="Fraction of MTProto calls raising FloodWait")
+    parser.add_argument("--listener-rate", type=float, default=5.0, help="Live messages per second (0 disables)")
+    parser.add_argument("--trigger-webhooks", action="store_true", help="Also POST /trigger results to the sink")
+    parser.add_argument("--keep-rate-limits", action="store_true", help="Do not disable flask-limiter limits")
+    parser.add_argument(
+        "--server",
+        choices=("gunicorn", "werkzeug"),
+        default="gunicorn",
+        help="gunicorn with gunicorn.conf.py (as deployed) or werkzeug in-process",
+    )
+    parser.add_argument("--json", metavar="PATH", help="Write the report as JSON")
+    args = parser.parse_args(argv)
+
+    bootstrap_env()
+    sink = WebhookSink()
+    sink.start()
+
+    os.environ["TELEGRAM_LISTENER_ENTITY"] = "@loadtest"
+    os.environ["LISTENER_WEBHOOK_URL"] = sink.url("listener")
+
+    import requests
+
+    from .corpus import load_corpus
+
+    serve = _serve_gunicorn if args.server == "gunicorn" else _serve_werkzeug
+    base_url, stop = serve(_options(args))
+    headers = {"X-API-Key": os.environ["API_KEY"]}
+
+    session = requests.Session()
+    warmup = session.post(f"{base_url}/trigger", json={"entity": "@loadtest", "limit": 50}, headers=headers, timeout=60)
+    warmup.raise_for_status()
+    media_paths = [
+        payload["media"]["download_info"]["signed_url"]
+        for payload in warmup.json()
+        if isinstance(payload.get("media"), dict) and payload["media"].get("download_info", {}).get("signed_url")
+    ]
+    message_ids = [message.id for message in load_corpus()]
+
+    names = [name for name, _ in args.mix]
+    weights = [weight for _, weight in args.mix]
+    latencies: Dict[str, List[float]] = {name: [] for name in names}
+    failures: Dict[str, int] = {name: 0 for name in names}
+    lock = threading.Lock()
+    deadline = time.monotonic() + args.duration
+
+    def worker(seed: int) -> None:
+        rng = random.Random(seed)
+        http = requests.Session()
+        while time.monotonic() < deadline:
+            kind = rng.choices(names, weights)[0]
+            started = time.perf_counter()
+            try:
+                if kind == "trigger":
+                    body = {"entity": "@loadtest", "limit": args.trigger_limit}
+                    if args.trigger_webhooks:
+                        body["webhook_url"] = sink.url("trigger")
+                    response = http.post(f"{base_url}/trigger", json=body, headers=headers, timeout=120)
+                elif kind == "message":
+                    params = {"entity": "@loadtest", "message_id": rng.choice(message_ids)}
+                    response = http.get(f"{base_url}/message", params=params, headers=headers, timeout=120)
+                else:
+                    if not media_paths:
+                        continue
+                    response = http.get(f"{base_url}{rng.choice(media_paths)}", timeout=120)
+                ok = response.status_code < 400
+            except Exception:  # noqa: BLE001
+                ok = False
+            elapsed = time.perf_counter() - started
+            with lock:
+                latencies[kind].append(elapsed)
+                if not ok:
+                    failures[kind] += 1
+
+    started_at = time.monotonic()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for index in range(args.concurrency):
+            pool.submit(worker, index)
+    wall = time.monotonic() - started_at
+
+    served = stop()
+    sink.stop()
+
+    report = {
+        "duration_s": wall,
+        "concurrency": args.concurrency,
+        "requests": {
+            name: {
+                "count": len(values),
+                "errors": failures[name],
+                "throughput_rps": len(values) / wall if wall else 0.0,
+                **_summary(values),
+            }
+            for name, values in latencies.items()
+        },
+        "server": args.server,
+        "peak_rss_mib": served["peak_rss_mib"],
+        "webhook": {
+            "emitted": served["emitted"],
+            "received_listener": sink.received.get("/listener", 0),
+            "received_trigger": sink.received.get("/trigger", 0),
+            **_summary(sink.lags),
+        },
+        "mtproto_calls": served["mtproto_calls"],
+    }
+
+    print(f"Load test: {wall:.1f}s, {args.concurrency} clients, {args.server}")
+    print(f"{'request':<10} {'count':>7} {'errors':>7} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, stats in report["requests"].items():
+        print(
+            f"{name:<10} {stats['count']:>7} {stats['errors']:>7} {stats['throughput_rps']:>8.1f} "
+            f"{stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} {stats['p99_ms']:>9.1f}"
+        )
+    hook = report["webhook"]
+    print(
+        f"listener webhook lag: emitted {hook['emitted']}, received {hook['received_listener']}, "
+        f"p50 {hook['p50_ms']:.1f} ms, p95 {hook['p95_ms']:.1f} ms, p99 {hook['p99_ms']:.1f} ms"
+    )
+    print(f"peak RSS: {report['peak_rss_mib']:.1f} MiB")
+
+    if args.json:
+        with open(args.json, "w") as handle:
+            json.dump(report, handle, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,234 @@
+"""Offline micro-benchmarks for the message hot paths.
+
+Runs entirely in-process against the message corpus and the fake client, so
+numbers are reproducible on any machine with the app's requirements
+installed. Typical workflow::
+
+    python -m benchmarks.run --save benchmarks/baseline.json   # before a change
+    python -m benchmarks.run --compare benchmarks/baseline.json  # after it
+
+``--compare`` exits with status 1 when any benchmark's time per item regresses
+by more than ``--threshold`` percent.
+"""
+
+import argparse
+import asyncio
+import gc
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+from .harness import bootstrap_env
+
+bootstrap_env()
+
+from app.services.telegram import DateTimeEncoder  # noqa: E402
+
+from .corpus import load_corpus  # noqa: E402
+from .fake_client import FakeLatency  # noqa: E402
+from .harness import build_service  # noqa: E402
+
+
+@dataclass
+class BenchResult:
+    name: str
+    items: int
+    seconds: float
+    us_per_item: float
+    items_per_sec: float
+    peak_kib: float
+
+
+Operation = Callable[[], int]
+BENCHMARKS: Dict[str, Callable[["BenchContext"], Operation]] = {}
+
+
+def benchmark(name: str):
+    def register(factory: Callable[["BenchContext"], Operation]):
+        BENCHMARKS[name] = factory
+        return factory
+
+    return register
+
+
+class BenchContext:
+    def __init__(self, rpc_latency: float, history_limit: int) -> None:
+        self.messages = load_corpus()
+        self.history_limit = history_limit
+        self.service, self.client = build_service(
+            self.messages,
+            latency=FakeLatency(rpc=rpc_latency),
+        )
+
+    def run(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.service._loop).result()
+
+
+@benchmark("to_dict")
+def _bench_to_dict(ctx: BenchContext) -> Operation:
+    def op() -> int:
+        for message in ctx.messages:
+            message.to_dict()
+        return len(ctx.messages)
+
+    return op
+
+
+@benchmark("datetime_encoder")
+def _bench_encoder(ctx: BenchContext) -> Operation:
+    dicts = [message.to_dict() for message in ctx.messages]
+
+    def op() -> int:
+        for item in dicts:
+            json.dumps(item, cls=DateTimeEncoder)
+        return len(dicts)
+
+    return op
+
+
+@benchmark("serialise_message")
+def _bench_serialise(ctx: BenchContext) -> Operation:
+    service = ctx.service
+
+    async def batch() -> int:
+        for message in ctx.messages:
+            await service._serialise_message(message, "@bench")
+        return len(ctx.messages)
+
+    def op() -> int:
+        return ctx.run(batch())
+
+    return op
+
+
+@benchmark("signed_media_url")
+def _bench_signed_url(ctx: BenchContext) -> Operation:
+    service = ctx.service
+    paths = [(f"{message.id}.jpg", message.id) for message in ctx.messages]
+
+    def op() -> int:
+        for relative_path, message_id in paths:
+            service._build_signed_media_url(relative_path, entity="@bench", message_id=message_id)
+        return len(paths)
+
+    return op
+
+
+@benchmark("fetch_history")
+def _bench_fetch_history(ctx: BenchContext) -> Operation:
+    service = ctx.service
+
+    def op() -> int:
+        return len(ctx.run(service._fetch_history("@bench", ctx.history_limit, None)))
+
+    return op
+
+
+def _measure(name: str, op: Operation, repeat: int, min_time: float) -> BenchResult:
+    op()  # warm caches (entity cache, media files, lazy imports)
+
+    samples: List[float] = []
+    items = 0
+    for _ in range(repeat):
+        gc.collect()
+        rounds = 0
+        items = 0
+        started = time.perf_counter()
+        while True:
+            items += op()
+            rounds += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        samples.append(elapsed / items)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    baseline, _ = tracemalloc.get_traced_memory()
+    op()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    per_item = statistics.median(samples)
+    return BenchResult(
+        name=name,
+        items=items,
+        seconds=per_item * items,
+        us_per_item=per_item * 1e6,
+        items_per_sec=1.0 / per_item if per_item else float("inf"),
+        peak_kib=max(0, peak - baseline) / 1024,
+    )
+
+
+def _print_table(results: List[BenchResult], baseline: Optional[Dict[str, dict]]) -> None:
+    header = f"{'benchmark':<20} {'us/item':>10} {'items/s':>12} {'peak KiB':>10}"
+    if baseline:
+        header += f" {'vs base':>9}"
+    print(header)
+    print("-" * len(header))
+    for result in results:
+        line = f"{result.name:<20} {result.us_per_item:>10.2f} {result.items_per_sec:>12.0f} {result.peak_kib:>10.1f}"
+        if baseline and result.name in baseline:
+            before = baseline[result.name]["us_per_item"]
+            line += f" {((result.us_per_item - before) / before * 100):>+8.1f}%"
+        print(line)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("names", nargs="*", help=f"Benchmarks to run (default: all of {', '.join(BENCHMARKS)})")
+    parser.add_argument("--repeat", type=int, default=5, help="Samples per benchmark; the median is reported")
+    parser.add_argument("--min-time", type=float, default=0.2, help="Minimum seconds per sample")
+    parser.add_argument("--rpc-latency", type=float, default=0.0, help="Fake MTProto latency per call (seconds)")
+    parser.add_argument("--history-limit", type=int, default=80, help="limit used by fetch_history")
+    parser.add_argument("--save", metavar="PATH", help="Write results as a JSON baseline")
+    parser.add_argument("--compare", metavar="PATH", help="Compare against a saved baseline")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Allowed regression in percent")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCHMARKS]
+    if unknown:
+        parser.error(f"unknown benchmarks: {', '.join(unknown)}")
+
+    ctx = BenchContext(rpc_latency=args.rpc_latency, history_limit=args.history_limit)
+    results = [
+        _measure(name, BENCHMARKS[name](ctx), args.repeat, args.min_time)
+        for name in (args.names or BENCHMARKS)
+    ]
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, "r") as handle:
+            baseline = {item["name"]: item for item in json.load(handle)["results"]}
+    _print_table(results, baseline)
+
+    if args.save:
+        with open(args.save, "w") as handle:
+            json.dump({
+                "python": sys.version.split()[0],
+                "platform": platform.platform(),
+                "corpus_size": len(ctx.messages),
+                "results": [asdict(result) for result in results],
+            }, handle, indent=2)
+        print(f"Saved baseline to {args.save}")
+
+    if baseline:
+        regressions = [
+            result.name
+            for result in results
+            if result.name in baseline
+            and result.us_per_item > baseline[result.name]["us_per_item"] * (1 + args.threshold / 100)
+        ]
+        if regressions:
+            print(f"Regression above {args.threshold}%: {', '.join(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
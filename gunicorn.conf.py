@@ -0,0 +1,25 @@
+# Loaded by gunicorn from the working directory (/app in the Docker image).
+import os
+import sys
+
+bind = os.getenv("GUNICORN_BIND", "0.0.0.0:8000")
+# One process only: Telethon keeps its session in SQLite, which does not
+# support writes from several processes.
+workers = 1
+# Requests run on threads, so a long NDJSON stream (job results, batch
+# streams) or a profile only occupies one thread. The worker's heartbeat
+# comes from its main thread, so a long request no longer gets it killed
+# at `timeout`, which now only catches a hung worker.
+worker_class = "gthread"
+threads = int(os.getenv("GUNICORN_THREADS", "16"))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "30"))
+# Leaves room for the listener drain in worker_exit (SHUTDOWN_DRAIN_SECONDS).
+graceful_timeout = 30
+
+
+def worker_exit(server, worker):
+    # Runs before the interpreter shuts down its thread pools, so queued
+    # listener events can still be POSTed; an atexit handler is too late.
+    main = sys.modules.get("app.main")
+    if main is not None:
+        main.telegram_service.shutdown()